@@ -0,0 +1,38 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from app.config import settings
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """
+    Dedicated, sized pool for blocking embedding / vector store work, kept
+    apart from Starlette's default threadpool so slow calls cannot starve
+    unrelated endpoints such as /health.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.blocking_pool_workers,
+            thread_name_prefix="medrag-blocking",
+        )
+    return _executor
+
+
+async def run_blocking(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    # Carry the caller's context vars (request stage timings) into the thread
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(get_blocking_executor(), partial(ctx.run, fn, *args, **kwargs))
+
+
+def shutdown_blocking_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -2,18 +2,114 @@ from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
-    # Vector DB
+    # Vector DB ("chroma" or "mmap")
+    vector_backend: str = "chroma"
     chroma_dir: str = "chroma_db"
     chroma_collection: str = "medrag_docs"
+    mmap_index_dir: str = "mmap_index"
+    mmap_dtype: str = "float32"
+    # mmap only: "none", "int8" or "binary" first-pass codes, rescored exactly
+    vector_quantization: str = "none"
+    quantization_rescore_multiplier: int = 8
+    # Sharding (1 = single store; "hash" routes by chunk id, "source" keeps a
+    # document's chunks in one shard). Changing either needs every shard rebuilt.
+    vector_shards: int = 1
+    shard_strategy: str = "hash"
+
+    # Versioned index builds (registry defaults to <index dir>/index_registry.json;
+    # servers poll it to follow activations, 0 disables)
+    index_registry_path: str | None = None
+    index_registry_poll_s: float = 5.0
+    index_keep_versions: int = 1
+    index_stale_build_s: float = 86400.0  # a "building" version older than this is abandoned
+
+    # Ingestion (manifest defaults to <chroma_dir>/ingest_manifest.json)
+    ingest_manifest_path: str | None = None
 
     # Retrieval / grounding
     max_distance: float = 1.2
     require_citations: bool = True
 
+    # Hybrid retrieval (opt-in: it changes ranking): BM25 over chunk texts fused
+    # with dense results (reciprocal rank fusion over top_k * multiplier candidates
+    # each), used when the index was built with a lexical index. Opt-in
+    # short-circuit: abstain without embedding when no BM25 score exceeds
+    # lexical_short_circuit_score.
+    hybrid_retrieval_enabled: bool = False
+    hybrid_candidate_multiplier: int = 3
+    lexical_short_circuit: bool = False
+    lexical_short_circuit_score: float = 0.0
+
+    # Metadata filters (source_file / doc_type / tags): a filter matching at most
+    # this many chunks is answered by an exact scan of just those chunks instead
+    # of a filtered ANN search (0 always uses the store's filtered search)
+    filter_exact_scan_max: int = 2000
+
+    # Context packing (merge overlapping chunks, token budget ~ chars / 4; 0 = no limit).
+    # A budget drops whole lower-ranked chunks from the prompt, so it is opt-in.
+    context_packing_enabled: bool = True
+    context_token_budget: int = 0
+
+    # Embedding model ("torch" = SentenceTransformers, "onnx" = ONNX Runtime)
+    embedding_backend: str = "torch"
+    embedding_model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
+    onnx_cache_dir: str = "onnx_models"
+    onnx_quantize: bool = False
+    onnx_intra_op_threads: int = 0  # 0 = ONNX Runtime default
+    onnx_inter_op_threads: int = 0
+    onnx_max_seq_length: int = 256
+
+    # Shared embedding server (Unix socket path; set it to make every API worker
+    # a client of `python -m app.data_ingest.embedding_server` instead of loading the model)
+    embedding_server_socket: str | None = None
+    embedding_server_timeout_s: float = 30.0
+    embedding_server_connect_timeout_s: float = 60.0
+
+    # Embedding cache (query embeddings; 0 disables, ttl <= 0 means no expiry)
+    embedding_cache_size: int = 2048
+    embedding_cache_ttl_s: float = 0.0
+
+    # Cross-request micro-batching of query embeddings (max size <= 1 disables)
+    embedding_batch_window_ms: float = 2.0
+    embedding_batch_max_size: int = 32
+
     # LLM
     ollama_model: str = "llama3.1"
     llm_temperature: float = 0.0
     ollama_base_url: str = "http://localhost:11434"
+    ollama_keep_alive: str = "30m"  # how long Ollama keeps the model loaded
+
+    # LLM admission control (in-flight generations, wait queue, queue deadline;
+    # questions up to llm_short_question_chars get a priority lane, 0 disables)
+    llm_max_in_flight: int = 2
+    llm_max_queue: int = 64
+    llm_queue_timeout_s: float = 15.0
+    llm_short_question_chars: int = 120
+
+    # Share one computation between concurrent identical /query requests
+    # (same normalized question and top_k)
+    query_coalescing_enabled: bool = True
+
+    # Startup warm-up (dummy embed + vector query + Ollama preload)
+    warmup_enabled: bool = True
+    warmup_in_background: bool = False
+    ollama_warmup_timeout_s: float = 120.0
+
+    # Answer cache (0 disables; set a path to persist answers in SQLite)
+    answer_cache_size: int = 512
+    answer_cache_path: str | None = None
+    answer_cache_disk_size: int = 10000
+    answer_cache_version_check_s: float = 5.0
+
+    # Concurrency: threads for blocking embedding / vector store calls
+    blocking_pool_workers: int = 8
+
+    # Batch endpoints
+    batch_max_items: int = 256
+    batch_llm_concurrency: int = 4
+
+    # Observability: per-stage Server-Timing response header (opt-in)
+    server_timing_enabled: bool = False
 
     # API security
     api_key: str | None = None
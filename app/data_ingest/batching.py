@@ -0,0 +1,147 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+
+import numpy as np
+
+
+_STOP = object()
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class EmbeddingBatcher:
+    """
+    Collects texts submitted by concurrent requests and encodes them in a
+    single model call.
+
+    A background thread takes the first queued text, then keeps collecting
+    until either `window_ms` has elapsed or `max_batch_size` texts are
+    queued, and resolves every caller's Future with its own row.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        window_ms: float = 2.0,
+        max_batch_size: int = 32,
+    ):
+        self.encode_fn = encode_fn
+        self.window_s = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max(max_batch_size, 1)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._size_buckets = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._max_batch = 0
+        self._wait_total_s = 0.0
+        self._wait_max_s = 0.0
+        self._encode_total_s = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        fut: Future = Future()
+        self._queue.put((text, fut, time.perf_counter()))
+        return fut
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.perf_counter() + self.window_s
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stopping = True
+                    break
+                batch.append(nxt)
+
+            self._flush(batch)
+
+        # Fail anything still queued so no caller waits forever after close()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("Embedding batcher is shut down"))
+
+    def _flush(self, batch):
+        # Callers that gave up (disconnect, timeout) cancelled their Future:
+        # skip them, since resolving a cancelled Future raises
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.perf_counter()
+
+        # Identical texts in one batch are encoded once
+        unique: dict = {}
+        for text, _, _ in batch:
+            unique.setdefault(text, len(unique))
+
+        try:
+            vectors = self.encode_fn(list(unique))
+        except Exception as exc:
+            for _, fut, _ in batch:
+                fut.set_exception(exc)
+            return
+
+        finished = time.perf_counter()
+        for text, fut, _ in batch:
+            fut.set_result(vectors[unique[text]])
+
+        self._record(batch, started, finished)
+
+    def _record(self, batch, started: float, finished: float):
+        size = len(batch)
+        bucket = next(
+            (i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound),
+            len(BATCH_SIZE_BUCKETS),
+        )
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            self._size_buckets[bucket] += 1
+            self._max_batch = max(self._max_batch, size)
+            self._encode_total_s += finished - started
+            for _, _, enqueued in batch:
+                wait = started - enqueued
+                self._wait_total_s += wait
+                self._wait_max_s = max(self._wait_max_s, wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            labels = [f"<={b}" for b in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+            return {
+                "window_ms": self.window_s * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": (self._items / self._batches) if self._batches else 0.0,
+                "max_batch_size_seen": self._max_batch,
+                "batch_size_histogram": dict(zip(labels, self._size_buckets)),
+                "mean_queue_wait_ms": (self._wait_total_s / self._items * 1000.0) if self._items else 0.0,
+                "max_queue_wait_ms": self._wait_max_s * 1000.0,
+                "mean_encode_ms": (self._encode_total_s / self._batches * 1000.0) if self._batches else 0.0,
+            }
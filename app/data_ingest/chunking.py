@@ -2,6 +2,22 @@ from typing import List, Dict
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 
+def chunk_document(
+    doc: Dict,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+) -> List[Dict]:
+    """
+    Split a single doc with 'content' and 'metadata' into chunk dicts.
+    Top-level so it can run in a process pool.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+    return _split(doc, text_splitter)
+
+
 def chunk_documents(
     docs: List[Dict],
     chunk_size: int = 1000,
@@ -20,21 +36,26 @@ def chunk_documents(
     all_chunks: List[Dict] = []
 
     for doc in docs:
-        content = doc["content"]
-        metadata = doc.get("metadata", {})
-        source = metadata.get("filename", metadata.get("source", "unknown_source"))
-
-        chunks = text_splitter.split_text(content)
-        for i, chunk in enumerate(chunks):
-            chunk_meta = metadata.copy()
-            chunk_meta["chunk_id"] = i
-            chunk_meta["chunk_uid"] = f"{source}::chunk_{i}"
-            
-            all_chunks.append(
-                {
-                    "content": chunk,
-                    "metadata": chunk_meta,
-                }
-            )
+        all_chunks.extend(_split(doc, text_splitter))
 
     return all_chunks
+
+
+def _split(doc: Dict, text_splitter: RecursiveCharacterTextSplitter) -> List[Dict]:
+    content = doc["content"]
+    metadata = doc.get("metadata", {})
+    source = metadata.get("filename", metadata.get("source", "unknown_source"))
+
+    chunks: List[Dict] = []
+    for i, chunk in enumerate(text_splitter.split_text(content)):
+        chunk_meta = metadata.copy()
+        chunk_meta["chunk_id"] = i
+        chunk_meta["chunk_uid"] = f"{source}::chunk_{i}"
+
+        chunks.append(
+            {
+                "content": chunk,
+                "metadata": chunk_meta,
+            }
+        )
+    return chunks
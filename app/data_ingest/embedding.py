@@ -1,17 +1,265 @@
-from typing import List
-from sentence_transformers import SentenceTransformer
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 
+import numpy as np
 
-class LocalEmbeddingModel:
+from app.config import settings
+from app.data_ingest.batching import EmbeddingBatcher
+from app.concurrency import run_blocking
+
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def normalize_question(text: str) -> str:
     """
-    Simple wrapper around a SentenceTransformers model.
+    Canonical form used for cache keys: collapse whitespace and casefold,
+    so trivially different spellings of the same question share an entry.
     """
+    return " ".join(text.split()).casefold()
 
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache of query embeddings with an optional TTL.
+    Vectors are stored as read-only float32 arrays to keep entries compact.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_s: float | None = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s if ttl_s and ttl_s > 0 else None
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, vector = entry
+            if self.ttl_s is not None and time.monotonic() - stored_at > self.ttl_s:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: Tuple[str, str], vector) -> np.ndarray:
+        arr = np.asarray(vector, dtype=np.float32).copy()
+        arr.setflags(write=False)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), arr)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return arr
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+class EmbeddingModel(ABC):
+    """
+    Backend-independent embedding front end.
+    Query embeddings go through a bounded LRU cache so repeated questions
+    skip the forward pass; cache misses from concurrent requests are
+    micro-batched into one encode call. Backends implement _encode and must
+    load their model before calling this __init__ (it starts the batcher).
+    """
+
+    backend = "base"
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        cache_size: int | None = None,
+        cache_ttl_s: float | None = None,
+        batch_window_ms: float | None = None,
+        batch_max_size: int | None = None,
+    ):
+        self.model_name = model_name
+
+        cache_size = settings.embedding_cache_size if cache_size is None else cache_size
+        cache_ttl_s = settings.embedding_cache_ttl_s if cache_ttl_s is None else cache_ttl_s
+        self.cache = EmbeddingCache(cache_size, cache_ttl_s) if cache_size > 0 else None
+
+        batch_window_ms = settings.embedding_batch_window_ms if batch_window_ms is None else batch_window_ms
+        batch_max_size = settings.embedding_batch_max_size if batch_max_size is None else batch_max_size
+        self.batcher = (
+            EmbeddingBatcher(self._encode, window_ms=batch_window_ms, max_batch_size=batch_max_size)
+            if batch_max_size > 1
+            else None
+        )
 
     def embed_texts(self, texts: List[str]):
         """
         Return a list of embedding vectors for the given texts.
         """
-        return self.model.encode(texts, convert_to_numpy=True).tolist()
+        return self._encode(texts).tolist()
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Return embeddings as one (n, dim) float32 array, avoiding the Python
+        list-of-lists that embed_texts builds. Used by bulk ingestion.
+        """
+        return self._encode(texts)
+
+    def embed_query(self, question: str) -> np.ndarray:
+        """
+        Return the float32 embedding for a single question, served from the
+        cache when the same (normalized) question was embedded before.
+        """
+        if self.cache is None:
+            return self._encode_one(question)
+
+        key = (self.model_name, normalize_question(question))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        return self.cache.put(key, self._encode_one(question))
+
+    async def aembed_query(self, question: str) -> np.ndarray:
+        """
+        Async variant of embed_query. Cache hits return immediately; misses
+        await the batcher (or the blocking executor) without holding a thread.
+        """
+        key = None
+        if self.cache is not None:
+            key = (self.model_name, normalize_question(question))
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        if self.batcher is not None:
+            vector = await asyncio.wrap_future(self.batcher.submit(question))
+        else:
+            vector = (await run_blocking(self._encode, [question]))[0]
+
+        return self.cache.put(key, vector) if key is not None else vector
+
+    def embed_queries(self, questions: List[str]) -> List[np.ndarray]:
+        """
+        Embed many questions at once: cache hits are reused and all misses
+        are encoded together in a single model call.
+        """
+        vectors: List[Optional[np.ndarray]] = [None] * len(questions)
+        keys = [(self.model_name, normalize_question(q)) for q in questions]
+
+        missing: dict = {}
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                vectors[i] = cached
+            else:
+                missing.setdefault(key, []).append(i)
+
+        if missing:
+            texts = [questions[idxs[0]] for idxs in missing.values()]
+            encoded = self._encode(texts)
+            for (key, idxs), vector in zip(missing.items(), encoded):
+                if self.cache is not None:
+                    vector = self.cache.put(key, vector)
+                for i in idxs:
+                    vectors[i] = vector
+
+        return vectors
+
+    async def aembed_queries(self, questions: List[str]) -> List[np.ndarray]:
+        return await run_blocking(self.embed_queries, questions)
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        if self.batcher is not None:
+            return self.batcher.submit(text).result()
+        return self._encode([text])[0]
+
+    @abstractmethod
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode a batch of texts into an (n, dim) float32 array of L2-normalized rows.
+        """
+
+    def fingerprint(self) -> dict:
+        """
+        What determines the vectors this model produces; ingest manifests
+        store it so that changing any of it re-embeds the corpus.
+        """
+        return {"model_name": self.model_name, "backend": self.backend}
+
+    def stats(self) -> dict:
+        return {
+            "model_name": self.model_name,
+            "backend": self.backend,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "batcher": self.batcher.stats() if self.batcher is not None else None,
+        }
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+
+
+class LocalEmbeddingModel(EmbeddingModel):
+    """
+    Simple wrapper around a SentenceTransformers (PyTorch) model.
+    """
+
+    backend = "torch"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, **kwargs):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        super().__init__(model_name, **kwargs)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, convert_to_numpy=True).astype(np.float32, copy=False)
+
+
+def build_embedding_model() -> EmbeddingModel:
+    """
+    Construct the backend selected by settings.embedding_backend, or a
+    client of the node's embedding server if embedding_server_socket is set.
+    """
+    if settings.embedding_server_socket:
+        from app.data_ingest.embedding_server import RemoteEmbeddingModel
+
+        return RemoteEmbeddingModel(settings.embedding_server_socket)
+    return build_local_embedding_model()
+
+
+def build_local_embedding_model() -> EmbeddingModel:
+    backend = settings.embedding_backend.lower()
+    if backend == "torch":
+        return LocalEmbeddingModel(settings.embedding_model_name)
+    if backend == "onnx":
+        from app.data_ingest.onnx_embedding import OnnxEmbeddingModel
+
+        return OnnxEmbeddingModel(settings.embedding_model_name)
+    raise ValueError(f"Unknown embedding_backend: {settings.embedding_backend!r} (expected 'torch' or 'onnx')")
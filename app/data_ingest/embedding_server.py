@@ -0,0 +1,257 @@
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.data_ingest.embedding import EmbeddingModel, build_local_embedding_model
+
+logger = logging.getLogger("medrag")
+
+# Wire format, both directions: [u32 header length][JSON header][u32 body length][body].
+# Requests carry the texts in the header; responses carry float32 rows in the body.
+_LEN = struct.Struct("!I")
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        part = sock.recv(n - len(buf))
+        if not part:
+            raise ConnectionError("embedding server connection closed")
+        buf.extend(part)
+    return bytes(buf)
+
+
+def _recv_frame(sock: socket.socket) -> bytes:
+    (size,) = _LEN.unpack(_recv_exact(sock, _LEN.size))
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"frame of {size} bytes exceeds {MAX_FRAME_BYTES}")
+    return _recv_exact(sock, size)
+
+
+def send_message(sock: socket.socket, header: Dict[str, Any], body: bytes = b""):
+    head = json.dumps(header).encode("utf-8")
+    sock.sendall(_LEN.pack(len(head)) + head + _LEN.pack(len(body)) + body)
+
+
+def recv_message(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    header = json.loads(_recv_frame(sock))
+    return header, _recv_frame(sock)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    # One thread per client connection; API workers keep theirs open
+
+    def handle(self):
+        server: "EmbeddingServer" = self.server
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                reply, body = server.dispatch(header)
+            except Exception as exc:
+                logger.exception("embedding_server_error op=%s", header.get("op"))
+                reply, body = {"error": f"{type(exc).__name__}: {exc}"}, b""
+            send_message(self.request, reply, body)
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Owns the one embedding model of a node and serves every API worker over
+    a Unix domain socket. Single-text requests (query embeddings) go through
+    the model's cache and micro-batcher, so concurrent questions from
+    different workers share one forward pass; multi-text requests (ingest,
+    or a worker's own batch) are encoded directly.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, model: EmbeddingModel):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o600)  # same-user clients only
+        self.socket_path = socket_path
+        self.model = model
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+
+    def dispatch(self, header: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        op = header.get("op")
+        if op == "embed":
+            texts: List[str] = header["texts"]
+            if len(texts) == 1:
+                # Query path: server-side cache, then the cross-worker batcher
+                vectors = self.model.embed_query(texts[0])[None, :]
+            else:
+                vectors = self.model.embed_batch(texts)
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            with self._lock:
+                self.requests += 1
+                self.texts += len(texts)
+            return {"shape": list(vectors.shape)}, vectors.tobytes()
+        if op == "info":
+            return {
+                "model_name": self.model.model_name,
+                "backend": self.model.backend,
+                "fingerprint": self.model.fingerprint(),
+            }, b""
+        if op == "stats":
+            with self._lock:
+                counts = {"requests": self.requests, "texts": self.texts}
+            return {**counts, "model": self.model.stats()}, b""
+        raise ValueError(f"unknown op {op!r}")
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+# The server went away (restart, or not up yet): safe to reconnect and resend.
+# Timeouts are not included: resending would double the load on a busy server.
+_RECONNECT_ERRORS = (ConnectionError, FileNotFoundError)
+
+
+class RemoteEmbeddingModel(EmbeddingModel):
+    """
+    Client of an EmbeddingServer, in place of a local model: each API
+    worker keeps its query cache and batcher, but encoding happens in the
+    shared server process, so a node holds one copy of the weights.
+    """
+
+    backend = "remote"
+
+    def __init__(
+        self,
+        socket_path: str | None = None,
+        timeout_s: float | None = None,
+        connect_timeout_s: float | None = None,
+        **kwargs,
+    ):
+        self.socket_path = socket_path or settings.embedding_server_socket
+        self.timeout_s = settings.embedding_server_timeout_s if timeout_s is None else timeout_s
+        self._local = threading.local()
+
+        # Wait for the server (it may still be loading the model)
+        connect_timeout_s = (
+            settings.embedding_server_connect_timeout_s if connect_timeout_s is None else connect_timeout_s
+        )
+        deadline = time.monotonic() + connect_timeout_s
+        while True:
+            try:
+                info, _ = self._call({"op": "info"})
+                break
+            except _RECONNECT_ERRORS:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.5)
+        self.server_backend = info["backend"]
+        self.server_fingerprint = info.get("fingerprint")
+        super().__init__(info["model_name"], **kwargs)
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout_s)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _call(self, header: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        # One retry on a fresh connection covers a server restart
+        for attempt in (0, 1):
+            try:
+                sock = self._connection()
+                send_message(sock, header)
+                reply, body = recv_message(sock)
+                break
+            except _RECONNECT_ERRORS:
+                self._drop_connection()
+                if attempt:
+                    raise
+            except BaseException:
+                # A timeout or bad frame leaves the stream mid-message; never reuse it
+                self._drop_connection()
+                raise
+        if "error" in reply:
+            raise RuntimeError(f"Embedding server error: {reply['error']}")
+        return reply, body
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        reply, body = self._call({"op": "embed", "texts": list(texts)})
+        # Copy: frombuffer arrays are read-only
+        return np.frombuffer(body, dtype=np.float32).reshape(reply["shape"]).copy()
+
+    def fingerprint(self) -> dict:
+        # The server's model produces the vectors, not this client
+        return self.server_fingerprint or {"model_name": self.model_name, "backend": self.server_backend}
+
+    def stats(self) -> dict:
+        out = super().stats()
+        try:
+            out["server"], _ = self._call({"op": "stats"})
+        except (OSError, RuntimeError) as exc:
+            out["server"] = {"error": type(exc).__name__}
+        return out
+
+    def close(self):
+        super().close()
+        self._drop_connection()
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve embeddings to all API workers of this node over a Unix socket."
+    )
+    parser.add_argument("--socket", default=settings.embedding_server_socket or "/tmp/medrag-embed.sock")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.threads and settings.embedding_backend.lower() == "torch":
+        import torch
+
+        torch.set_num_threads(args.threads)
+    # Local model even if EMBEDDING_SERVER_SOCKET is set (it is shared with the workers)
+    model = build_local_embedding_model()
+    server = EmbeddingServer(args.socket, model)
+    # SIGTERM (docker stop) unwinds like Ctrl-C, so the socket file is removed
+    signal.signal(signal.SIGTERM, _interrupt)
+    logger.info("embedding_server_ready socket=%s model=%s backend=%s", args.socket, model.model_name, model.backend)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        model.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import json
+import os
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Any
+
+from app.config import settings
+from app.data_ingest.text_loader import iter_text_files, load_text_files
+from app.data_ingest.chunking import chunk_documents
+from app.data_ingest.manifest import IngestManifest, content_hash
+from app.db.index_registry import UNVERSIONED, IndexRegistry, version_dir
+from app.db.metadata_index import TAG_PREFIX
+
+
+@dataclass
+class IngestReport:
+    docs_scanned: int = 0
+    docs_unchanged: int = 0
+    docs_changed: int = 0
+    docs_removed: int = 0
+    chunks_unchanged: int = 0
+    chunks_embedded: int = 0
+    chunks_reused: int = 0
+    chunks_deleted: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def default_manifest_path() -> str:
+    if settings.ingest_manifest_path:
+        return settings.ingest_manifest_path
+    # Each index version has its own manifest; the active one describes the live store
+    active = IndexRegistry().active
+    if active and active != UNVERSIONED:
+        return str(version_dir(active) / "ingest_manifest.json")
+    index_dir = settings.mmap_index_dir if settings.vector_backend == "mmap" else settings.chroma_dir
+    return os.path.join(index_dir, "ingest_manifest.json")
+
+
+def _doc_key(doc: Dict[str, Any]) -> str:
+    # Same key chunk_documents uses to build chunk_uids
+    metadata = doc.get("metadata", {})
+    return metadata.get("filename", metadata.get("source", "unknown_source"))
+
+
+def _labels(doc: Dict[str, Any]) -> str:
+    labels = {
+        k: v for k, v in doc.get("metadata", {}).items() if k == "doc_type" or k.startswith(TAG_PREFIX)
+    }
+    return json.dumps(labels, sort_keys=True) if labels else ""
+
+
+def _hash(text: str, labels: str) -> str:
+    # Labels are part of the hash, so relabelling a document re-ingests its chunks
+    # with the new metadata; unlabelled documents keep their plain content hash
+    return content_hash(text + "\0" + labels) if labels else content_hash(text)
+
+
+def ingest_config(embedder, chunk_size: int, chunk_overlap: int) -> Dict[str, Any]:
+    return {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, **embedder.fingerprint()}
+
+
+def _manifest_entry(doc: Dict[str, Any], chunk_size: int, chunk_overlap: int) -> Dict[str, Any]:
+    labels = _labels(doc)
+    return {
+        "hash": _hash(doc["content"], labels),
+        "chunks": {
+            chunk["metadata"]["chunk_uid"]: _hash(chunk["content"], labels)
+            for chunk in chunk_documents([doc], chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        },
+    }
+
+
+def sync_manifest(
+    directory: str,
+    store,
+    embedder,
+    manifest_path: str | None = None,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+) -> int:
+    """
+    After an ingest that wrote every document of `directory` without going
+    through incremental_ingest (a full or streaming ingest): rewrite the
+    manifest to describe exactly those documents, and delete store chunks
+    that none of them produced. The next incremental run then diffs
+    against what the store really holds. Returns the number of deleted chunks.
+
+    Documents are read one at a time, so memory stays bounded by the manifest.
+    """
+    manifest = IngestManifest(
+        manifest_path or default_manifest_path(), ingest_config(embedder, chunk_size, chunk_overlap)
+    )
+    for doc in iter_text_files(directory):
+        manifest.documents[_doc_key(doc)] = _manifest_entry(doc, chunk_size, chunk_overlap)
+
+    current = {uid for entry in manifest.documents.values() for uid in entry["chunks"]}
+    stale = [cid for cid in store.list_ids() if cid not in current]
+    if stale:
+        store.delete_ids(stale)
+        store.bump_index_version()
+    manifest.save()
+    return len(stale)
+
+
+def incremental_ingest(
+    directory: str,
+    store,
+    embedder,
+    manifest_path: str | None = None,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    embed_batch_size: int = 64,
+) -> IngestReport:
+    """
+    Bring the vector store in line with `directory`, touching only what changed.
+
+    - Documents whose content hash matches the manifest are skipped without chunking.
+    - For changed documents, chunks whose (uid, content hash) is unchanged are left
+      alone, chunks whose content moved to another uid reuse the stored embedding,
+      and only genuinely new text is embedded.
+    - Chunks (and documents) that no longer exist are deleted.
+
+    Writes are bulk upserts, so re-running is idempotent.
+    """
+    manifest_path = manifest_path or default_manifest_path()
+    manifest = IngestManifest.load(manifest_path)
+    config = ingest_config(embedder, chunk_size, chunk_overlap)
+    to_delete: List[str] = []
+    if manifest.config != config:
+        # Different chunking or model (name, backend, quantization): nothing in the old manifest can be trusted,
+        # so re-embed everything and drop whatever the new chunking doesn't rewrite
+        for entry in manifest.documents.values():
+            to_delete.extend(entry["chunks"])
+        manifest.documents = {}
+        manifest.config = config
+
+    report = IngestReport()
+    docs = load_text_files(directory)
+    report.docs_scanned = len(docs)
+
+    seen = set()
+    changed_docs = []
+    for doc in docs:
+        key = _doc_key(doc)
+        seen.add(key)
+        doc_hash = _hash(doc["content"], _labels(doc))
+        entry = manifest.documents.get(key)
+        if entry is not None and entry["hash"] == doc_hash:
+            report.docs_unchanged += 1
+            report.chunks_unchanged += len(entry["chunks"])
+            continue
+        changed_docs.append((key, doc_hash, doc))
+
+    for key in list(manifest.documents):
+        if key not in seen:
+            to_delete.extend(manifest.documents.pop(key)["chunks"])
+            report.docs_removed += 1
+
+    to_embed: List[Dict[str, Any]] = []
+    to_reuse: List[tuple] = []  # (old uid, chunk that can take its embedding)
+
+    for key, doc_hash, doc in changed_docs:
+        report.docs_changed += 1
+        labels = _labels(doc)
+        old_chunks: Dict[str, str] = manifest.documents.get(key, {}).get("chunks", {})
+        old_by_hash = {h: uid for uid, h in old_chunks.items()}
+
+        new_chunks: Dict[str, str] = {}
+        for chunk in chunk_documents([doc], chunk_size=chunk_size, chunk_overlap=chunk_overlap):
+            uid = chunk["metadata"]["chunk_uid"]
+            h = _hash(chunk["content"], labels)
+            new_chunks[uid] = h
+
+            if old_chunks.get(uid) == h:
+                report.chunks_unchanged += 1
+            elif h in old_by_hash:
+                to_reuse.append((old_by_hash[h], chunk))
+            else:
+                to_embed.append(chunk)
+
+        to_delete.extend(uid for uid in old_chunks if uid not in new_chunks)
+        manifest.documents[key] = {"hash": doc_hash, "chunks": new_chunks}
+
+    # Moved chunks: same text under a new uid, so the old vector is still valid
+    if to_reuse:
+        stored = store.get_embeddings(list(dict.fromkeys(uid for uid, _ in to_reuse)))
+        reused_chunks, reused_embeddings = [], []
+        for old_uid, chunk in to_reuse:
+            if old_uid in stored:
+                reused_chunks.append(chunk)
+                reused_embeddings.append(stored[old_uid])
+            else:
+                to_embed.append(chunk)
+        if reused_chunks:
+            store.upsert_documents(
+                reused_chunks,
+                reused_embeddings,
+                ids=[c["metadata"]["chunk_uid"] for c in reused_chunks],
+            )
+            report.chunks_reused = len(reused_chunks)
+
+    for start in range(0, len(to_embed), embed_batch_size):
+        batch = to_embed[start:start + embed_batch_size]
+        embeddings = embedder.embed_texts([c["content"] for c in batch])
+        store.upsert_documents(batch, embeddings, ids=[c["metadata"]["chunk_uid"] for c in batch])
+    report.chunks_embedded = len(to_embed)
+
+    # A uid can be both stale and rewritten (e.g. reused in place); keep the rewrite
+    written = {c["metadata"]["chunk_uid"] for c in to_embed}
+    written.update(c["metadata"]["chunk_uid"] for _, c in to_reuse)
+    stale = [uid for uid in dict.fromkeys(to_delete) if uid not in written]
+    if stale:
+        store.delete_ids(stale)
+    report.chunks_deleted = len(stale)
+
+    if report.docs_changed or report.docs_removed:
+        store.bump_index_version()
+    manifest.save()
+    return report
@@ -0,0 +1,48 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class IngestManifest:
+    """
+    Record of what is currently indexed: per-document content hashes and,
+    for each document, the content hash of every chunk it produced.
+
+    Layout:
+        {
+          "config": {"chunk_size": ..., "chunk_overlap": ..., "model_name": ...},
+          "documents": {
+            "<filename>": {"hash": "<sha256>", "chunks": {"<chunk_uid>": "<sha256>"}}
+          }
+        }
+    """
+
+    def __init__(self, path: str, config: Dict[str, Any] | None = None, documents: Dict[str, Any] | None = None):
+        self.path = path
+        self.config = config or {}
+        self.documents: Dict[str, Dict[str, Any]] = documents or {}
+
+    @classmethod
+    def load(cls, path: str) -> "IngestManifest":
+        p = Path(path)
+        if not p.exists():
+            return cls(path)
+        data = json.loads(p.read_text(encoding="utf-8"))
+        return cls(path, data.get("config"), data.get("documents"))
+
+    def save(self):
+        # Write-then-rename so a crash never leaves a truncated manifest
+        p = Path(self.path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(p.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps({"config": self.config, "documents": self.documents}, indent=1, sort_keys=True),
+            encoding="utf-8",
+        )
+        os.replace(tmp, p)
@@ -0,0 +1,159 @@
+import logging
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from app.config import settings
+from app.data_ingest.embedding import EmbeddingModel, DEFAULT_MODEL_NAME
+
+logger = logging.getLogger("medrag")
+
+
+def model_cache_dir(model_name: str, cache_dir: str | None = None) -> Path:
+    return Path(cache_dir or settings.onnx_cache_dir) / model_name.replace("/", "__")
+
+
+def export_onnx_model(
+    model_name: str = DEFAULT_MODEL_NAME,
+    cache_dir: str | None = None,
+    quantize: bool = False,
+    max_seq_length: int | None = None,
+) -> Path:
+    """
+    Export the transformer behind a SentenceTransformers model to ONNX (once)
+    and return the path of the graph to load. With quantize=True an int8
+    dynamically quantized copy is produced next to it.
+
+    Torch and transformers are only imported when an export is actually needed,
+    so serving from an existing cache never loads them.
+    """
+    out_dir = model_cache_dir(model_name, cache_dir)
+    fp32_path = out_dir / "model.onnx"
+    int8_path = out_dir / "model.int8.onnx"
+
+    if not fp32_path.exists() or not (out_dir / "tokenizer.json").exists():
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        logger.info("onnx_export model=%s dir=%s", model_name, out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        tokenizer.save_pretrained(out_dir)
+        model = AutoModel.from_pretrained(model_name).eval()
+
+        dummy = tokenizer(
+            ["export sample sentence"],
+            return_tensors="pt",
+            padding="max_length",
+            truncation=True,
+            max_length=max_seq_length or settings.onnx_max_seq_length,
+        )
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        tmp_path = out_dir / "model.onnx.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(dummy[name] for name in input_names),
+                str(tmp_path),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                dynamo=False,
+            )
+        tmp_path.replace(fp32_path)
+
+    if not quantize:
+        return fp32_path
+
+    if not int8_path.exists():
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError as exc:
+            raise RuntimeError(
+                "ONNX_QUANTIZE=true needs the 'onnx' package (pip install -r requirements.txt)"
+            ) from exc
+
+        logger.info("onnx_quantize model=%s", model_name)
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    return int8_path
+
+
+class OnnxEmbeddingModel(EmbeddingModel):
+    """
+    SentenceTransformers-compatible embeddings served by ONNX Runtime:
+    tokenizer -> transformer graph -> mean pooling -> L2 normalization
+    (the all-MiniLM-L6-v2 pipeline), optionally with int8 weights.
+    """
+
+    backend = "onnx"
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        cache_dir: str | None = None,
+        quantize: bool | None = None,
+        intra_op_threads: int | None = None,
+        inter_op_threads: int | None = None,
+        max_seq_length: int | None = None,
+        **kwargs,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        quantize = settings.onnx_quantize if quantize is None else quantize
+        intra_op_threads = settings.onnx_intra_op_threads if intra_op_threads is None else intra_op_threads
+        inter_op_threads = settings.onnx_inter_op_threads if inter_op_threads is None else inter_op_threads
+        self.max_seq_length = max_seq_length or settings.onnx_max_seq_length
+        self.quantized = quantize
+
+        model_path = export_onnx_model(model_name, cache_dir, quantize=quantize, max_seq_length=self.max_seq_length)
+
+        self.tokenizer = Tokenizer.from_file(str(model_path.parent / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads > 0:
+            options.inter_op_num_threads = inter_op_threads
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        super().__init__(model_name, **kwargs)
+
+    def fingerprint(self) -> dict:
+        return {**super().fingerprint(), "quantized": self.quantized}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        hidden = self.session.run(["last_hidden_state"], feeds)[0]
+
+        # Mean pooling over real tokens, then unit length (as SentenceTransformers does)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32, copy=False)
+
+    def stats(self) -> dict:
+        out = super().stats()
+        out["quantized"] = self.quantized
+        return out
@@ -0,0 +1,211 @@
+import json
+import os
+import resource
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.data_ingest.text_loader import iter_text_files
+from app.data_ingest.chunking import chunk_document
+
+
+@dataclass
+class PipelineProgress:
+    docs: int = 0
+    docs_skipped: int = 0
+    chunks: int = 0
+    embeddings: int = 0
+    written: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        return {
+            "docs": self.docs,
+            "docs_skipped": self.docs_skipped,
+            "chunks": self.chunks,
+            "embeddings": self.embeddings,
+            "written": self.written,
+            "elapsed_s": round(elapsed, 2),
+            "docs_per_s": round(self.docs / elapsed, 2),
+            "chunks_per_s": round(self.chunks / elapsed, 2),
+            "embeddings_per_s": round(self.embeddings / elapsed, 2),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class IngestCheckpoint:
+    """
+    Set of documents whose chunks are fully written, saved atomically after
+    every page so an interrupted run can resume where it stopped.
+    """
+
+    def __init__(self, path: str | None, config: Dict[str, Any]):
+        self.path = path
+        self.config = config
+        self.completed: set = set()
+        if path and Path(path).exists():
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+            if data.get("config") == config:
+                self.completed = set(data.get("completed", []))
+
+    def save(self):
+        if not self.path:
+            return
+        p = Path(self.path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(p.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps({"config": self.config, "completed": sorted(self.completed)}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, p)
+
+    def clear(self):
+        if self.path and Path(self.path).exists():
+            Path(self.path).unlink()
+
+
+def _doc_key(doc: Dict[str, Any]) -> str:
+    metadata = doc.get("metadata", {})
+    return metadata.get("filename", metadata.get("source", "unknown_source"))
+
+
+def streaming_ingest(
+    directory: str,
+    store,
+    embedder,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    workers: int = 0,
+    embed_batch_size: int = 64,
+    write_page_size: int = 512,
+    max_pending_docs: int | None = None,
+    checkpoint_path: str | None = None,
+    progress_every_s: float = 5.0,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> PipelineProgress:
+    """
+    Ingest `directory` with bounded memory:
+
+      load (generator) -> chunk (process pool) -> embed (fixed-size batches)
+      -> upsert (pages)
+
+    At most `max_pending_docs` documents are being chunked at any time and at
+    most one write page of chunks/embeddings is buffered, so peak memory does
+    not grow with corpus size. Documents are checkpointed once all of their
+    chunks are written; re-running with the same checkpoint skips them.
+    """
+    config = {"directory": str(directory), "chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+    checkpoint = IngestCheckpoint(checkpoint_path, config)
+    progress = PipelineProgress()
+    max_pending_docs = max_pending_docs or max(workers, 1) * 4
+    last_report = time.perf_counter()
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+
+    # Chunks waiting to be embedded, and embedded rows waiting to be written.
+    # Each chunk carries a global sequence number so a document can be
+    # checkpointed once everything up to its last chunk has been written.
+    embed_buf: List[Tuple[int, Dict[str, Any]]] = []
+    write_chunks: List[Dict[str, Any]] = []
+    write_vecs: List[np.ndarray] = []
+    write_last_seq = -1
+    doc_last_seq: Deque[Tuple[str, int]] = deque()
+    seq = 0
+
+    def report(force: bool = False):
+        nonlocal last_report
+        now = time.perf_counter()
+        if on_progress is not None and (force or now - last_report >= progress_every_s):
+            last_report = now
+            on_progress(progress.as_dict())
+
+    def flush_writes():
+        nonlocal write_chunks, write_vecs
+        if not write_chunks:
+            return
+        store.upsert_documents(
+            write_chunks,
+            np.vstack(write_vecs),
+            ids=[c["metadata"]["chunk_uid"] for c in write_chunks],
+            page_size=write_page_size,
+        )
+        progress.written += len(write_chunks)
+        write_chunks, write_vecs = [], []
+
+        while doc_last_seq and doc_last_seq[0][1] <= write_last_seq:
+            checkpoint.completed.add(doc_last_seq.popleft()[0])
+        checkpoint.save()
+
+    def flush_embeddings():
+        nonlocal embed_buf, write_last_seq
+        if not embed_buf:
+            return
+        vectors = embedder.embed_batch([c["content"] for _, c in embed_buf])
+        progress.embeddings += len(embed_buf)
+        write_chunks.extend(c for _, c in embed_buf)
+        write_vecs.append(vectors)
+        write_last_seq = embed_buf[-1][0]
+        embed_buf = []
+        if len(write_chunks) >= write_page_size:
+            flush_writes()
+
+    def accept(key: str, chunks: List[Dict[str, Any]]):
+        nonlocal seq
+        progress.docs += 1
+        progress.chunks += len(chunks)
+        for chunk in chunks:
+            embed_buf.append((seq, chunk))
+            seq += 1
+            if len(embed_buf) >= embed_batch_size:
+                flush_embeddings()
+
+        # Complete once everything up to its last chunk is written (for an
+        # empty document: once everything queued before it is written)
+        doc_last_seq.append((key, seq - 1))
+        report()
+
+    pending: Deque[Tuple[str, Future]] = deque()
+    try:
+        for doc in iter_text_files(directory):
+            key = _doc_key(doc)
+            if key in checkpoint.completed:
+                progress.docs_skipped += 1
+                continue
+
+            if pool is None:
+                accept(key, chunk_document(doc, chunk_size, chunk_overlap))
+                continue
+
+            # Backpressure: never hold more than max_pending_docs in flight
+            while len(pending) >= max_pending_docs:
+                done_key, fut = pending.popleft()
+                accept(done_key, fut.result())
+            pending.append((key, pool.submit(chunk_document, doc, chunk_size, chunk_overlap)))
+
+        while pending:
+            done_key, fut = pending.popleft()
+            accept(done_key, fut.result())
+
+        flush_embeddings()
+        flush_writes()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    if progress.written:
+        store.bump_index_version()
+    checkpoint.clear()
+    report(force=True)
+    return progress
@@ -1,5 +1,59 @@
+import json
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, List, Dict, Iterator
+
+from app.db.metadata_index import tag_key
+
+# Optional sidecar in the document directory assigning labels per file:
+#   {"Hand Hygiene.txt": {"doc_type": "guideline", "tags": ["infection-control"]}}
+LABELS_FILE = "metadata.json"
+
+
+def load_labels(directory: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Chunk metadata per filename from the directory's LABELS_FILE: doc_type
+    as is, and each tag as a boolean tag_<name> key, since Chroma metadata
+    values must be scalars. Empty if there is no sidecar.
+    """
+    path = Path(directory) / LABELS_FILE
+    if not path.exists():
+        return {}
+    labels = {}
+    for filename, entry in json.loads(path.read_text(encoding="utf-8")).items():
+        metadata: Dict[str, Any] = {tag_key(tag): True for tag in entry.get("tags", [])}
+        if entry.get("doc_type"):
+            metadata["doc_type"] = entry["doc_type"]
+        labels[filename] = metadata
+    return labels
+
+
+def iter_text_files(directory: str) -> Iterator[Dict]:
+    """
+    Lazily yield text files from the specified directory, one document at a
+    time, in a stable (sorted) order so interrupted runs can resume. Labels
+    from the directory's metadata.json (see load_labels) are added to the
+    metadata.
+
+    Args:
+        directory (str): The path to the directory containing text files.
+
+    Yields:
+        Dict: A dictionary containing 'content' and 'metadata'.
+    """
+    base_path = Path(directory)
+    labels = load_labels(directory)
+
+    for path in sorted(base_path.glob("*.txt")):
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        yield {
+            "content": text,
+            "metadata": {
+                "source": str(path),
+                "filename": path.name,
+                **labels.get(path.name, {}),
+            },
+        }
+
 
 def load_text_files(directory: str) -> List[Dict]:
     """
@@ -12,19 +66,4 @@ def load_text_files(directory: str) -> List[Dict]:
     Returns:
         List[Dict]: A list of dictionaries, each containing 'content' and 'metadata'.
     """
-    base_path = Path(directory)
-    docs = []
-
-    for path in base_path.glob("*.txt"):
-        text = path.read_text(encoding="utf-8", errors="ignore")
-        docs.append(
-            {
-                "content": text,
-                "metadata": {
-                    "source": str(path),
-                    "filename": path.name,
-                },
-            }
-        )
-
-    return docs
\ No newline at end of file
+    return list(iter_text_files(directory))
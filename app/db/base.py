@@ -0,0 +1,100 @@
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.db.metadata_index import Filters
+
+
+def new_index_version() -> str:
+    return f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+
+
+class VectorStore(ABC):
+    """
+    Interface shared by the vector store backends.
+
+    query / query_many return Chroma-style results: a dict with "ids",
+    "documents", "metadatas" and "distances", each a list with one inner
+    list per query vector. Distances are squared L2 (Chroma's default
+    "l2" space), so grounding thresholds mean the same on every backend.
+
+    `filters` (see app.db.metadata_index.normalize_filters) restricts a
+    query to chunks whose source_file / doc_type match any listed value and
+    that carry every listed tag.
+    """
+
+    @abstractmethod
+    def add_documents(
+        self,
+        docs: List[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]],
+        ids: Optional[List[str]] = None,
+    ):
+        ...
+
+    @abstractmethod
+    def upsert_documents(
+        self,
+        docs: List[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]],
+        ids: List[str],
+        page_size: int = 1000,
+    ):
+        ...
+
+    @abstractmethod
+    def delete_ids(self, ids: List[str], page_size: int = 1000):
+        ...
+
+    @abstractmethod
+    def get_embeddings(self, ids: List[str]) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def get_chunks(self, ids: List[str], embeddings: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        {id: {"document", "metadata", "embedding"}} for the ids that exist
+        (without "embedding" when embeddings=False).
+        """
+
+    @abstractmethod
+    def list_ids(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def query(self, query_embedding: Sequence[float], top_k: int = 5, filters: Optional[Filters] = None):
+        ...
+
+    @abstractmethod
+    def query_many(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        top_k: int = 5,
+        filters: Optional[Filters] = None,
+    ):
+        ...
+
+    @abstractmethod
+    def index_version(self) -> str | None:
+        ...
+
+    @abstractmethod
+    def bump_index_version(self) -> str:
+        ...
+
+    @abstractmethod
+    def drop(self):
+        """
+        Delete the store's data (used to garbage-collect old index versions).
+        """
+
+    def close(self):
+        """
+        Release what the store holds for serving (threads, connections) once
+        it is no longer served; the data is kept.
+        """
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+from app.config import settings
+from app.db.base import VectorStore
+from app.db.index_registry import UNVERSIONED, IndexRegistry, version_dir
+
+
+def build_vector_store(version: str | None = None) -> VectorStore:
+    """
+    Construct the backend selected by settings.vector_backend, sharded when
+    settings.vector_shards > 1. `version` names a registered index version;
+    by default the registry's active version is opened (or the unversioned
+    layout if no version was ever activated).
+    """
+    version = version or IndexRegistry().active
+    if version == UNVERSIONED:
+        version = None
+
+    if settings.vector_shards <= 1:
+        return build_shard(None, version)
+
+    from app.db.sharded_store import ShardedVectorStore
+
+    return ShardedVectorStore(
+        [build_shard(i, version) for i in range(settings.vector_shards)],
+        strategy=settings.shard_strategy.lower(),
+    )
+
+
+def build_shard(shard: int | None, version: str | None = None) -> VectorStore:
+    """
+    One store of the configured backend. Shard i lives in collection
+    <chroma_collection>_shard_<i> (chroma) or <mmap_index_dir>/shard_<i>
+    (mmap); None is the unsharded layout. A versioned store uses collection
+    <chroma_collection>__<version>[_shard_<i>] or the version's directory.
+    """
+    backend = settings.vector_backend.lower()
+
+    if backend == "chroma":
+        from app.db.vector_store import ChromaVectorStore
+
+        name = settings.chroma_collection if version is None else f"{settings.chroma_collection}__{version}"
+        return ChromaVectorStore(
+            collection_name=name if shard is None else f"{name}_shard_{shard}",
+            persist_directory=settings.chroma_dir,
+        )
+
+    if backend == "mmap":
+        from app.db.mmap_store import MmapVectorStore
+
+        index_dir = Path(settings.mmap_index_dir) if version is None else version_dir(version)
+        return MmapVectorStore(
+            index_dir=str(index_dir if shard is None else index_dir / f"shard_{shard}"),
+            dtype=settings.mmap_dtype,
+            quantization=settings.vector_quantization,
+            rescore_multiplier=settings.quantization_rescore_multiplier,
+        )
+
+    raise ValueError(f"Unknown vector_backend: {settings.vector_backend!r} (expected 'chroma' or 'mmap')")
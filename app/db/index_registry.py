@@ -0,0 +1,134 @@
+import fcntl
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from app.config import settings
+
+# Name of the pre-versioning layout (collection chroma_collection /
+# directory mmap_index_dir itself), so the first activation can roll back to it
+UNVERSIONED = "unversioned"
+
+
+def index_root() -> Path:
+    return Path(settings.mmap_index_dir if settings.vector_backend.lower() == "mmap" else settings.chroma_dir)
+
+
+def registry_path() -> Path:
+    return Path(settings.index_registry_path) if settings.index_registry_path else index_root() / "index_registry.json"
+
+
+def version_dir(name: str) -> Path:
+    # Per-version files: the ingest manifest, and for mmap the index itself
+    return index_root() / "versions" / name
+
+
+def new_version_name() -> str:
+    return f"v{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+class IndexRegistry:
+    """
+    Which index versions exist and which one is live, in a small JSON file
+    next to the index:
+
+        {
+          "active": "v20250101-120000-ab12cd",
+          "previous": "unversioned",
+          "versions": {"<name>": {"status": "building" | "ready" | "failed",
+                                  "created_at": ..., "count": ..., "validation": {...}}}
+        }
+
+    Every change is a locked read-modify-write followed by an atomic rename,
+    so the build script and the server can both update it.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path) if path else registry_path()
+
+    def read(self) -> Dict[str, Any]:
+        if not self.path.exists():
+            return {"active": None, "previous": None, "versions": {}}
+        return json.loads(self.path.read_text(encoding="utf-8"))
+
+    def mtime(self) -> int | None:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _update(self) -> Iterator[Dict[str, Any]]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = self.read()
+            yield data
+            tmp = self.path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(data, indent=1, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    @property
+    def active(self) -> str | None:
+        return self.read().get("active")
+
+    def get(self, name: str) -> Dict[str, Any] | None:
+        return self.read()["versions"].get(name)
+
+    def register(self, name: str, **info: Any):
+        with self._update() as data:
+            data["versions"][name] = {"status": "building", "created_at": time.time(), **info}
+
+    def update(self, name: str, **fields: Any):
+        with self._update() as data:
+            data["versions"][name].update(fields)
+
+    def activate(self, name: str) -> Dict[str, Any]:
+        with self._update() as data:
+            if name != UNVERSIONED:
+                entry = data["versions"].get(name)
+                if entry is None or entry["status"] != "ready":
+                    raise ValueError(f"Index version {name} is not ready")
+            if data.get("active") != name:
+                data["previous"] = data.get("active") or UNVERSIONED
+                data["active"] = name
+            return dict(data)
+
+    def rollback(self) -> Dict[str, Any]:
+        with self._update() as data:
+            if not data.get("previous"):
+                raise ValueError("No previous index version to roll back to")
+            data["active"], data["previous"] = data["previous"], data.get("active")
+            return dict(data)
+
+    def remove(self, name: str):
+        with self._update() as data:
+            data["versions"].pop(name, None)
+
+    def gc_candidates(self, keep: int, stale_build_s: float | None = None) -> List[str]:
+        """
+        Versions that may be deleted: everything except the active and
+        previous versions, builds still in progress, and the `keep` newest
+        ready versions. A build still "building" after `stale_build_s`
+        (default settings.index_stale_build_s) is taken as crashed.
+        """
+        stale_build_s = settings.index_stale_build_s if stale_build_s is None else stale_build_s
+        stale_before = time.time() - stale_build_s
+        data = self.read()
+        pinned = {data.get("active"), data.get("previous")}
+        ready = sorted(
+            (name for name, v in data["versions"].items() if v["status"] == "ready" and name not in pinned),
+            key=lambda name: data["versions"][name]["created_at"],
+            reverse=True,
+        )
+        failed = [
+            name
+            for name, v in data["versions"].items()
+            if name not in pinned
+            and (v["status"] == "failed" or (v["status"] == "building" and v["created_at"] < stale_before))
+        ]
+        return ready[max(keep, 0):] + failed
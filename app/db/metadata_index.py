@@ -0,0 +1,169 @@
+import json
+from functools import reduce
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Request filter name -> chunk metadata key; every field matches any of its values
+FILTER_FIELDS = {"source_file": "filename", "doc_type": "doc_type"}
+
+# Tags are stored as boolean keys (Chroma metadata values must be scalars);
+# a filter's tags must all be present
+TAG_PREFIX = "tag_"
+
+Filters = Dict[str, List[str]]
+
+_FIELD_KEYS = frozenset(FILTER_FIELDS.values())
+
+
+def tag_key(tag: str) -> str:
+    return f"{TAG_PREFIX}{tag}"
+
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Optional[Filters]:
+    """
+    Canonical form of a filter: known fields only, empty lists dropped,
+    values deduplicated and sorted (so equal filters give equal cache keys).
+    None when nothing is left to filter on.
+    """
+    if not filters:
+        return None
+    out: Filters = {}
+    for name in (*FILTER_FIELDS, "tags"):
+        values = filters.get(name)
+        if isinstance(values, str):
+            values = [values]
+        if values:
+            out[name] = sorted(set(values))
+    return out or None
+
+
+def filter_key(filters: Optional[Filters]) -> str:
+    return json.dumps(filters, sort_keys=True) if filters else ""
+
+
+def matches(metadata: Dict[str, Any], filters: Optional[Filters]) -> bool:
+    if not filters:
+        return True
+    for name, key in FILTER_FIELDS.items():
+        if name in filters and metadata.get(key) not in filters[name]:
+            return False
+    return all(metadata.get(tag_key(t)) is True for t in filters.get("tags", ()))
+
+
+def chroma_where(filters: Filters) -> Dict[str, Any]:
+    conditions: List[Dict[str, Any]] = [
+        {key: {"$in": filters[name]}} for name, key in FILTER_FIELDS.items() if name in filters
+    ]
+    conditions.extend({tag_key(t): {"$eq": True}} for t in filters.get("tags", ()))
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+class MetadataIndex:
+    """
+    Inverted index from (metadata key, value) to the positions of the chunks
+    carrying it, built once per index version. Resolving a filter is a few
+    sorted-array unions and intersections, so a selective filter yields its
+    small candidate set without touching the vectors.
+    """
+
+    def __init__(self, metadatas: Iterable[Dict[str, Any]] = ()):
+        self.size = 0
+        self.postings: Dict[tuple, np.ndarray] = {}
+        self._pending: Dict[tuple, List[int]] = {}
+        for metadata in metadatas:
+            self.add(metadata)
+        self.finish()
+
+    def add(self, metadata: Optional[Dict[str, Any]]):
+        """
+        Index the next chunk's metadata (position self.size). Call finish()
+        before resolving filters.
+        """
+        pos = self.size
+        self.size += 1
+        for key, value in (metadata or {}).items():
+            if key in _FIELD_KEYS:
+                self._pending.setdefault((key, value), []).append(pos)
+            elif key.startswith(TAG_PREFIX) and value is True:
+                self._pending.setdefault((key, True), []).append(pos)
+
+    def finish(self):
+        for k, v in self._pending.items():
+            added = np.asarray(v, dtype=np.int64)
+            self.postings[k] = np.concatenate([self.postings[k], added]) if k in self.postings else added
+        self._pending = {}
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        CSR form for np.savez: posting i is positions[offsets[i]:offsets[i + 1]]
+        for the i-th (key, value) in the JSON `keys`.
+        """
+        keys = list(self.postings)
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum([len(self.postings[k]) for k in keys], out=offsets[1:])
+        positions = np.concatenate([self.postings[k] for k in keys]) if keys else np.zeros(0, dtype=np.int64)
+        return {
+            "filter_keys": np.frombuffer(json.dumps([list(k) for k in keys]).encode("utf-8"), dtype=np.uint8),
+            "filter_offsets": offsets,
+            "filter_positions": positions,
+            "filter_size": np.asarray([self.size], dtype=np.int64),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "MetadataIndex":
+        index = cls()
+        keys = json.loads(arrays["filter_keys"].tobytes().decode("utf-8"))
+        offsets, positions = arrays["filter_offsets"], arrays["filter_positions"]
+        index.size = int(arrays["filter_size"][0])
+        index.postings = {tuple(k): positions[offsets[i]:offsets[i + 1]] for i, k in enumerate(keys)}
+        return index
+
+    def _posting(self, key: str, value: Any) -> np.ndarray:
+        return self.postings.get((key, value), np.zeros(0, dtype=np.int64))
+
+    def positions(self, filters: Filters) -> np.ndarray:
+        """
+        Sorted positions of the chunks matching `filters`.
+        """
+        sets: List[np.ndarray] = []
+        for name, key in FILTER_FIELDS.items():
+            if name in filters:
+                sets.append(reduce(np.union1d, (self._posting(key, v) for v in filters[name])))
+        sets.extend(self._posting(tag_key(t), True) for t in filters.get("tags", ()))
+        if not sets:
+            return np.arange(self.size, dtype=np.int64)
+        return reduce(np.intersect1d, sorted(sets, key=len))
+
+
+def exact_top_k(
+    query_embeddings: Sequence[Sequence[float]],
+    ids: List[str],
+    vectors: np.ndarray,
+    documents: List[str],
+    metadatas: List[Dict[str, Any]],
+    top_k: int,
+) -> Dict[str, List[List[Any]]]:
+    """
+    Brute-force squared L2 search over a small candidate set, as a
+    Chroma-style result. Used instead of a filtered ANN search when a filter
+    leaves few candidates: it is exact, and the distances are the ones the
+    store itself would report.
+    """
+    results: Dict[str, List[List[Any]]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+    if not ids:
+        for key in results:
+            results[key] = [[] for _ in query_embeddings]
+        return results
+    queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    for q in queries:
+        # Difference form rather than |q|^2 - 2q.v + |v|^2, which loses precision
+        diff = vectors - q
+        distances = np.einsum("ij,ij->i", diff, diff)
+        order = np.argsort(distances, kind="stable")[:top_k]
+        results["ids"].append([ids[i] for i in order])
+        results["documents"].append([documents[i] for i in order])
+        results["metadatas"].append([metadatas[i] for i in order])
+        results["distances"].append([float(distances[i]) for i in order])
+    return results
@@ -0,0 +1,712 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.db.base import VectorStore, new_index_version
+from app.db import quantization as quant
+from app.db.metadata_index import Filters, MetadataIndex
+
+
+DTYPES = {"float32": np.float32, "float16": np.float16}
+
+# Rows scored per block; bounds the temporary float32 score matrix
+SCAN_BLOCK_ROWS = 65536
+
+# Compact once this fraction of stored rows is dead (overwritten or deleted)
+COMPACT_DEAD_FRACTION = 0.25
+COMPACT_MIN_ROWS = 1024
+
+SQL_PAGE = 500
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class MmapVectorStore(VectorStore):
+    """
+    In-process vector index backed by memory-mapped files.
+
+    Layout of `index_dir`:
+        manifest.json              generation, dim, dtype, row count, live mask file, index version
+        vectors.<gen>.bin          contiguous (rows, dim) matrix of L2-normalized embeddings
+        live.<gen>.<n>.bin         one byte per row: 1 if the row is the current version of its id
+        codes.<gen>.bin            optional int8 / 1-bit codes of the same rows (quantized mode)
+        meta.sqlite                ids, documents and metadata per (generation, row)
+
+    Startup only maps the files, so several uvicorn workers share one copy
+    through the page cache. Writes append rows and publish a new manifest
+    atomically; readers notice the new manifest within `refresh_interval_s`.
+    Search is an exact blockwise matrix product plus argpartition. Cosine
+    similarity s is reported as squared L2 distance 2 - 2s, which is what
+    Chroma's default space returns for unit vectors.
+
+    With quantization "int8" or "binary", a compact code matrix is scanned
+    first (int8 dot product or Hamming distance) and only the best
+    top_k * rescore_multiplier rows are rescored against the full-precision
+    vectors, which stay on disk and are paged in only for that shortlist.
+
+    Metadata filters resolve to row numbers through an in-memory metadata
+    index (one per generation and row count). A selective filter scores
+    just its rows; a broad one runs the usual scan with the filter folded
+    into the live mask.
+    """
+
+    def __init__(
+        self,
+        index_dir: str | None = None,
+        dtype: str | None = None,
+        refresh_interval_s: float = 1.0,
+        quantization: str | None = None,
+        rescore_multiplier: int | None = None,
+    ):
+        self.index_dir = Path(index_dir or settings.mmap_index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.dtype_name = dtype or settings.mmap_dtype
+        if self.dtype_name not in DTYPES:
+            raise ValueError(f"Unsupported mmap dtype: {self.dtype_name}")
+        self.refresh_interval_s = refresh_interval_s
+        self.quantization = quantization or settings.vector_quantization
+        if self.quantization not in quant.MODES:
+            raise ValueError(f"Unsupported quantization: {self.quantization}")
+        self.rescore_multiplier = max(
+            1, rescore_multiplier or settings.quantization_rescore_multiplier
+        )
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._manifest_mtime: int | None = None
+        self._checked_at = 0.0
+        # ((generation, rows), MetadataIndex over row numbers), built on the first filtered query
+        self._filter_index = None
+        self._filter_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            " gen INTEGER NOT NULL, row INTEGER NOT NULL,"
+            " id TEXT NOT NULL, document TEXT, metadata TEXT,"
+            " PRIMARY KEY (gen, row))"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS live (id TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        conn.commit()
+
+        self._load()
+
+    # ------------------------------------------------------------------ files
+
+    @property
+    def _manifest_path(self) -> Path:
+        return self.index_dir / "manifest.json"
+
+    def _vectors_path(self, gen: int) -> Path:
+        return self.index_dir / f"vectors.{gen}.bin"
+
+    def _codes_path(self, gen: int) -> Path:
+        return self.index_dir / f"codes.{gen}.bin"
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_dir / "meta.sqlite")
+            self._local.conn = conn
+        return conn
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        if not self._manifest_path.exists():
+            return {
+                "generation": 0,
+                "dim": None,
+                "dtype": self.dtype_name,
+                "rows": 0,
+                "live_rows": 0,
+                "live_file": None,
+                "index_version": None,
+                "quantization": "none",
+                "int8_scale": None,
+            }
+        return json.loads(self._manifest_path.read_text(encoding="utf-8"))
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        tmp = self._manifest_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(tmp, self._manifest_path)
+
+    def _load(self):
+        manifest = self._read_manifest()
+        vectors = live = codes = None
+        if manifest["rows"] and manifest["dim"]:
+            shape = (manifest["rows"], manifest["dim"])
+            vectors = np.memmap(
+                self._vectors_path(manifest["generation"]),
+                dtype=DTYPES[manifest["dtype"]],
+                mode="r",
+                shape=shape,
+            )
+            live = np.memmap(
+                self.index_dir / manifest["live_file"], dtype=np.bool_, mode="r", shape=(shape[0],)
+            )
+            mode = manifest.get("quantization", "none")
+            if mode != "none":
+                dtype, cols = quant.code_shape(mode, manifest["dim"])
+                codes = np.memmap(
+                    self._codes_path(manifest["generation"]), dtype=dtype, mode="r", shape=(shape[0], cols)
+                )
+        self._snapshot = {"manifest": manifest, "vectors": vectors, "live": live, "codes": codes}
+        try:
+            self._manifest_mtime = os.stat(self._manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            self._manifest_mtime = None
+
+    def _current(self) -> Dict[str, Any]:
+        """
+        Return the current snapshot, re-mapping the files if another process
+        published a new manifest since the last check.
+        """
+        now = time.monotonic()
+        if now - self._checked_at >= self.refresh_interval_s:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self._manifest_path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self._manifest_mtime:
+                self._load()
+        return self._snapshot
+
+    def _write_live_mask(self, manifest: Dict[str, Any], mask: np.ndarray) -> str:
+        # Always a fresh file: readers may still be mapping the previous one
+        name = f"live.{manifest['generation']}.{uuid.uuid4().hex[:12]}.bin"
+        mask.astype(np.bool_).tofile(self.index_dir / name)
+        return name
+
+    def _remove_stale_files(self, keep: set):
+        for path in self.index_dir.glob("*.bin"):
+            if path.name not in keep:
+                # Open mappings in other processes stay valid after unlink
+                path.unlink(missing_ok=True)
+
+    # ----------------------------------------------------------------- writes
+
+    def add_documents(
+        self,
+        docs: List[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]],
+        ids: Optional[List[str]] = None,
+    ):
+        if ids is None:
+            ids = [f"doc_{i}" for i in range(len(docs))]
+        self.upsert_documents(docs, embeddings, ids)
+        self.bump_index_version()
+
+    def upsert_documents(
+        self,
+        docs: List[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]],
+        ids: List[str],
+        page_size: int = 1000,
+    ):
+        if not ids:
+            return
+        vectors = l2_normalize(np.asarray(embeddings, dtype=np.float32))
+
+        with self._write_lock:
+            manifest = self._read_manifest()
+            if manifest["dim"] is None:
+                manifest["dim"] = int(vectors.shape[1])
+                manifest["dtype"] = self.dtype_name
+            elif vectors.shape[1] != manifest["dim"]:
+                raise ValueError(
+                    f"Embedding dim {vectors.shape[1]} does not match index dim {manifest['dim']}"
+                )
+            if manifest.get("quantization", "none") != self.quantization:
+                self._rebuild_codes(manifest, sample=vectors)
+
+            gen = manifest["generation"]
+            start = manifest["rows"]
+            dtype = DTYPES[manifest["dtype"]]
+            _write_rows(
+                self._vectors_path(gen),
+                start * manifest["dim"] * np.dtype(dtype).itemsize,
+                vectors.astype(dtype).tobytes(),
+            )
+            if manifest["quantization"] != "none":
+                code_dtype, cols = quant.code_shape(manifest["quantization"], manifest["dim"])
+                _write_rows(
+                    self._codes_path(gen),
+                    start * cols * np.dtype(code_dtype).itemsize,
+                    quant.encode(manifest["quantization"], vectors, manifest["int8_scale"]).tobytes(),
+                )
+
+            conn = self._conn()
+            try:
+                old_rows = self._live_rows(conn, ids)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO rows (gen, row, id, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (gen, start + i, cid, doc["content"], json.dumps(doc.get("metadata", {})))
+                        for i, (cid, doc) in enumerate(zip(ids, docs))
+                    ),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO live (id, row) VALUES (?, ?)",
+                    ((cid, start + i) for i, cid in enumerate(ids)),
+                )
+
+                mask = np.zeros(start + len(ids), dtype=np.bool_)
+                mask[:start] = self._snapshot_mask(manifest)
+                mask[list(old_rows.values())] = False
+                # With duplicate ids in one call, only the last occurrence is live
+                mask[list(self._live_rows(conn, ids).values())] = True
+                conn.commit()
+            except BaseException:
+                # Unpublished rows are overwritten by the next upsert (see _write_rows)
+                conn.rollback()
+                raise
+
+            self._publish(manifest, mask)
+
+    def _rebuild_codes(self, manifest: Dict[str, Any], sample: np.ndarray):
+        """
+        Switch the index to self.quantization, re-encoding any existing rows.
+        Called by the writer when the configured mode differs from the one on disk.
+        """
+        mode = self.quantization
+        gen = manifest["generation"]
+        existing = None
+        if manifest["rows"]:
+            existing = np.memmap(
+                self._vectors_path(gen),
+                dtype=DTYPES[manifest["dtype"]],
+                mode="r",
+                shape=(manifest["rows"], manifest["dim"]),
+            )
+
+        manifest["quantization"] = mode
+        manifest["int8_scale"] = None
+        if mode == "none":
+            return
+        if mode == "int8":
+            calib = np.asarray(existing[:SCAN_BLOCK_ROWS], dtype=np.float32) if existing is not None else sample
+            manifest["int8_scale"] = quant.int8_scale_for(calib)
+
+        with open(self._codes_path(gen), "wb") as f:
+            if existing is not None:
+                for start in range(0, existing.shape[0], SCAN_BLOCK_ROWS):
+                    block = np.asarray(existing[start:start + SCAN_BLOCK_ROWS], dtype=np.float32)
+                    f.write(quant.encode(mode, block, manifest["int8_scale"]).tobytes())
+
+    def delete_ids(self, ids: List[str], page_size: int = 1000):
+        if not ids:
+            return
+        with self._write_lock:
+            manifest = self._read_manifest()
+            conn = self._conn()
+            old_rows = self._live_rows(conn, ids)
+            if not old_rows:
+                return
+            for page in _pages(list(old_rows), SQL_PAGE):
+                conn.execute(
+                    f"DELETE FROM live WHERE id IN ({','.join('?' * len(page))})", page
+                )
+            conn.commit()
+
+            mask = np.array(self._snapshot_mask(manifest), dtype=np.bool_)
+            mask[list(old_rows.values())] = False
+            self._publish(manifest, mask)
+
+    def _snapshot_mask(self, manifest: Dict[str, Any]) -> np.ndarray:
+        if not manifest["rows"]:
+            return np.zeros(0, dtype=np.bool_)
+        return np.fromfile(self.index_dir / manifest["live_file"], dtype=np.bool_, count=manifest["rows"])
+
+    def _publish(self, manifest: Dict[str, Any], mask: np.ndarray):
+        manifest["rows"] = int(mask.shape[0])
+        manifest["live_rows"] = int(mask.sum())
+        manifest["live_file"] = self._write_live_mask(manifest, mask)
+        self._write_manifest(manifest)
+
+        dead = manifest["rows"] - manifest["live_rows"]
+        if manifest["rows"] >= COMPACT_MIN_ROWS and dead > COMPACT_DEAD_FRACTION * manifest["rows"]:
+            self._compact(manifest, mask)
+        else:
+            self._remove_stale_files(self._current_files(manifest))
+        self._load()
+
+    def _current_files(self, manifest: Dict[str, Any]) -> set:
+        gen = manifest["generation"]
+        files = {f"vectors.{gen}.bin", manifest["live_file"]}
+        if manifest.get("quantization", "none") != "none":
+            files.add(f"codes.{gen}.bin")
+        return files
+
+    def _compact(self, manifest: Dict[str, Any], mask: np.ndarray):
+        """
+        Rewrite only the live rows into a new generation. The previous
+        generation's metadata rows are kept until the next compaction so
+        readers still mapped to it can finish their queries.
+        """
+        old_gen = manifest["generation"]
+        new_gen = old_gen + 1
+        live_rows = np.flatnonzero(mask)
+        dtype = DTYPES[manifest["dtype"]]
+        old_vectors = np.memmap(
+            self._vectors_path(old_gen), dtype=dtype, mode="r", shape=(manifest["rows"], manifest["dim"])
+        )
+
+        with open(self._vectors_path(new_gen), "wb") as f:
+            for page in _pages(live_rows, SCAN_BLOCK_ROWS):
+                f.write(np.asarray(old_vectors[page]).tobytes())
+
+        mode = manifest.get("quantization", "none")
+        if mode != "none":
+            code_dtype, cols = quant.code_shape(mode, manifest["dim"])
+            old_codes = np.memmap(
+                self._codes_path(old_gen), dtype=code_dtype, mode="r", shape=(manifest["rows"], cols)
+            )
+            with open(self._codes_path(new_gen), "wb") as f:
+                for page in _pages(live_rows, SCAN_BLOCK_ROWS):
+                    f.write(np.asarray(old_codes[page]).tobytes())
+
+        conn = self._conn()
+        for offset, page in enumerate(_pages(live_rows.tolist(), SQL_PAGE)):
+            base = offset * SQL_PAGE
+            fetched = {
+                row: (cid, doc, meta)
+                for row, cid, doc, meta in conn.execute(
+                    f"SELECT row, id, document, metadata FROM rows WHERE gen = ? AND row IN ({','.join('?' * len(page))})",
+                    [old_gen, *page],
+                )
+            }
+            conn.executemany(
+                "INSERT OR REPLACE INTO rows (gen, row, id, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                ((new_gen, base + i, *fetched[row]) for i, row in enumerate(page)),
+            )
+            conn.executemany(
+                "UPDATE live SET row = ? WHERE id = ?",
+                ((base + i, fetched[row][0]) for i, row in enumerate(page)),
+            )
+        conn.execute("DELETE FROM rows WHERE gen < ?", (old_gen,))
+        conn.commit()
+
+        manifest["generation"] = new_gen
+        new_mask = np.ones(len(live_rows), dtype=np.bool_)
+        manifest["rows"] = int(len(live_rows))
+        manifest["live_rows"] = int(len(live_rows))
+        manifest["live_file"] = self._write_live_mask(manifest, new_mask)
+        self._write_manifest(manifest)
+        self._remove_stale_files(self._current_files(manifest))
+
+    def bump_index_version(self) -> str:
+        with self._write_lock:
+            manifest = self._read_manifest()
+            manifest["index_version"] = new_index_version()
+            self._write_manifest(manifest)
+            self._load()
+            return manifest["index_version"]
+
+    def drop(self):
+        # Readers that still map the files keep working until they let go
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+
+    # ------------------------------------------------------------------ reads
+
+    def _live_rows(self, conn: sqlite3.Connection, ids: List[str]) -> Dict[str, int]:
+        found: Dict[str, int] = {}
+        for page in _pages(list(dict.fromkeys(ids)), SQL_PAGE):
+            found.update(
+                conn.execute(
+                    f"SELECT id, row FROM live WHERE id IN ({','.join('?' * len(page))})", page
+                ).fetchall()
+            )
+        return found
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, Any]:
+        snap = self._current()
+        if snap["vectors"] is None or not ids:
+            return {}
+        rows = self._live_rows(self._conn(), ids)
+        n = snap["vectors"].shape[0]
+        return {
+            cid: np.asarray(snap["vectors"][row], dtype=np.float32)
+            for cid, row in rows.items()
+            if row < n
+        }
+
+    def get_chunks(self, ids: List[str], embeddings: bool = True) -> Dict[str, Dict[str, Any]]:
+        snap = self._current()
+        if snap["vectors"] is None or not ids:
+            return {}
+        n = snap["vectors"].shape[0]
+        rows = {cid: row for cid, row in self._live_rows(self._conn(), ids).items() if row < n}
+        fetched = self._fetch_rows(snap["manifest"]["generation"], np.asarray(list(rows.values()), dtype=np.int64))
+        chunks = {}
+        for cid, row in rows.items():
+            if row in fetched:
+                chunks[cid] = {"document": fetched[row][1], "metadata": fetched[row][2]}
+                if embeddings:
+                    chunks[cid]["embedding"] = np.asarray(snap["vectors"][row], dtype=np.float32)
+        return chunks
+
+    def list_ids(self) -> List[str]:
+        return [cid for (cid,) in self._conn().execute("SELECT id FROM live")]
+
+    def count(self) -> int:
+        return int(self._current()["manifest"]["live_rows"])
+
+    def index_version(self) -> str | None:
+        return self._current()["manifest"].get("index_version")
+
+    def query(self, query_embedding: Sequence[float], top_k: int = 5, filters: Optional[Filters] = None):
+        return self.query_many([query_embedding], top_k=top_k, filters=filters)
+
+    def query_many(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        top_k: int = 5,
+        filters: Optional[Filters] = None,
+    ):
+        snap = self._current()
+        m = len(query_embeddings)
+        results: Dict[str, List[List[Any]]] = {
+            "ids": [[] for _ in range(m)],
+            "documents": [[] for _ in range(m)],
+            "metadatas": [[] for _ in range(m)],
+            "distances": [[] for _ in range(m)],
+        }
+        if snap["vectors"] is None or m == 0:
+            return results
+
+        queries = l2_normalize(np.asarray(query_embeddings, dtype=np.float32).reshape(m, -1))
+        candidates = self._filter_rows(snap, filters) if filters else None
+        k = min(top_k, int(snap["manifest"]["live_rows"]) if candidates is None else len(candidates))
+        if k <= 0:
+            return results
+
+        if candidates is not None and len(candidates) <= settings.filter_exact_scan_max:
+            scores, rows = self._top_k_rows(snap["vectors"], candidates, queries, k)
+        else:
+            if candidates is not None:
+                mask = np.zeros(snap["vectors"].shape[0], dtype=np.bool_)
+                mask[candidates] = True
+                snap = dict(snap, live=mask)
+            if snap["codes"] is not None:
+                scores, rows = self._top_k_quantized(snap, queries, k)
+            else:
+                scores, rows = self._top_k(snap["vectors"], snap["live"], queries, k)
+        docs = self._fetch_rows(snap["manifest"]["generation"], rows)
+
+        for j in range(m):
+            for s, row in zip(scores[:, j], rows[:, j]):
+                if not np.isfinite(s):
+                    continue
+                cid, document, metadata = docs[int(row)]
+                results["ids"][j].append(cid)
+                results["documents"][j].append(document)
+                results["metadatas"][j].append(metadata)
+                results["distances"][j].append(max(0.0, 2.0 - 2.0 * float(s)))
+        return results
+
+    def _filter_rows(self, snap: Dict[str, Any], filters: Filters) -> np.ndarray:
+        """
+        Live rows matching `filters`, sorted. Rows of a generation are
+        append-only, so the metadata index is rebuilt only when rows are
+        added or the index is compacted.
+        """
+        manifest = snap["manifest"]
+        key = (manifest["generation"], manifest["rows"])
+        with self._filter_lock:
+            if self._filter_index is None or self._filter_index[0] != key:
+                metadatas: List[Dict[str, Any]] = [{}] * manifest["rows"]
+                for row, metadata in self._conn().execute(
+                    "SELECT row, metadata FROM rows WHERE gen = ? AND row < ?", key
+                ):
+                    metadatas[row] = json.loads(metadata) if metadata else {}
+                self._filter_index = (key, MetadataIndex(metadatas))
+            index = self._filter_index[1]
+        rows = index.positions(filters)
+        return rows[np.asarray(snap["live"])[rows]]
+
+    def _top_k_rows(self, vectors: np.ndarray, rows: np.ndarray, queries: np.ndarray, k: int):
+        """
+        Exact top-k among the given rows only (a selective filter's candidates).
+        """
+        scores = np.asarray(vectors[rows], dtype=np.float32) @ queries.T
+        order = np.argsort(-scores, axis=0, kind="stable")[:k]
+        return np.take_along_axis(scores, order, axis=0), rows[order]
+
+    def _top_k(self, vectors: np.ndarray, live: np.ndarray, queries: np.ndarray, k: int):
+        """
+        Exact top-k by inner product. Returns (k, m) arrays of scores and row
+        numbers, best first.
+        """
+        q_t = queries.T
+        return self._scan_top_k(
+            lambda block: np.asarray(block, dtype=np.float32) @ q_t, vectors, live, queries.shape[0], k
+        )
+
+    def _top_k_quantized(self, snap: Dict[str, Any], queries: np.ndarray, k: int):
+        """
+        First pass over the compact codes for a shortlist of k * rescore_multiplier
+        rows per query, then exact rescoring of just those rows.
+        """
+        mode = snap["manifest"]["quantization"]
+        vectors = snap["vectors"]
+        shortlist = min(k * self.rescore_multiplier, int(snap["manifest"]["live_rows"]))
+        cand_s, cand = self._scan_top_k(
+            lambda block: quant.first_pass_scores(mode, np.asarray(block), queries),
+            snap["codes"],
+            snap["live"],
+            queries.shape[0],
+            shortlist,
+        )
+
+        m = queries.shape[0]
+        best_s = np.full((k, m), -np.inf, dtype=np.float32)
+        best_r = np.full((k, m), -1, dtype=np.int64)
+        for j in range(m):
+            # Masked rows (dead, or outside a filter) can fill a short shortlist
+            rows = cand[:, j]
+            rows = np.sort(rows[(rows >= 0) & np.isfinite(cand_s[:, j])])
+            exact = np.asarray(vectors[rows], dtype=np.float32) @ queries[j]
+            top = np.argsort(-exact, kind="stable")[:k]
+            best_s[: len(top), j] = exact[top]
+            best_r[: len(top), j] = rows[top]
+        return best_s, best_r
+
+    def _scan_top_k(self, score_block, matrix: np.ndarray, live: np.ndarray, m: int, k: int):
+        """
+        Blockwise top-k over `matrix` so the score buffer never exceeds
+        SCAN_BLOCK_ROWS x m. `score_block` maps a block of rows to (rows, m)
+        scores, higher is better.
+        """
+        best_s = np.full((k, m), -np.inf, dtype=np.float32)
+        best_r = np.full((k, m), -1, dtype=np.int64)
+
+        for start in range(0, matrix.shape[0], SCAN_BLOCK_ROWS):
+            s = score_block(matrix[start:start + SCAN_BLOCK_ROWS])
+            s[~np.asarray(live[start:start + SCAN_BLOCK_ROWS])] = -np.inf
+
+            if s.shape[0] > k:
+                part = np.argpartition(-s, k - 1, axis=0)[:k]
+                s = np.take_along_axis(s, part, axis=0)
+                r = part + start
+            else:
+                r = np.broadcast_to(np.arange(start, start + s.shape[0])[:, None], s.shape)
+
+            cand_s = np.vstack([best_s, s])
+            cand_r = np.vstack([best_r, r])
+            sel = np.argpartition(-cand_s, k - 1, axis=0)[:k]
+            best_s = np.take_along_axis(cand_s, sel, axis=0)
+            best_r = np.take_along_axis(cand_r, sel, axis=0)
+
+        order = np.argsort(-best_s, axis=0, kind="stable")
+        return np.take_along_axis(best_s, order, axis=0), np.take_along_axis(best_r, order, axis=0)
+
+    def quantization_report(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+        modes: Sequence[str] = ("int8", "binary"),
+        multipliers: Sequence[int] = (1, 4, 8, 16),
+    ) -> Dict[str, Any]:
+        """
+        Compare quantized search against exact search on this index: recall@k,
+        mean latency per query and code size per vector. Codes are built in
+        memory, so the index on disk is not modified.
+        """
+        snap = self._current()
+        manifest = snap["manifest"]
+        if snap["vectors"] is None:
+            return {"rows": 0, "results": []}
+
+        queries = l2_normalize(np.asarray(queries, dtype=np.float32))
+        k = min(k, int(manifest["live_rows"]))
+
+        started = time.perf_counter()
+        _, exact_rows = self._top_k(snap["vectors"], snap["live"], queries, k)
+        exact_ms = (time.perf_counter() - started) * 1000.0 / len(queries)
+        exact = [list(exact_rows[:, j]) for j in range(len(queries))]
+
+        results = []
+        saved_multiplier = self.rescore_multiplier
+        try:
+            for mode in modes:
+                calib = np.asarray(snap["vectors"][:SCAN_BLOCK_ROWS], dtype=np.float32)
+                scale = quant.int8_scale_for(calib) if mode == "int8" else None
+                codes = np.vstack([
+                    quant.encode(mode, np.asarray(snap["vectors"][i:i + SCAN_BLOCK_ROWS], dtype=np.float32), scale)
+                    for i in range(0, snap["vectors"].shape[0], SCAN_BLOCK_ROWS)
+                ])
+                trial = dict(snap, codes=codes, manifest=dict(manifest, quantization=mode))
+                for mult in multipliers:
+                    self.rescore_multiplier = mult
+                    started = time.perf_counter()
+                    _, rows = self._top_k_quantized(trial, queries, k)
+                    ms = (time.perf_counter() - started) * 1000.0 / len(queries)
+                    results.append({
+                        "mode": mode,
+                        "rescore_multiplier": mult,
+                        "recall_at_k": quant.recall_at_k([list(rows[:, j]) for j in range(len(queries))], exact),
+                        "mean_query_ms": round(ms, 3),
+                        "bytes_per_vector": quant.bytes_per_vector(mode, manifest["dim"]),
+                    })
+        finally:
+            self.rescore_multiplier = saved_multiplier
+
+        return {
+            "rows": int(manifest["live_rows"]),
+            "dim": manifest["dim"],
+            "k": k,
+            "queries": len(queries),
+            "exact": {
+                "mean_query_ms": round(exact_ms, 3),
+                "bytes_per_vector": quant.bytes_per_vector("none", manifest["dim"], DTYPES[manifest["dtype"]]),
+            },
+            "results": results,
+        }
+
+    def _fetch_rows(self, gen: int, rows: np.ndarray) -> Dict[int, tuple]:
+        wanted = sorted({int(r) for r in rows.ravel() if r >= 0})
+        fetched: Dict[int, tuple] = {}
+        conn = self._conn()
+        for page in _pages(wanted, SQL_PAGE):
+            for row, cid, document, metadata in conn.execute(
+                f"SELECT row, id, document, metadata FROM rows WHERE gen = ? AND row IN ({','.join('?' * len(page))})",
+                [gen, *page],
+            ):
+                fetched[row] = (cid, document, json.loads(metadata) if metadata else {})
+        return fetched
+
+
+def _write_rows(path: Path, offset: int, data: bytes):
+    """
+    Write rows at byte `offset`, the end of the published rows. Bytes past
+    it are left over from an upsert that failed before publishing; they are
+    dropped so row numbers keep matching the file.
+    """
+    with open(path, "ab") as f:
+        f.truncate(offset)
+        f.write(data)
+
+
+def _pages(items, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
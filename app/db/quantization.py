@@ -0,0 +1,86 @@
+from typing import List, Sequence
+
+import numpy as np
+
+
+MODES = ("none", "int8", "binary")
+
+# Number of set bits for every byte value, for Hamming distance on packed codes
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def int8_scale_for(vectors: np.ndarray) -> float:
+    """
+    Scale that maps the observed component range of (unit) vectors onto
+    [-127, 127]. Components are clipped if later vectors exceed it.
+    """
+    peak = float(np.max(np.abs(vectors))) if vectors.size else 1.0
+    return 127.0 / max(peak, 1e-6)
+
+
+def quantize_int8(vectors: np.ndarray, scale: float) -> np.ndarray:
+    return np.clip(np.rint(vectors * scale), -127, 127).astype(np.int8)
+
+
+def pack_binary(vectors: np.ndarray) -> np.ndarray:
+    # 1 bit per dimension (sign), packed 8 per byte
+    return np.packbits(vectors > 0, axis=-1)
+
+
+def code_shape(mode: str, dim: int):
+    """
+    (dtype, columns) of the stored code matrix for a quantization mode.
+    """
+    if mode == "int8":
+        return np.int8, dim
+    if mode == "binary":
+        return np.uint8, (dim + 7) // 8
+    raise ValueError(f"Unsupported quantization mode: {mode!r}")
+
+
+def encode(mode: str, vectors: np.ndarray, scale: float | None = None) -> np.ndarray:
+    if mode == "int8":
+        return quantize_int8(vectors, scale)
+    if mode == "binary":
+        return pack_binary(vectors)
+    raise ValueError(f"Unsupported quantization mode: {mode!r}")
+
+
+def first_pass_scores(mode: str, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """
+    Approximate similarity of every code row to every query, shape
+    (rows, queries), higher is better.
+
+    int8:   dot product of the float query with the int8 codes (the common
+            scale factor does not change the ranking)
+    binary: negative Hamming distance between sign bits
+    """
+    if mode == "int8":
+        return codes.astype(np.float32) @ queries.T
+    if mode == "binary":
+        q_codes = pack_binary(queries)
+        out = np.empty((codes.shape[0], q_codes.shape[0]), dtype=np.float32)
+        for j, q in enumerate(q_codes):
+            out[:, j] = -POPCOUNT[np.bitwise_xor(codes, q)].sum(axis=1, dtype=np.int32)
+        return out
+    raise ValueError(f"Unsupported quantization mode: {mode!r}")
+
+
+def bytes_per_vector(mode: str, dim: int, full_dtype=np.float32) -> int:
+    if mode == "none":
+        return dim * np.dtype(full_dtype).itemsize
+    dtype, cols = code_shape(mode, dim)
+    return cols * np.dtype(dtype).itemsize
+
+
+def recall_at_k(approx: Sequence[Sequence], exact: Sequence[Sequence]) -> float:
+    """
+    Mean fraction of the exact top-k ids that the approximate search found.
+    """
+    if not exact:
+        return 0.0
+    scores: List[float] = []
+    for a, e in zip(approx, exact):
+        if e:
+            scores.append(len(set(a) & set(e)) / len(e))
+    return float(np.mean(scores)) if scores else 0.0
@@ -0,0 +1,225 @@
+import hashlib
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.db.base import VectorStore
+from app.db.metadata_index import Filters
+
+STRATEGIES = ("hash", "source")
+
+
+def shard_key(chunk_id: str, strategy: str) -> str:
+    """
+    Routing key of a chunk: its id ("hash"), or the source file part of its
+    chunk_uid ("source", ids are "<filename>::chunk_<i>") so every chunk of a
+    document lands in the same shard.
+    """
+    if strategy == "source":
+        source, sep, _ = chunk_id.rpartition("::")
+        return source if sep else chunk_id
+    return chunk_id
+
+
+def shard_for(chunk_id: str, num_shards: int, strategy: str) -> int:
+    # Stable across processes (unlike hash(), which is salted per process)
+    digest = hashlib.blake2b(shard_key(chunk_id, strategy).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+
+class ShardedVectorStore(VectorStore):
+    """
+    Spreads the corpus over several independent stores (one Chroma
+    collection or mmap index directory each) so no single index has to hold
+    everything.
+
+    Writes are routed by chunk id (see shard_for). Queries run against every
+    shard concurrently; each shard returns its own top_k, already sorted by
+    distance, and the lists are merged into the global top_k. Distances are
+    the shards' own squared L2 values, so results rank exactly as a single
+    store would and grounding thresholds are unchanged.
+
+    The index version combines the shard versions, so rebuilding one shard
+    (rebuild_shard) still invalidates the answer cache. Changing the shard
+    count or strategy re-routes ids: rebuild every shard afterwards.
+    """
+
+    def __init__(self, shards: List[VectorStore], strategy: str = "hash"):
+        if not shards:
+            raise ValueError("ShardedVectorStore needs at least one shard")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown shard_strategy: {strategy!r} (expected one of {STRATEGIES})")
+        self.shards = shards
+        self.strategy = strategy
+        self._executor = ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix="medrag-shard")
+        self._closed = False
+
+    def shard_for(self, chunk_id: str) -> int:
+        return shard_for(chunk_id, len(self.shards), self.strategy)
+
+    def _fan_out(self, calls: Dict[int, Callable[[], Any]]) -> Dict[int, Any]:
+        """
+        Run one callable per shard concurrently; results keyed by shard.
+        """
+        if len(calls) == 1 or self._closed:
+            # A closed store may still finish a request that held it: run inline
+            return {shard: call() for shard, call in calls.items()}
+        futures = {shard: self._executor.submit(call) for shard, call in calls.items()}
+        return {shard: future.result() for shard, future in futures.items()}
+
+    def _group(self, ids: List[str]) -> Dict[int, List[int]]:
+        # shard -> positions in `ids`, keeping input order within a shard
+        groups: Dict[int, List[int]] = {}
+        for pos, cid in enumerate(ids):
+            groups.setdefault(self.shard_for(cid), []).append(pos)
+        return groups
+
+    # ----------------------------------------------------------------- writes
+
+    def add_documents(
+        self,
+        docs: List[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]],
+        ids: Optional[List[str]] = None,
+    ):
+        if ids is None:
+            ids = [f"doc_{i}" for i in range(len(docs))]
+        groups = self._group(ids)
+        self._fan_out({
+            shard: (lambda s=shard, p=pos: self.shards[s].add_documents(
+                [docs[i] for i in p], [embeddings[i] for i in p], ids=[ids[i] for i in p]
+            ))
+            for shard, pos in groups.items()
+        })
+
+    def upsert_documents(
+        self,
+        docs: List[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]],
+        ids: List[str],
+        page_size: int = 1000,
+    ):
+        groups = self._group(ids)
+        self._fan_out({
+            shard: (lambda s=shard, p=pos: self.shards[s].upsert_documents(
+                [docs[i] for i in p], [embeddings[i] for i in p], ids=[ids[i] for i in p], page_size=page_size
+            ))
+            for shard, pos in groups.items()
+        })
+
+    def delete_ids(self, ids: List[str], page_size: int = 1000):
+        groups = self._group(ids)
+        self._fan_out({
+            shard: (lambda s=shard, p=pos: self.shards[s].delete_ids([ids[i] for i in p], page_size=page_size))
+            for shard, pos in groups.items()
+        })
+
+    def rebuild_shard(
+        self,
+        shard: int,
+        docs: List[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]],
+        ids: List[str],
+    ) -> Dict[str, Any]:
+        """
+        Replace the contents of one shard with exactly these chunks (all of
+        which must route to it), leaving the other shards untouched.
+        """
+        misrouted = [cid for cid in ids if self.shard_for(cid) != shard]
+        if misrouted:
+            raise ValueError(f"{len(misrouted)} ids do not belong to shard {shard}")
+        store = self.shards[shard]
+        store.upsert_documents(docs, embeddings, ids=ids)
+        stale = sorted(set(store.list_ids()) - set(ids))
+        store.delete_ids(stale)
+        store.bump_index_version()
+        return {"shard": shard, "written": len(ids), "removed": len(stale), "count": store.count()}
+
+    def bump_index_version(self) -> str:
+        for store in self.shards:
+            store.bump_index_version()
+        return self.index_version()
+
+    def drop(self):
+        for store in self.shards:
+            store.drop()
+
+    def close(self):
+        self._closed = True
+        self._executor.shutdown(wait=False)
+        for store in self.shards:
+            store.close()
+
+    # ------------------------------------------------------------------ reads
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, Any]:
+        groups = self._group(ids)
+        found: Dict[str, Any] = {}
+        results = self._fan_out({
+            shard: (lambda s=shard, p=pos: self.shards[s].get_embeddings([ids[i] for i in p]))
+            for shard, pos in groups.items()
+        })
+        for part in results.values():
+            found.update(part)
+        return found
+
+    def get_chunks(self, ids: List[str], embeddings: bool = True) -> Dict[str, Dict[str, Any]]:
+        groups = self._group(ids)
+        found: Dict[str, Dict[str, Any]] = {}
+        results = self._fan_out({
+            shard: (lambda s=shard, p=pos: self.shards[s].get_chunks([ids[i] for i in p], embeddings))
+            for shard, pos in groups.items()
+        })
+        for part in results.values():
+            found.update(part)
+        return found
+
+    def list_ids(self) -> List[str]:
+        return [cid for store in self.shards for cid in store.list_ids()]
+
+    def count(self) -> int:
+        return sum(store.count() for store in self.shards)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "shards": len(self.shards),
+            "strategy": self.strategy,
+            "counts": [store.count() for store in self.shards],
+        }
+
+    def index_version(self) -> str | None:
+        versions = [store.index_version() for store in self.shards]
+        if all(v is None for v in versions):
+            return None
+        joined = "|".join(v or "" for v in versions)
+        return hashlib.blake2b(joined.encode("utf-8"), digest_size=8).hexdigest()
+
+    def query(self, query_embedding: Sequence[float], top_k: int = 5, filters: Optional[Filters] = None):
+        return self.query_many([query_embedding], top_k=top_k, filters=filters)
+
+    def query_many(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        top_k: int = 5,
+        filters: Optional[Filters] = None,
+    ):
+        # Each shard applies the filter (and picks exact scan or filtered search) itself
+        query_embeddings = list(query_embeddings)
+        parts = self._fan_out({
+            shard: (lambda store=store: store.query_many(query_embeddings, top_k=top_k, filters=filters))
+            for shard, store in enumerate(self.shards)
+        })
+
+        keys = ("ids", "documents", "metadatas", "distances")
+        results: Dict[str, List[List[Any]]] = {key: [] for key in keys}
+        for j in range(len(query_embeddings)):
+            # Each shard's hits are sorted by distance; ties keep shard order
+            hits = heapq.merge(
+                *(zip(*(parts[shard][key][j] for key in keys)) for shard in sorted(parts)),
+                key=lambda hit: hit[3],
+            )
+            top = list(itertools.islice(hits, top_k))
+            for pos, key in enumerate(keys):
+                results[key].append([hit[pos] for hit in top])
+        return results
@@ -1,18 +1,28 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
+import threading
 import chromadb
 from app.config import settings
+from app.db.base import VectorStore, new_index_version
+from app.db.metadata_index import Filters, MetadataIndex, chroma_where, exact_top_k
+
+INDEX_VERSION_KEY = "ingest_version"
+
+
+class ChromaVectorStore(VectorStore):
 
-class ChromaVectorStore:
-    
     def __init__(
-        self, 
-        collection_name: str | None = None, 
+        self,
+        collection_name: str | None = None,
         persist_directory: str | None = None
     ):
         collection_name = collection_name or settings.chroma_collection
         persist_directory = persist_directory or settings.chroma_dir
+        self.collection_name = collection_name
         self.client = chromadb.PersistentClient(path=persist_directory)
         self.collection = self.client.get_or_create_collection(name=collection_name)
+        # (index version, ids, MetadataIndex over their metadata), built on the first filtered query
+        self._filter_index = None
+        self._filter_lock = threading.Lock()
 
     def add_documents(
         self,
@@ -32,12 +42,143 @@ class ChromaVectorStore:
             metadatas=metadatas,
             documents=texts,
         )
+        self.bump_index_version()
+
+    def upsert_documents(
+        self,
+        docs: List[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]],
+        ids: List[str],
+        page_size: int = 1000,
+    ):
+        """
+        Insert or overwrite chunks by id, written in pages so large
+        ingests stay under Chroma's per-call batch limit.
+        """
+        for start in range(0, len(ids), page_size):
+            end = start + page_size
+            self.collection.upsert(
+                ids=ids[start:end],
+                embeddings=list(embeddings[start:end]),
+                metadatas=[doc.get("metadata", {}) for doc in docs[start:end]],
+                documents=[doc["content"] for doc in docs[start:end]],
+            )
+
+    def delete_ids(self, ids: List[str], page_size: int = 1000):
+        for start in range(0, len(ids), page_size):
+            self.collection.delete(ids=ids[start:start + page_size])
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, Any]:
+        """
+        Return {id: embedding} for the ids that exist in the collection.
+        """
+        if not ids:
+            return {}
+        found = self.collection.get(ids=ids, include=["embeddings"])
+        return dict(zip(found["ids"], found["embeddings"]))
+
+    def get_chunks(self, ids: List[str], embeddings: bool = True) -> Dict[str, Dict[str, Any]]:
+        if not ids:
+            return {}
+        include = ["documents", "metadatas", "embeddings"] if embeddings else ["documents", "metadatas"]
+        found = self.collection.get(ids=ids, include=include)
+        chunks = {
+            cid: {"document": document, "metadata": metadata or {}}
+            for cid, document, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+        }
+        if embeddings:
+            for cid, embedding in zip(found["ids"], found["embeddings"]):
+                chunks[cid]["embedding"] = embedding
+        return chunks
+
+    def list_ids(self, page_size: int = 1000) -> List[str]:
+        ids: List[str] = []
+        while True:
+            page = self.collection.get(include=[], limit=page_size, offset=len(ids))["ids"]
+            ids.extend(page)
+            if len(page) < page_size:
+                return ids
 
-    def query(self, query_embedding: List[float], top_k: int = 5):
+    def count(self) -> int:
+        return self.collection.count()
+
+    def query(self, query_embedding: Sequence[float], top_k: int = 5, filters: Optional[Filters] = None):
+        return self.query_many([query_embedding], top_k=top_k, filters=filters)
+
+    def query_many(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        top_k: int = 5,
+        filters: Optional[Filters] = None,
+    ):
+        """
+        Search several query vectors in one collection.query call; result
+        lists are indexed per query, like query().
+
+        With filters, the metadata index gives the matching ids first: up to
+        settings.filter_exact_scan_max of them are fetched and scanned
+        exactly, otherwise the filter is pushed into Chroma as a where clause.
+        """
+        where = None
+        if filters:
+            if settings.filter_exact_scan_max > 0:
+                candidates = self._filter_candidates(filters)
+                if len(candidates) <= settings.filter_exact_scan_max:
+                    return self._exact_query(query_embeddings, candidates, top_k)
+            where = chroma_where(filters)
         return self.collection.query(
-            query_embeddings=[query_embedding],
+            query_embeddings=list(query_embeddings),
             n_results=top_k,
+            where=where,
             include=["documents", "metadatas", "distances"],
         )
-    
-    
\ No newline at end of file
+
+    def _exact_query(self, query_embeddings: Sequence[Sequence[float]], ids: List[str], top_k: int):
+        found = {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+        if ids:
+            found = self.collection.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+        return exact_top_k(
+            query_embeddings, found["ids"], found["embeddings"], found["documents"], found["metadatas"], top_k
+        )
+
+    def _filter_candidates(self, filters: Filters) -> List[str]:
+        # Rebuilt whenever an ingest bumps the index version
+        version = self.index_version()
+        with self._filter_lock:
+            if self._filter_index is None or self._filter_index[0] != version:
+                ids, metadatas = self._list_metadatas()
+                self._filter_index = (version, ids, MetadataIndex(metadatas))
+            _, ids, index = self._filter_index
+        return [ids[pos] for pos in index.positions(filters)]
+
+    def _list_metadatas(self, page_size: int = 1000):
+        ids: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=len(ids))
+            ids.extend(page["ids"])
+            metadatas.extend(page["metadatas"])
+            if len(page["ids"]) < page_size:
+                return ids, metadatas
+
+    def index_version(self) -> str | None:
+        """
+        Version tag of the indexed content, changed on every ingest.
+        Re-reads the collection so writes from other processes are seen.
+        """
+        collection = self.client.get_collection(name=self.collection_name)
+        return (collection.metadata or {}).get(INDEX_VERSION_KEY)
+
+    def bump_index_version(self) -> str:
+        version = new_index_version()
+        metadata = {
+            k: v
+            for k, v in (self.collection.metadata or {}).items()
+            if not k.startswith("hnsw:")
+        }
+        metadata[INDEX_VERSION_KEY] = version
+        self.collection.modify(metadata=metadata)
+        return version
+
+    def drop(self):
+        self.client.delete_collection(name=self.collection_name)
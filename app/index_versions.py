@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.db.base import VectorStore
+from app.db.factory import build_vector_store
+from app.db.index_registry import UNVERSIONED, IndexRegistry
+from app.state import state
+
+logger = logging.getLogger("medrag")
+
+# Smoke retrieval run against every candidate index before it goes live
+VALIDATION_QUESTION = "What are the recommended precautions?"
+
+# A sampled chunk retrieves itself if the top hit is at (about) distance 0:
+# another id there is a chunk with identical text (boilerplate), not an error
+SELF_HIT_MAX_DISTANCE = 1e-4
+
+_swap_lock = asyncio.Lock()
+
+
+def validate_store(store: VectorStore, embedder, expected_count: int | None = None, samples: int = 5) -> Dict[str, Any]:
+    """
+    Checks an index before it is served:
+      - it is not empty (and holds expected_count chunks, if given)
+      - stored vectors have the embedder's dimension
+      - sampled chunks retrieve themselves (or an identical chunk) as the top
+        hit by their own vector
+      - a real question, embedded now, returns hits with finite distances
+    """
+    errors: List[str] = []
+    count = store.count()
+    if count == 0:
+        errors.append("index is empty")
+    if expected_count is not None and count != expected_count:
+        errors.append(f"count {count} != expected {expected_count}")
+
+    self_hits = 0
+    sample_ids: List[str] = []
+    if count:
+        ids = store.list_ids()
+        sample_ids = [ids[i] for i in np.linspace(0, len(ids) - 1, min(samples, len(ids))).astype(int)]
+        vectors = store.get_embeddings(sample_ids)
+        question = embedder.embed_query(VALIDATION_QUESTION)
+        if any(len(v) != len(question) for v in vectors.values()):
+            errors.append("stored vectors do not match the embedding model's dimension")
+        else:
+            results = store.query_many([vectors[cid] for cid in sample_ids if cid in vectors], top_k=1)
+            self_hits = sum(
+                1
+                for cid, hits, distances in zip(sample_ids, results["ids"], results["distances"])
+                if hits and (hits[0] == cid or distances[0] <= SELF_HIT_MAX_DISTANCE)
+            )
+            if self_hits < len(sample_ids):
+                errors.append(f"{len(sample_ids) - self_hits}/{len(sample_ids)} sampled chunks do not retrieve themselves")
+
+            probe = store.query(question, top_k=3)
+            distances = probe["distances"][0]
+            if not distances or not all(math.isfinite(d) for d in distances):
+                errors.append("smoke retrieval returned no usable hits")
+
+    return {
+        "ok": not errors,
+        "count": count,
+        "self_retrieval": f"{self_hits}/{len(sample_ids)}",
+        "errors": errors,
+    }
+
+
+def _swap(store: VectorStore, name: str | None, index_version: str | None):
+    """
+    Point the app at `store`. In-flight requests keep the store they already
+    hold; the old one stays open as state.previous_vector_store for rollback.
+    Runs on the event loop, so `index_version` is read beforehand, off it.
+    """
+    if state.vector_store is not store:
+        replaced = state.previous_vector_store
+        state.previous_vector_store, state.previous_index_name = state.vector_store, state.index_name
+        if replaced is not None and replaced is not store:
+            # No longer reachable for rollback; requests still holding it run without its threads
+            replaced.close()
+    state.vector_store, state.index_name = store, name
+    if state.answer_cache is not None:
+        state.answer_cache.set_index_version(index_version)
+    if state.lexical_index is not None:
+        # Serve the new version's lexical index now, not after the handle's check interval
+        state.lexical_index.invalidate()
+
+
+def _open_and_validate(name: str) -> Tuple[VectorStore, str | None]:
+    entry = IndexRegistry().get(name) or {}
+    store = build_vector_store(name)
+    report = validate_store(store, state.embedder, expected_count=entry.get("count"))
+    if not report["ok"]:
+        raise ValueError(f"Index version {name} failed validation: {'; '.join(report['errors'])}")
+    return store, store.index_version()
+
+
+async def activate(name: str, update_registry: bool = True) -> Dict[str, Any]:
+    """
+    Open and validate an index version off the event loop, then swap it in.
+    Raises ValueError (and keeps serving the current index) if it is not
+    ready or fails validation.
+    """
+    async with _swap_lock:
+        if name == state.index_name:
+            return IndexRegistry().read()
+        start = time.perf_counter()
+        if name == state.previous_index_name and state.previous_vector_store is not None:
+            store = state.previous_vector_store
+            version = await asyncio.to_thread(store.index_version)
+        else:
+            store, version = await asyncio.to_thread(_open_and_validate, name)
+        registry = IndexRegistry()
+        if update_registry:
+            data = await asyncio.to_thread(registry.activate, name)
+        else:
+            data = await asyncio.to_thread(registry.read)
+        _swap(store, name, version)
+        logger.info("index_activated version=%s swap_ms=%.1f", name, (time.perf_counter() - start) * 1000.0)
+        return data
+
+
+async def rollback() -> Dict[str, Any]:
+    data = IndexRegistry().read()
+    if not data.get("previous"):
+        raise ValueError("No previous index version to roll back to")
+    await activate(data["previous"], update_registry=False)
+    return IndexRegistry().rollback()
+
+
+def collect_garbage(keep: int) -> List[str]:
+    """
+    Delete old index versions (never the active or previous one), keeping
+    the `keep` newest ready versions. Returns the deleted names.
+    """
+    registry = IndexRegistry()
+    deleted = []
+    for name in registry.gc_candidates(keep):
+        store = build_vector_store(name)
+        store.drop()
+        store.close()
+        registry.remove(name)
+        deleted.append(name)
+    return deleted
+
+
+async def watch_registry(poll_s: float):
+    """
+    Follow activations made elsewhere (the build script, or another worker's
+    admin call): when the registry's active version differs from ours, open,
+    validate and swap it in. A failed activation is retried on the next poll.
+    """
+    registry = IndexRegistry()
+    seen = registry.mtime()
+    while True:
+        await asyncio.sleep(poll_s)
+        mtime = registry.mtime()
+        if mtime == seen:
+            continue
+        active = registry.active
+        if active and active != (state.index_name or UNVERSIONED):
+            try:
+                await activate(active, update_registry=False)
+            except Exception:
+                logger.exception("index_activation_failed version=%s", active)
+                continue
+        seen = mtime
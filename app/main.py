@@ -1,14 +1,26 @@
+import asyncio
 import json
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 
 from app.routers.qa import router as qa_router
+from app.routers.admin import router as admin_router
 from app.state import state
 from app.config import settings
+from app.security import require_api_key
+from app.concurrency import get_blocking_executor, shutdown_blocking_executor
 
-from app.data_ingest.embedding import LocalEmbeddingModel
-from app.db.vector_store import ChromaVectorStore
-from langchain_ollama import ChatOllama
+from app.db.sharded_store import ShardedVectorStore
+from app.rag.answer_cache import AnswerCache
+from app.rag.llm_scheduler import LLMScheduler, SchedulerRejected
+from app.rag.singleflight import SingleFlight
+from app.rag.lexical import LexicalIndexHandle, lexical_index_path
+from app.metrics import render_metrics
+from app.startup import initialize_components, warm_up_components, readiness_report
+from app.db.index_registry import UNVERSIONED, IndexRegistry
+from app.index_versions import watch_registry
 
 import logging
 from app.middleware import PrivacyAwareLoggingMiddleware
@@ -17,27 +29,67 @@ logging.basicConfig(level=logging.INFO)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Startup: initializing embedder...")
-    state.embedder = LocalEmbeddingModel()
-    print("Startup: embedder ready")
-
-    print("Startup: initializing vector store...")
-    state.vector_store = ChromaVectorStore(
-        collection_name=settings.chroma_collection,
-        persist_directory=settings.chroma_dir,
-    )
-    print("Startup: vector store ready")
+    started = time.perf_counter()
+    state.index_name = IndexRegistry().active or UNVERSIONED
+    await initialize_components()
+
+    if settings.answer_cache_size > 0:
+        state.answer_cache = AnswerCache(
+            max_entries=settings.answer_cache_size,
+            sqlite_path=settings.answer_cache_path,
+            disk_max_entries=settings.answer_cache_disk_size,
+            version_check_s=settings.answer_cache_version_check_s,
+        )
+        print("Startup: answer cache ready")
 
-    print("Startup: initializing LLM client...")
-    state.llm = ChatOllama(
-        model=settings.ollama_model,
-        temperature=settings.llm_temperature,
-        base_url=settings.ollama_base_url,
+    state.llm_scheduler = LLMScheduler(
+        max_in_flight=settings.llm_max_in_flight,
+        max_queue=settings.llm_max_queue,
+        queue_timeout_s=settings.llm_queue_timeout_s,
     )
-    print("Startup: LLM client ready")
+    print("Startup: LLM scheduler ready")
+
+    # BM25 index of the served version (absent for indexes built before hybrid retrieval)
+    if settings.hybrid_retrieval_enabled:
+        state.lexical_index = LexicalIndexHandle(lambda: lexical_index_path(state.index_name))
+        if await asyncio.to_thread(state.lexical_index.current) is not None:
+            print("Startup: lexical index ready")
+
+    if settings.query_coalescing_enabled:
+        state.query_singleflight = SingleFlight()
+
+    get_blocking_executor()
+
+    async def warm_up():
+        await warm_up_components()
+        state.startup_ms = round((time.perf_counter() - started) * 1000.0, 1)
+
+    # In the background, the app serves (and /ready reports 503) while warming
+    warmup_task = None
+    if settings.warmup_in_background:
+        warmup_task = asyncio.create_task(warm_up())
+    else:
+        await warm_up()
 
-    print("Startup complete")
+    # Follow index versions activated by the build script or other workers
+    watch_task = None
+    if settings.index_registry_poll_s > 0:
+        watch_task = asyncio.create_task(watch_registry(settings.index_registry_poll_s))
+
+    print(f"Startup complete (index version: {state.index_name})")
     yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    if watch_task is not None:
+        watch_task.cancel()
+    if state.embedder is not None:
+        state.embedder.close()
+    if state.answer_cache is not None:
+        state.answer_cache.close()
+    for store in (state.vector_store, state.previous_vector_store):
+        if store is not None:
+            store.close()
+    shutdown_blocking_executor()
     print("Shutdown complete")
 
 app = FastAPI(title="MedRAG Clinical Assistant API", lifespan=lifespan)
@@ -46,7 +98,42 @@ app = FastAPI(title="MedRAG Clinical Assistant API", lifespan=lifespan)
 def health_check():
     return {"status": "ok", "message": "MedRAG API is running"}
 
+@app.get("/ready")
+def readiness_check():
+    # Unauthenticated like /health, for load balancer / orchestrator probes
+    report = readiness_report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/stats", dependencies=[Depends(require_api_key)])
+def stats():
+    # Counters only; never includes question or document text
+    return {
+        "embedder": state.embedder.stats() if state.embedder is not None else None,
+        "answer_cache": state.answer_cache.stats() if state.answer_cache is not None else None,
+        "llm_scheduler": state.llm_scheduler.stats() if state.llm_scheduler is not None else None,
+        "lexical_index": state.lexical_index.stats() if state.lexical_index is not None else None,
+        "query_coalescing": state.query_singleflight.stats() if state.query_singleflight is not None else None,
+        "vector_shards": (
+            state.vector_store.stats() if isinstance(state.vector_store, ShardedVectorStore) else None
+        ),
+    }
+
+@app.get("/metrics", dependencies=[Depends(require_api_key)])
+def metrics():
+    # Prometheus text format; labels are stage / route / flag names only
+    return PlainTextResponse(render_metrics(state), media_type="text/plain; version=0.0.4")
+
+@app.exception_handler(SchedulerRejected)
+async def scheduler_rejected(request: Request, exc: SchedulerRejected):
+    # 429 = wait queue full, 503 = could not start before the queue deadline
+    return JSONResponse(
+        {"detail": exc.reason},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(exc.retry_after_s)},
+    )
+
 app.include_router(qa_router)
+app.include_router(admin_router)
 
 app.add_middleware(PrivacyAwareLoggingMiddleware)
 
@@ -0,0 +1,248 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets (seconds) shared by the stage and request histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Stage name -> accumulated seconds for the current request (None outside a request)
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("medrag_request_stages", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    mtype = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        # Label values must come from fixed vocabularies (stage names, flags,
+        # route templates), never from request content
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.mtype}"]
+
+
+class Counter(_Metric):
+    mtype = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items
+        ]
+
+
+class Gauge(_Metric):
+    """
+    Point-in-time value, set at scrape time from component stats.
+    `mtype="counter"` is used for monotonic totals owned by other components.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), mtype: str = "gauge"):
+        super().__init__(name, documentation, label_names)
+        self.mtype = mtype
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items
+        ]
+
+
+class Histogram(_Metric):
+    mtype = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, n = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, n + 1)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._values.items())
+        lines = self.header()
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            inf = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {n}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(
+    Histogram("medrag_request_duration_seconds", "HTTP request latency by route template.", ["route", "status"])
+)
+STAGE_SECONDS = REGISTRY.register(
+    Histogram("medrag_stage_duration_seconds", "Latency of pipeline stages.", ["stage"])
+)
+ANSWERS = REGISTRY.register(
+    Counter("medrag_answers_total", "Answers returned, by outcome (answered, abstained, cached).", ["outcome"])
+)
+WARNING_FLAGS = REGISTRY.register(
+    Counter("medrag_warning_flags_total", "Warning flags attached to answers.", ["flag"])
+)
+ANSWER_CACHE_LOOKUPS = REGISTRY.register(
+    Counter("medrag_answer_cache_lookups_total", "Answer cache lookups by result.", ["result"])
+)
+LLM_REJECTIONS = REGISTRY.register(
+    Counter("medrag_llm_rejections_total", "Generations rejected by the LLM scheduler.", ["reason"])
+)
+QUERY_COALESCED = REGISTRY.register(
+    Counter("medrag_query_coalesced_total", "/query requests that joined an identical in-flight request.")
+)
+LEXICAL_SHORT_CIRCUITS = REGISTRY.register(
+    Counter("medrag_lexical_short_circuits_total", "Questions abstained on without dense search (no lexical overlap).")
+)
+EMBEDDING_CACHE = REGISTRY.register(
+    Gauge("medrag_embedding_cache_lookups_total", "Query embedding cache lookups by result.", ["result"], mtype="counter")
+)
+LLM_QUEUE = REGISTRY.register(
+    Gauge("medrag_llm_scheduler", "LLM scheduler occupancy (in_flight, queue_depth).", ["kind"])
+)
+
+
+@contextmanager
+def request_timing() -> Iterator[Dict[str, float]]:
+    """
+    Collect the stage timings of the current request (for Server-Timing).
+    Tasks and threads started inside inherit the same dict.
+    """
+    stages: Dict[str, float] = {}
+    token = _request_stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _request_stages.reset(token)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Time a pipeline stage: feeds medrag_stage_duration_seconds and, inside a
+    request, that request's stage breakdown.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def record_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+def record_answer(grounding: Dict, warning_flags: Sequence[str]):
+    if grounding.get("abstained"):
+        outcome = "abstained"
+    elif grounding.get("cached"):
+        outcome = "cached"
+    else:
+        outcome = "answered"
+    ANSWERS.inc(outcome=outcome)
+    for flag in warning_flags:
+        WARNING_FLAGS.inc(flag=flag)
+
+
+def server_timing_header(stages: Dict[str, float], total_s: float | None = None) -> str:
+    parts = [f"{name};dur={seconds * 1000.0:.1f}" for name, seconds in stages.items()]
+    if total_s is not None:
+        parts.append(f"total;dur={total_s * 1000.0:.1f}")
+    return ", ".join(parts)
+
+
+def render_metrics(state) -> str:
+    """
+    Prometheus text exposition; component stats are sampled at scrape time.
+    """
+    if state.embedder is not None:
+        cache = state.embedder.stats().get("cache") or {}
+        EMBEDDING_CACHE.set(cache.get("hits", 0), result="hit")
+        EMBEDDING_CACHE.set(cache.get("misses", 0), result="miss")
+    if state.llm_scheduler is not None:
+        stats = state.llm_scheduler.stats()
+        LLM_QUEUE.set(stats["in_flight"], kind="in_flight")
+        LLM_QUEUE.set(stats["queue_depth"], kind="queue_depth")
+    return REGISTRY.render()
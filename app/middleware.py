@@ -3,6 +3,9 @@ import logging
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from app.config import settings
+from app.metrics import REQUEST_SECONDS, request_timing, server_timing_header
+
 logger = logging.getLogger("medrag")
 
 
@@ -10,12 +13,26 @@ class PrivacyAwareLoggingMiddleware(BaseHTTPMiddleware):
     """
     Logs only metadata (path, status, latency). Does NOT log request body or retrieved text.
     This is a basic privacy-aware posture suitable for clinical tooling.
+
+    Also records request latency by route template (not the raw path) and,
+    if enabled, adds a Server-Timing header with the per-stage breakdown.
     """
 
     async def dispatch(self, request: Request, call_next):
         start = time.perf_counter()
-        response = await call_next(request)
-        ms = (time.perf_counter() - start) * 1000
+        with request_timing() as stages:
+            response = await call_next(request)
+        elapsed = time.perf_counter() - start
+        ms = elapsed * 1000
+
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(
+            elapsed,
+            route=getattr(route, "path", "unmatched"),
+            status=str(response.status_code),
+        )
+        if settings.server_timing_enabled:
+            response.headers["Server-Timing"] = server_timing_header(stages, elapsed)
 
         logger.info(
             "request path=%s status=%s latency_ms=%.2f",
@@ -2,9 +2,16 @@ from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
 
+class MetadataFilter(BaseModel):
+    source_file: Optional[List[str]] = Field(None, description="Any of these source files")
+    doc_type: Optional[List[str]] = Field(None, description="Any of these document types")
+    tags: Optional[List[str]] = Field(None, description="All of these tags")
+
+
 class RetrieveRequest(BaseModel):
     question: str = Field(..., min_length=1, description="User question")
     top_k: int = Field(3, ge=1, le=10, description="Number of chunks to retrieve")
+    filters: Optional[MetadataFilter] = Field(None, description="Only retrieve chunks matching these metadata")
 
 
 class RetrievedChunk(BaseModel):
@@ -24,11 +31,25 @@ class RetrieveResponse(BaseModel):
 class QueryRequest(BaseModel):
     question: str = Field(..., min_length=1)
     top_k: int = Field(3, ge=1, le=10)
+    filters: Optional[MetadataFilter] = None
 
 class GroundingInfo(BaseModel):
     best_distance: float | None = None
     max_distance_threshold: float
     abstained: bool
+    cached: bool = False
+    coalesced: bool = False
+
+class CitationCheck(BaseModel):
+    id: str
+    valid: bool
+    count: int
+
+class CitationReport(BaseModel):
+    citations: List[CitationCheck]
+    valid_ids: List[str]
+    invalid_ids: List[str]
+    coverage: float
 
 class QueryResponse(BaseModel):
     question: str
@@ -37,5 +58,33 @@ class QueryResponse(BaseModel):
     chunks: List[RetrievedChunk]
     warning_flags: List[str]
     grounding: GroundingInfo
+    citation_report: Optional[CitationReport] = None
+
+
+class BatchRetrieveRequest(BaseModel):
+    items: List[RetrieveRequest] = Field(..., min_length=1)
+
+class BatchRetrieveItem(BaseModel):
+    index: int
+    result: Optional[RetrieveResponse] = None
+    error: Optional[str] = None
+
+class BatchRetrieveResponse(BaseModel):
+    results: List[BatchRetrieveItem]
+
+class BatchQueryRequest(BaseModel):
+    items: List[QueryRequest] = Field(..., min_length=1)
+
+class BatchQueryItem(BaseModel):
+    index: int
+    result: Optional[QueryResponse] = None
+    error: Optional[str] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryItem]
 
+class ActivateIndexRequest(BaseModel):
+    version: str = Field(..., min_length=1, description="Registered index version, or 'unversioned'")
 
+class CollectIndexGarbageRequest(BaseModel):
+    keep: Optional[int] = Field(None, ge=0, description="Ready versions to keep besides the active and previous ones")
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.data_ingest.embedding import normalize_question
+
+
+def make_answer_key(
+    question: str,
+    chunk_ids: List[str],
+    model: str,
+    temperature: float,
+    prompt_hash: str,
+) -> str:
+    """
+    Fingerprint of everything that determines an LLM answer: the question,
+    the ordered evidence, and the generation settings.
+    """
+    payload = json.dumps(
+        [normalize_question(question), list(chunk_ids), model, float(temperature), prompt_hash],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    LRU cache for generated answers with an optional SQLite backing file,
+    so entries survive restarts.
+
+    Entries are tagged with the vector store's index version; when the
+    collection is re-ingested the version changes and every older entry is
+    dropped.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        sqlite_path: str | None = None,
+        disk_max_entries: int = 10000,
+        version_check_s: float = 5.0,
+    ):
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self.version_check_s = version_check_s
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._index_version: str | None = None
+        self._version_checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._db: sqlite3.Connection | None = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT PRIMARY KEY,"
+                " index_version TEXT,"
+                " value TEXT NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers(last_used)")
+            self._db.commit()
+
+    def sync_index_version(self, fetch_version: Callable[[], str | None]):
+        """
+        Re-read the index version at most every `version_check_s` seconds
+        and invalidate the cache if it changed.
+        """
+        now = time.monotonic()
+        if self._version_checked_at and now - self._version_checked_at < self.version_check_s:
+            return
+        self._version_checked_at = now
+        self.set_index_version(fetch_version())
+
+    def set_index_version(self, version: str | None):
+        with self._lock:
+            if version == self._index_version:
+                return
+            self._index_version = version
+            self._entries.clear()
+            self.invalidations += 1
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM answers WHERE index_version IS NOT ?", (version,)
+                )
+                self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM answers WHERE key = ? AND index_version IS ?",
+                    (key, self._index_version),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE answers SET last_used = ? WHERE key = ?", (time.time(), key)
+                    )
+                    self._db.commit()
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers (key, index_version, value, last_used)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, self._index_version, json.dumps(value), time.time()),
+                )
+                self._db.execute(
+                    "DELETE FROM answers WHERE key IN ("
+                    " SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM answers")
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            disk_size = None
+            if self._db is not None:
+                disk_size = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_size": disk_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
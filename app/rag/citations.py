@@ -0,0 +1,118 @@
+from typing import Dict, Iterable, List, Optional
+
+# A marker longer than this (or spanning a newline) is not a citation
+MAX_MARKER_CHARS = 256
+
+# Prefix some models copy from the context format: [chunk_id: x]
+_ID_PREFIX = "chunk_id:"
+
+
+class CitationParser:
+    """
+    Extracts [source_id] markers from answer text in one left-to-right
+    pass and checks each against the retrieved ids with a set lookup, so
+    `file::chunk_1` never matches `file::chunk_12`.
+
+    Incremental: feed() accepts text in arbitrary pieces (LLM stream
+    tokens); a marker split across pieces is carried over until its closing
+    bracket arrives.
+    """
+
+    def __init__(self, retrieved_ids: Iterable[str]):
+        self.retrieved = frozenset(retrieved_ids)
+        self._carry: Optional[List[str]] = None  # pieces of an open marker
+        self._carry_len = 0
+        self._counts: Dict[str, int] = {}
+        self._order: List[str] = []
+
+    def feed(self, text: str) -> List[Dict[str, object]]:
+        """
+        Scan the next piece of text; returns the markers completed in it.
+        """
+        found: List[Dict[str, object]] = []
+        i, n = 0, len(text)
+        while i < n:
+            if self._carry is None:
+                start = text.find("[", i)
+                if start == -1:
+                    break
+                self._carry, self._carry_len = [], 0
+                i = start + 1
+                continue
+
+            close = text.find("]", i)
+            end = n if close == -1 else close
+            # A new "[" or a line break before the "]" abandons the open marker
+            reopen = text.find("[", i, end)
+            newline = text.find("\n", i, end)
+            cut = min(p for p in (reopen, newline, end) if p != -1)
+            if cut != end:
+                self._carry = None
+                i = cut if cut == reopen else cut + 1
+                continue
+
+            self._carry.append(text[i:end])
+            self._carry_len += end - i
+            if self._carry_len > MAX_MARKER_CHARS:
+                self._carry = None
+                i = end
+                continue
+            if close == -1:
+                break
+
+            marker = "".join(self._carry)
+            self._carry = None
+            i = close + 1
+            found.extend(self._record(marker))
+        return found
+
+    def _record(self, marker: str) -> List[Dict[str, object]]:
+        marker = marker.strip()
+        if marker.startswith(_ID_PREFIX):
+            marker = marker[len(_ID_PREFIX):].strip()
+        if not marker:
+            return []
+
+        # "[a; b]" / "[a, b]" cite several chunks, unless the whole marker is an id
+        ids = [marker]
+        if marker not in self.retrieved and (";" in marker or "," in marker):
+            parts = [p.strip() for p in marker.replace(";", ",").split(",")]
+            if any(p in self.retrieved for p in parts):
+                ids = [p for p in parts if p]
+
+        out = []
+        for cid in ids:
+            if cid not in self._counts:
+                self._order.append(cid)
+            self._counts[cid] = self._counts.get(cid, 0) + 1
+            out.append({"id": cid, "valid": cid in self.retrieved})
+        return out
+
+    @property
+    def valid_ids(self) -> List[str]:
+        return [cid for cid in self._order if cid in self.retrieved]
+
+    @property
+    def invalid_ids(self) -> List[str]:
+        return [cid for cid in self._order if cid not in self.retrieved]
+
+    def report(self) -> Dict[str, object]:
+        """
+        Per-citation validity and counts, plus coverage: the share of
+        retrieved chunks the answer actually cites.
+        """
+        valid = self.valid_ids
+        return {
+            "citations": [
+                {"id": cid, "valid": cid in self.retrieved, "count": self._counts[cid]} for cid in self._order
+            ],
+            "valid_ids": valid,
+            "invalid_ids": self.invalid_ids,
+            "coverage": (len(valid) / len(self.retrieved)) if self.retrieved else 0.0,
+        }
+
+
+def parse_citations(text: str, retrieved_ids: Iterable[str]) -> CitationParser:
+    parser = CitationParser(retrieved_ids)
+    parser.feed(text)
+    return parser
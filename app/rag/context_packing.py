@@ -0,0 +1,145 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+# Rough size of a token for English text; good enough for budgeting prompts
+CHARS_PER_TOKEN = 4
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
+
+# Shortest suffix/prefix match accepted as chunk overlap
+MIN_OVERLAP_CHARS = 16
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def packing_signature() -> str:
+    """
+    Packing config as a string, folded into the answer cache key so answers
+    generated from differently packed prompts are not mixed.
+    """
+    if not settings.context_packing_enabled:
+        return "packing=off"
+    return f"packing=on;budget={settings.context_token_budget}"
+
+
+@dataclass
+class PackedContext:
+    text: str
+    chunk_ids: List[str] = field(default_factory=list)
+    dropped_chunk_ids: List[str] = field(default_factory=list)
+    merged_chunks: int = 0
+    original_tokens: int = 0
+    packed_tokens: int = 0
+
+
+def overlap_length(previous: str, following: str) -> int:
+    """
+    Length of the longest suffix of `previous` that is a prefix of
+    `following` (the text splitter's chunk_overlap), 0 if shorter than
+    MIN_OVERLAP_CHARS.
+    """
+    probe = following[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+
+    # Candidate starts are occurrences of the probe; the earliest full match
+    # is the longest overlap
+    start = previous.find(probe)
+    while start != -1:
+        if following.startswith(previous[start:]):
+            return len(previous) - start
+        start = previous.find(probe, start + 1)
+    return 0
+
+
+def _position(chunk) -> Optional[int]:
+    value = chunk.metadata.get("chunk_id")
+    return value if isinstance(value, int) else None
+
+
+def _entries(chunks) -> List[Tuple[str, str, bool]]:
+    """
+    (chunk_id, text, continues_previous) in prompt order: sources in order of
+    their best-ranked chunk, chunks of a source in document order. Text
+    repeated from the previous adjacent chunk (or from any chunk already in
+    the prompt) is dropped, but the chunk's id is always kept.
+    """
+    groups: Dict[str, list] = {}
+    for c in sorted(chunks, key=lambda c: c.rank):
+        groups.setdefault(c.source_file, []).append(c)
+
+    entries: List[Tuple[str, str, bool]] = []
+    seen_texts: List[str] = []
+    for group in groups.values():
+        group.sort(key=lambda c: (_position(c) is None, _position(c) or 0, c.rank))
+        previous = None
+        for c in group:
+            text = c.text
+            adjacent = (
+                previous is not None
+                and _position(c) is not None
+                and _position(previous) is not None
+                and _position(c) - _position(previous) <= 1
+            )
+            if any(text in seen for seen in seen_texts):
+                text = ""
+            elif adjacent:
+                text = text[overlap_length(previous.text, text):].lstrip()
+            if c.text:
+                seen_texts.append(c.text)
+            entries.append((c.chunk_id, text, adjacent))
+            previous = c
+    return entries
+
+
+def _render(entries: List[Tuple[str, str, bool]]) -> str:
+    parts: List[str] = []
+    for chunk_id, text, continues in entries:
+        body = f"chunk_id: {chunk_id}\ntext: {text}" if text else f"chunk_id: {chunk_id}\ntext: (same as above)"
+        if continues and parts:
+            parts[-1] += "\n" + body
+        else:
+            parts.append(body)
+    return CHUNK_SEPARATOR.join(parts)
+
+
+def pack_context(chunks, token_budget: int | None = None) -> PackedContext:
+    """
+    Merge adjacent / overlapping chunks of the same source file into one
+    passage (each chunk still introduced by its own chunk_id line), drop
+    duplicated text and keep the prompt within `token_budget` (0 = no limit).
+
+    Under a budget, chunks are admitted best rank first; a lower-ranked chunk
+    that does not fit is left out whole (its id is reported in
+    dropped_chunk_ids). Chunk text is never cut, so the best-ranked chunk is
+    kept even if it alone exceeds the budget.
+    """
+    token_budget = settings.context_token_budget if token_budget is None else token_budget
+    original = CHUNK_SEPARATOR.join(f"chunk_id: {c.chunk_id}\ntext: {c.text}" for c in chunks)
+    packed = PackedContext(text="", original_tokens=estimate_tokens(original))
+    if not chunks:
+        return packed
+
+    by_rank = sorted(chunks, key=lambda c: c.rank)
+    selected = list(by_rank)
+    if token_budget > 0:
+        selected = []
+        for c in by_rank:
+            candidate = selected + [c]
+            if not selected or estimate_tokens(_render(_entries(candidate))) <= token_budget:
+                selected = candidate
+            else:
+                packed.dropped_chunk_ids.append(c.chunk_id)
+
+    entries = _entries(selected)
+    text = _render(entries)
+
+    packed.text = text
+    packed.chunk_ids = [chunk_id for chunk_id, _, _ in entries]
+    packed.merged_chunks = sum(1 for _, _, continues in entries if continues)
+    packed.packed_tokens = estimate_tokens(text)
+    return packed
@@ -1,9 +1,21 @@
-from typing import Dict, Any, List
+import asyncio
+import hashlib
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Dict, Any, List, AsyncIterator, Optional
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
 
-from app.rag.retriever import retrieve_context
+from app.rag.retriever import retrieve_context, aretrieve_context
+from app.rag.answer_cache import make_answer_key
+from app.db.metadata_index import Filters, filter_key
+from app.data_ingest.embedding import normalize_question
+from app.rag.context_packing import pack_context, packing_signature
+from app.rag.citations import CitationParser, parse_citations
+from app.rag.llm_scheduler import priority_for, SchedulerRejected
+from app.metrics import stage_timer, record_stage, record_answer, ANSWER_CACHE_LOOKUPS, LLM_REJECTIONS
 from app.config import settings
+from app.concurrency import run_blocking
 
 from app.state import state
 
@@ -26,6 +38,8 @@ Context (each chunk has a chunk_id):
 Write a concise answer with citations.
 """
 
+PROMPT_HASH = hashlib.sha256((SYSTEM_PROMPT + USER_PROMPT).encode("utf-8")).hexdigest()
+
 def should_abstain(chunks, max_distance: float = 0.8) -> bool:
     # Conservative default for small demo corpus; we can tune later
     distances = [c.distance for c in chunks if c.distance is not None]
@@ -45,67 +59,339 @@ def format_context(chunks) -> str:
         lines.append(f"chunk_id: {c.chunk_id}\ntext: {c.text}")
     return "\n\n---\n\n".join(lines)
 
+def build_context(chunks) -> str:
+    """
+    Prompt context: packed (overlaps merged, duplicates dropped, token
+    budget applied) unless context packing is disabled.
+    """
+    if not settings.context_packing_enabled:
+        return format_context(chunks)
+    return pack_context(chunks).text
 
-def answer_question(question: str, top_k: int = 3) -> Dict[str, Any]:
-    chunks, citations = retrieve_context(question, top_k=top_k)
+def prompt_hash() -> str:
+    # Prompt templates + packing config: both change what the LLM sees
+    return hashlib.sha256(f"{PROMPT_HASH}:{packing_signature()}".encode("utf-8")).hexdigest()
 
-    # --- grounding diagnostics ---
-    distances = [c.distance for c in chunks if c.distance is not None]
-    best_distance = min(distances) if distances else None
 
+ABSTAIN_ANSWER = "I don't know based on the provided documents."
+
+PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_PROMPT),
+        ("user", USER_PROMPT),
+    ]
+)
+
+
+def build_grounding(chunks) -> Dict[str, Any]:
+    # --- grounding diagnostics ---
+    best = best_distance(chunks)
     abstain = (
-        best_distance is None
-        or best_distance > settings.max_distance
+        best is None
+        or best > settings.max_distance
     )
-
-    grounding = {
-        "best_distance": best_distance,
+    return {
+        "best_distance": best,
         "max_distance_threshold": settings.max_distance,
         "abstained": abstain,
+        "cached": False,
+        "coalesced": False,
+    }
+
+
+def _result(question, answer, citations, chunks, warning_flags, grounding, citation_report=None) -> Dict[str, Any]:
+    record_answer(grounding, warning_flags)
+    return {
+        "question": question,
+        "answer": answer,
+        "citations": citations,
+        "chunks": chunks,  # RetrievedChunk models; rendered by the router
+        "warning_flags": warning_flags,
+        "grounding": grounding,
+        "citation_report": citation_report,
     }
 
-    if abstain:
-        return {
-            "question": question,
-            "answer": "I don't know based on the provided documents.",
-            "citations": citations,
-            "chunks": [c.model_dump() for c in chunks],
-            "warning_flags": ["low_retrieval_confidence"],
-            "grounding": grounding,
-        }
-
-    context_str = format_context(chunks)
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_PROMPT),
-            ("user", USER_PROMPT),
-        ]
+
+def _lookup_cache(question: str, citations: List[str]):
+    """
+    Return (cache_key, cached_value); both None when the cache is disabled.
+    """
+    cache = state.answer_cache
+    if cache is None:
+        return None, None
+
+    if state.vector_store is not None:
+        cache.sync_index_version(state.vector_store.index_version)
+    cache_key = make_answer_key(
+        question,
+        citations,
+        settings.ollama_model,
+        settings.llm_temperature,
+        prompt_hash(),
     )
+    with stage_timer("answer_cache"):
+        cached = cache.get(cache_key)
+    ANSWER_CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+    return cache_key, cached
+
+
+def _finalize(
+    question, answer_text, chunks, citations, grounding, cache_key, parser: CitationParser | None = None
+) -> Dict[str, Any]:
+    """
+    Validate the answer's [chunk_id] markers against the retrieved ids
+    (reusing the parser that already consumed the stream, if any). No valid
+    citation -> abstain; citations to ids that were never retrieved are
+    flagged.
+    """
+    with stage_timer("citation_check"):
+        if parser is None:
+            parser = parse_citations(answer_text, citations)
+        report = parser.report()
+
+    if not report["valid_ids"]:
+        answer, warning_flags = ABSTAIN_ANSWER, ["missing_citations_in_answer"]
+    else:
+        answer, warning_flags = answer_text, []
+        if report["invalid_ids"]:
+            warning_flags.append("invalid_citations_in_answer")
 
+    if cache_key is not None and state.answer_cache is not None:
+        state.answer_cache.put(
+            cache_key, {"answer": answer, "warning_flags": warning_flags, "citation_report": report}
+        )
+
+    return _result(question, answer, citations, chunks, warning_flags, grounding, report)
+
+
+def _chain():
     if state.llm is None:
         raise RuntimeError("LLM not initialized. Startup hook did not run.")
+    return PROMPT | state.llm
 
-    chain = prompt | state.llm
-    response = chain.invoke({"question": question, "context": context_str})
-    answer_text = response.content
 
-    if not any(cid in answer_text for cid in citations):
-        return {
-            "question": question,
-            "answer": "I don't know based on the provided documents.",
-            "citations": citations,
-            "chunks": [c.model_dump() for c in chunks],
-            "warning_flags": ["missing_citations_in_answer"],
-            "grounding": grounding,
-        }
+@asynccontextmanager
+async def _llm_slot(question: str, batch: bool = False):
+    """
+    Hold an LLM scheduler slot (if the scheduler is running) for the
+    duration of one generation. Raises SchedulerRejected on overload.
+    """
+    scheduler = state.llm_scheduler
+    if scheduler is None:
+        yield
+        return
+    priority = priority_for(question, settings.llm_short_question_chars, batch)
+    start = time.perf_counter()
+    try:
+        async with scheduler.slot(priority):
+            record_stage("llm_queue", time.perf_counter() - start)
+            yield
+    except SchedulerRejected as exc:
+        LLM_REJECTIONS.inc(reason=exc.reason)
+        raise
 
-    return {
+
+def answer_from_chunks(question: str, chunks, citations: List[str]) -> Dict[str, Any]:
+    grounding = build_grounding(chunks)
+    if grounding["abstained"]:
+        return _result(question, ABSTAIN_ANSWER, citations, chunks, ["low_retrieval_confidence"], grounding)
+
+    cache_key, cached = _lookup_cache(question, citations)
+    if cached is not None:
+        grounding["cached"] = True
+        return _result(
+            question, cached["answer"], citations, chunks, cached["warning_flags"], grounding,
+            cached.get("citation_report"),
+        )
+
+    with stage_timer("prompt_build"):
+        context_str = build_context(chunks)
+    with stage_timer("llm_generate"):
+        response = _chain().invoke({"question": question, "context": context_str})
+    return _finalize(question, response.content, chunks, citations, grounding, cache_key)
+
+
+async def aanswer_from_chunks(question: str, chunks, citations: List[str], batch: bool = False) -> Dict[str, Any]:
+    """
+    Async twin of answer_from_chunks: the LLM round trip is awaited via
+    ainvoke, so a slow generation holds a coroutine rather than a thread.
+    Generations are admitted by the LLM scheduler (batch=True uses the
+    lowest-priority lane); cache hits and abstentions skip it. Answer cache
+    lookups and writes (SQLite, index version check) run on the blocking
+    executor.
+    """
+    grounding = build_grounding(chunks)
+    if grounding["abstained"]:
+        return _result(question, ABSTAIN_ANSWER, citations, chunks, ["low_retrieval_confidence"], grounding)
+
+    cache_key, cached = await run_blocking(_lookup_cache, question, citations)
+    if cached is not None:
+        grounding["cached"] = True
+        return _result(
+            question, cached["answer"], citations, chunks, cached["warning_flags"], grounding,
+            cached.get("citation_report"),
+        )
+
+    with stage_timer("prompt_build"):
+        context_str = build_context(chunks)
+    async with _llm_slot(question, batch):
+        with stage_timer("llm_generate"):
+            response = await _chain().ainvoke({"question": question, "context": context_str})
+    return await run_blocking(_finalize, question, response.content, chunks, citations, grounding, cache_key)
+
+
+def answer_question(question: str, top_k: int = 3, filters: Optional[Filters] = None) -> Dict[str, Any]:
+    chunks, citations = retrieve_context(question, top_k=top_k, filters=filters)
+    return answer_from_chunks(question, chunks, citations)
+
+
+async def _aanswer_question(question: str, top_k: int, filters: Optional[Filters]) -> Dict[str, Any]:
+    chunks, citations = await aretrieve_context(question, top_k=top_k, filters=filters)
+    return await aanswer_from_chunks(question, chunks, citations)
+
+
+async def aanswer_question(question: str, top_k: int = 3, filters: Optional[Filters] = None) -> Dict[str, Any]:
+    """
+    Concurrent calls with the same normalized question, top_k and filters
+    share one retrieval + generation; joiners get grounding["coalesced"] = True.
+    """
+    flight = state.query_singleflight
+    if flight is None:
+        return await _aanswer_question(question, top_k, filters)
+
+    start = time.perf_counter()
+    result, shared = await flight.do(
+        (normalize_question(question), top_k, filter_key(filters)),
+        lambda: _aanswer_question(question, top_k, filters),
+    )
+    if not shared:
+        return result
+    record_stage("coalesced_wait", time.perf_counter() - start)
+    # Copy: the leader and other joiners hold the same dict
+    return {**result, "question": question, "grounding": {**result["grounding"], "coalesced": True}}
+
+
+_STREAM_END = object()
+
+
+async def _iter_events(events: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    for event in events:
+        yield event
+
+
+async def _generate_into(queue: asyncio.Queue, slot: AsyncExitStack, question: str, context_str: str):
+    """
+    Run one streamed generation inside an already-held LLM slot, pushing
+    the pieces onto `queue`. The slot is released when the LLM finishes,
+    not when a slow client has read the last token.
+    """
+    try:
+        async with slot:
+            with stage_timer("llm_generate"):
+                async for piece in _chain().astream({"question": question, "context": context_str}):
+                    if piece.content:
+                        queue.put_nowait(piece.content)
+    except Exception as exc:
+        queue.put_nowait(exc)
+    finally:
+        queue.put_nowait(_STREAM_END)
+
+
+async def _generated_events(
+    question: str, retrieval: Dict[str, Any], chunks, citations: List[str], cache_key, queue: asyncio.Queue, task
+) -> AsyncIterator[Dict[str, Any]]:
+    yield retrieval
+    parts: List[str] = []
+    parser = CitationParser(citations)
+    try:
+        while (piece := await queue.get()) is not _STREAM_END:
+            if isinstance(piece, Exception):
+                raise piece
+            parts.append(piece)
+            yield {"event": "token", "text": piece}
+            for marker in parser.feed(piece):
+                yield {"event": "citation", **marker}
+    finally:
+        # No-op once generation is done; stops it if the client went away
+        task.cancel()
+
+    grounding = retrieval["grounding"]
+    result = await run_blocking(_finalize, question, "".join(parts), chunks, citations, grounding, cache_key, parser)
+    yield {
+        "event": "final",
+        "answer": result["answer"],
+        "warning_flags": result["warning_flags"],
+        "citation_report": result["citation_report"],
+        "retracted": "missing_citations_in_answer" in result["warning_flags"],
+    }
+
+
+async def astream_answer(
+    question: str, top_k: int = 3, filters: Optional[Filters] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of aanswer_question. Retrieves and, when generation is
+    needed, takes the LLM scheduler slot before returning, so SchedulerRejected
+    is raised here (before any response is sent) rather than mid-stream.
+    Returns an iterator of events:
+      - "retrieval": chunks, citations and grounding, as soon as the distance gate is decided
+      - "token": LLM output fragments as they arrive
+      - "citation": each [chunk_id] marker as soon as it is complete, with "valid"
+        telling whether that id was retrieved
+      - "final": the validated answer, warning_flags and citation_report; "retracted"
+        is true when citation validation rejected the streamed text
+    """
+    chunks, citations = await aretrieve_context(question, top_k=top_k, filters=filters)
+    grounding = build_grounding(chunks)
+
+    cache_key, cached = (None, None)
+    if not grounding["abstained"]:
+        cache_key, cached = await run_blocking(_lookup_cache, question, citations)
+        grounding["cached"] = cached is not None
+
+    retrieval = {
+        "event": "retrieval",
         "question": question,
-        "answer": answer_text,
         "citations": citations,
-        "chunks": [c.model_dump() for c in chunks],
-        "warning_flags": [],
+        "chunks": chunks,
         "grounding": grounding,
     }
 
+    if grounding["abstained"]:
+        record_answer(grounding, ["low_retrieval_confidence"])
+        return _iter_events([
+            retrieval,
+            {
+                "event": "final",
+                "answer": ABSTAIN_ANSWER,
+                "warning_flags": ["low_retrieval_confidence"],
+                "citation_report": None,
+                "retracted": False,
+            },
+        ])
+
+    if cached is not None:
+        record_answer(grounding, cached["warning_flags"])
+        # Same event contract as a generated answer: citation events follow the text
+        markers = CitationParser(citations).feed(cached["answer"])
+        return _iter_events([
+            retrieval,
+            {"event": "token", "text": cached["answer"]},
+            *({"event": "citation", **marker} for marker in markers),
+            {
+                "event": "final",
+                "answer": cached["answer"],
+                "warning_flags": cached["warning_flags"],
+                "citation_report": cached.get("citation_report"),
+                "retracted": False,
+            },
+        ])
+
+    with stage_timer("prompt_build"):
+        context_str = build_context(chunks)
+    slot = AsyncExitStack()
+    await slot.enter_async_context(_llm_slot(question))
+    # Generation runs at the LLM's pace, buffered in the queue for the client
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(_generate_into(queue, slot, question, context_str))
+    return _generated_events(question, retrieval, chunks, citations, cache_key, queue, task)
@@ -0,0 +1,303 @@
+import json
+import math
+import os
+import re
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.db.index_registry import UNVERSIONED, index_root, version_dir
+from app.db.metadata_index import Filters, MetadataIndex
+
+LEXICAL_INDEX_FILE = "lexical_index.npz"
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Reciprocal rank fusion constant: score = sum(1 / (RRF_K + rank))
+RRF_K = 60
+
+# Words too common to say anything about scope
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it its may of on or "
+    "should that the this to was what when where which who why will with you your".split()
+)
+
+# Words, numbers and compounds like "covid-19", "0.5", "iv-push"
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms minus stopwords. Compounds are kept whole and also
+    split into their parts, so "covid-19" matches both "covid-19" and "covid".
+    """
+    terms: List[str] = []
+    for token in _TOKEN.findall(text.lower()):
+        parts = re.split(r"[.\-/]", token)
+        if len(parts) > 1:
+            terms.append(token)
+        terms.extend(p for p in parts if p not in STOPWORDS)
+    return terms
+
+
+def lexical_index_path(version: str | None = None) -> Path:
+    # Lives next to the vector index it was built with
+    if version and version != UNVERSIONED:
+        return version_dir(version) / LEXICAL_INDEX_FILE
+    return index_root() / LEXICAL_INDEX_FILE
+
+
+class BM25Index:
+    """
+    Inverted index over chunk texts with array-backed postings (CSR layout):
+    the postings of term t are doc_ids[offsets[t]:offsets[t + 1]], with the
+    BM25 weight of each posting precomputed (document lengths are fixed), so
+    a query is one vectorized add per query term.
+
+    Only chunk ids, postings and the filter postings are kept: chunk text
+    and metadata live in the vector store, so API workers do not each hold
+    a copy of the corpus.
+    """
+
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        weights: np.ndarray,
+        ids: List[str],
+        filter_index: MetadataIndex,
+    ):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.ids = ids
+        self.filter_index = filter_index
+
+    @classmethod
+    def build(cls, chunks: Iterable[Dict[str, Any]]) -> "BM25Index":
+        """
+        Single pass over `chunks`; only their terms and filter fields are
+        retained, so a streamed corpus is never held in memory.
+        """
+        vocab: Dict[str, int] = {}
+        ids: List[str] = []
+        filter_index = MetadataIndex()
+        # Flat typed arrays: a posting costs 16 bytes, not three Python ints
+        post_terms = array("q")
+        post_docs = array("i")
+        post_tfs = array("f")
+        lengths = array("f")
+
+        for doc, chunk in enumerate(chunks):
+            terms = tokenize(chunk["content"])
+            for term, tf in Counter(terms).items():
+                post_terms.append(vocab.setdefault(term, len(vocab)))
+                post_docs.append(doc)
+                post_tfs.append(tf)
+            ids.append(chunk["metadata"]["chunk_uid"])
+            filter_index.add(chunk["metadata"])
+            lengths.append(len(terms))
+        filter_index.finish()
+
+        n_docs = len(ids)
+        terms_arr = np.frombuffer(post_terms, dtype=np.int64)
+        docs_arr = np.frombuffer(post_docs, dtype=np.int32)
+        tfs = np.frombuffer(post_tfs, dtype=np.float32)
+        doc_len = np.frombuffer(lengths, dtype=np.float32)
+        avg_len = float(doc_len.mean()) if n_docs else 0.0
+
+        df = np.bincount(terms_arr, minlength=len(vocab)).astype(np.float64)
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * doc_len[docs_arr] / max(avg_len, 1e-9))
+        weights = (idf[terms_arr] * tfs * (BM25_K1 + 1.0) / (tfs + norm)).astype(np.float32)
+
+        order = np.argsort(terms_arr, kind="stable")
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df.astype(np.int64), out=offsets[1:])
+        return cls(vocab, offsets, docs_arr[order], weights[order], ids, filter_index)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, question: str, top_k: int, filters: Optional[Filters] = None) -> List[Tuple[int, float]]:
+        """
+        Best (doc, score) pairs, highest first; only docs sharing a term with
+        the question (and matching `filters`, if given) are returned.
+        """
+        term_ids = {self.vocab[t] for t in tokenize(question) if t in self.vocab}
+        if not term_ids or top_k <= 0:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for t in term_ids:
+            start, end = self.offsets[t], self.offsets[t + 1]
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+        if filters:
+            allowed = np.zeros(len(self.ids), dtype=np.bool_)
+            allowed[self.filter_index.positions(filters)] = True
+            scores[~allowed] = 0.0
+
+        hits = np.flatnonzero(scores)
+        if hits.size > top_k:
+            hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(d), float(scores[d])) for d in hits]
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        vocab = sorted(self.vocab, key=self.vocab.get)
+        tmp = path.with_suffix(".npz.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                offsets=self.offsets,
+                doc_ids=self.doc_ids,
+                weights=self.weights,
+                vocab=np.frombuffer("\n".join(vocab).encode("utf-8"), dtype=np.uint8),
+                ids=np.frombuffer(json.dumps(self.ids).encode("utf-8"), dtype=np.uint8),
+                **self.filter_index.to_arrays(),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            vocab_text = data["vocab"].tobytes().decode("utf-8")
+            vocab = {term: i for i, term in enumerate(vocab_text.split("\n"))} if vocab_text else {}
+            if "ids" in data:
+                ids = json.loads(data["ids"].tobytes().decode("utf-8"))
+                filter_index = MetadataIndex.from_arrays(data)
+            else:
+                # Files written before text moved out of the index
+                docs = json.loads(data["docs"].tobytes().decode("utf-8"))
+                ids, filter_index = docs["ids"], MetadataIndex(docs["metadatas"])
+            return cls(vocab, data["offsets"], data["doc_ids"], data["weights"], ids, filter_index)
+
+
+class LexicalIndexHandle:
+    """
+    The lexical index of the index version being served, reloaded when the
+    file is rewritten by an ingest or the served version changes (checked at
+    most every `check_s` seconds). current() is None when no index exists.
+    """
+
+    def __init__(self, path_fn: Callable[[], Path], check_s: float = 5.0):
+        self.path_fn = path_fn
+        self.check_s = check_s
+        self._index: Optional[BM25Index] = None
+        self._loaded: Tuple[Path, int] | None = None
+        self._checked_at = 0.0
+
+    def current(self) -> Optional[BM25Index]:
+        now = time.monotonic()
+        if self._checked_at and now - self._checked_at < self.check_s:
+            return self._index
+        self._checked_at = now
+        path = self.path_fn()
+        try:
+            key = (path, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            self._index, self._loaded = None, None
+            return None
+        if key != self._loaded:
+            self._index, self._loaded = BM25Index.load(path), key
+        return self._index
+
+    def invalidate(self):
+        """Re-check the file on the next current(), e.g. after an index swap."""
+        self._checked_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        index = self._index
+        return {"chunks": len(index), "terms": len(index.vocab)} if index is not None else {"chunks": 0}
+
+
+def fuse_results(
+    dense: Dict[str, List[List[Any]]],
+    lexical: BM25Index,
+    lexical_hits: Sequence[Tuple[int, float]],
+    query_embedding: Sequence[float],
+    store,
+    top_k: int,
+) -> Dict[str, List[List[Any]]]:
+    """
+    Reciprocal rank fusion of one query's dense results and BM25 hits, as a
+    Chroma-style result (one inner list) so retrieval can build chunks as usual.
+
+    Every returned hit keeps a real dense distance: lexical-only hits get
+    the squared L2 distance between the query and their stored vector, so
+    the grounding threshold still applies to them. Lexical hits whose chunk
+    is no longer in the vector store are dropped.
+    """
+    fused: Dict[str, float] = {}
+    rows: Dict[str, Tuple[str, Dict[str, Any], float | None]] = {}
+
+    for rank, (cid, text, meta, dist) in enumerate(
+        zip(dense["ids"][0], dense["documents"][0], dense["metadatas"][0], dense["distances"][0]), start=1
+    ):
+        fused[cid] = fused.get(cid, 0.0) + 1.0 / (RRF_K + rank)
+        rows[cid] = (text, meta, dist)
+
+    lexical_only = []
+    for rank, (doc, _) in enumerate(lexical_hits, start=1):
+        cid = lexical.ids[doc]
+        fused[cid] = fused.get(cid, 0.0) + 1.0 / (RRF_K + rank)
+        if cid not in rows:
+            lexical_only.append(cid)
+
+    if lexical_only:
+        # Text, metadata and vector come from the store, which is also the
+        # source of truth for whether the chunk still exists
+        found = store.get_chunks(lexical_only)
+        q = np.asarray(query_embedding, dtype=np.float32)
+        for cid in lexical_only:
+            chunk = found.get(cid)
+            if chunk is None:
+                del fused[cid]
+                continue
+            diff = q - np.asarray(chunk["embedding"], dtype=np.float32)
+            rows[cid] = (chunk["document"], chunk["metadata"], float(np.dot(diff, diff)))
+
+    best = sorted(fused, key=lambda cid: (-fused[cid], rows[cid][2] if rows[cid][2] is not None else math.inf))
+    best = best[:top_k]
+    return {
+        "ids": [best],
+        "documents": [[rows[cid][0] for cid in best]],
+        "metadatas": [[rows[cid][1] for cid in best]],
+        "distances": [[rows[cid][2] for cid in best]],
+    }
+
+
+def build_lexical_index(chunks: Iterable[Dict[str, Any]], path: Path) -> BM25Index:
+    index = BM25Index.build(chunks)
+    index.save(path)
+    return index
+
+
+def iter_store_chunks(store, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    The chunks held by a vector store, as ingest-style chunk dicts, read a
+    page at a time.
+    """
+    ids = store.list_ids()
+    for start in range(0, len(ids), page_size):
+        page = ids[start:start + page_size]
+        found = store.get_chunks(page, embeddings=False)
+        for cid in page:
+            if cid in found:
+                yield {"content": found[cid]["document"], "metadata": {**found[cid]["metadata"], "chunk_uid": cid}}
+
+
+def build_lexical_index_from_store(store, path: Path) -> BM25Index:
+    """
+    Build the lexical index from what the store holds, so its ids are the
+    store's by construction and the corpus is never re-read or held in memory.
+    """
+    return build_lexical_index(iter_store_chunks(store), path)
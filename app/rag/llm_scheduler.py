@@ -0,0 +1,158 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import List, Tuple
+
+# Priority lanes, lower runs first
+PRIORITY_SHORT = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BATCH = 2
+
+LANE_NAMES = {PRIORITY_SHORT: "short", PRIORITY_NORMAL: "normal", PRIORITY_BATCH: "batch"}
+
+# Upper bounds (ms) of the queue-wait histogram buckets
+WAIT_MS_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class SchedulerRejected(Exception):
+    """
+    Raised when a generation cannot be admitted: the wait queue is full
+    (429) or the request could not start before its deadline (503).
+    """
+
+    def __init__(self, reason: str, status_code: int, retry_after_s: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after_s = retry_after_s
+
+
+def priority_for(question: str, short_question_chars: int, batch: bool = False) -> int:
+    if batch:
+        return PRIORITY_BATCH
+    if short_question_chars > 0 and len(question) <= short_question_chars:
+        return PRIORITY_SHORT
+    return PRIORITY_NORMAL
+
+
+class LLMScheduler:
+    """
+    Admission control in front of the LLM: at most `max_in_flight`
+    generations run at once, up to `max_queue` more wait in priority order
+    (FIFO within a lane), and a waiter that cannot start within its deadline
+    gives up instead of piling onto an overloaded Ollama.
+
+    Runs on the event loop; callers use `async with scheduler.slot(...)`.
+    """
+
+    def __init__(self, max_in_flight: int = 2, max_queue: int = 64, queue_timeout_s: float = 15.0):
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_queue = max(max_queue, 0)
+        self.queue_timeout_s = queue_timeout_s
+
+        self._in_flight = 0
+        self._queued = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+        self._admitted = 0
+        self._rejected_queue_full = 0
+        self._rejected_deadline = 0
+        self._lane_admitted = {lane: 0 for lane in LANE_NAMES}
+        self._wait_buckets = [0] * (len(WAIT_MS_BUCKETS) + 1)
+        self._wait_total_s = 0.0
+        self._wait_max_s = 0.0
+        self._service_ema_s = 0.0
+
+    def retry_after_s(self) -> int:
+        """
+        Rough time until a new request could start: queued work divided over
+        the generation slots, at the recent mean generation time.
+        """
+        backlog = (self._queued + self._in_flight) / self.max_in_flight
+        return max(1, math.ceil(backlog * self._service_ema_s))
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_NORMAL, deadline_s: float | None = None):
+        await self.acquire(priority, deadline_s)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._service_ema_s = elapsed if not self._service_ema_s else 0.8 * self._service_ema_s + 0.2 * elapsed
+            self.release()
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL, deadline_s: float | None = None):
+        deadline_s = self.queue_timeout_s if deadline_s is None else deadline_s
+
+        if self._in_flight < self.max_in_flight and not self._queued:
+            self._in_flight += 1
+            self._record_admit(priority, 0.0)
+            return
+
+        if self._queued >= self.max_queue:
+            self._rejected_queue_full += 1
+            raise SchedulerRejected("queue_full", 429, self.retry_after_s())
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        self._queued += 1
+        enqueued = time.perf_counter()
+        try:
+            await asyncio.wait_for(fut, timeout=deadline_s if deadline_s > 0 else None)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                self._queued -= 1
+            if isinstance(exc, asyncio.TimeoutError):
+                self._rejected_deadline += 1
+                raise SchedulerRejected("deadline_exceeded", 503, self.retry_after_s()) from None
+            raise
+        self._record_admit(priority, time.perf_counter() - enqueued)
+
+    def release(self):
+        # Hand the slot straight to the best waiter, skipping abandoned ones
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                self._queued -= 1
+                fut.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def _record_admit(self, priority: int, wait_s: float):
+        self._admitted += 1
+        self._lane_admitted[priority] = self._lane_admitted.get(priority, 0) + 1
+        self._wait_total_s += wait_s
+        self._wait_max_s = max(self._wait_max_s, wait_s)
+        wait_ms = wait_s * 1000.0
+        for i, bound in enumerate(WAIT_MS_BUCKETS):
+            if wait_ms <= bound:
+                self._wait_buckets[i] += 1
+                break
+        else:
+            self._wait_buckets[-1] += 1
+
+    def stats(self) -> dict:
+        labels = [f"<={b}ms" for b in WAIT_MS_BUCKETS] + [f">{WAIT_MS_BUCKETS[-1]}ms"]
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout_s": self.queue_timeout_s,
+            "in_flight": self._in_flight,
+            "queue_depth": self._queued,
+            "admitted": self._admitted,
+            "admitted_by_lane": {LANE_NAMES.get(k, str(k)): v for k, v in self._lane_admitted.items()},
+            "rejected_queue_full": self._rejected_queue_full,
+            "rejected_deadline": self._rejected_deadline,
+            "mean_queue_wait_ms": (self._wait_total_s / self._admitted * 1000.0) if self._admitted else 0.0,
+            "max_queue_wait_ms": self._wait_max_s * 1000.0,
+            "queue_wait_histogram": dict(zip(labels, self._wait_buckets)),
+            "recent_generation_ms": self._service_ema_s * 1000.0,
+        }
@@ -1,17 +1,19 @@
-from typing import List
-from app.data_ingest.embedding import LocalEmbeddingModel
-from app.db.vector_store import ChromaVectorStore
+from typing import Dict, List, Optional
 from app.models.schemas import RetrievedChunk
 from app.state import state
+from app.config import settings
+from app.concurrency import run_blocking
+from app.metrics import stage_timer, LEXICAL_SHORT_CIRCUITS
+from app.rag.lexical import fuse_results
+from app.db.metadata_index import Filters, filter_key
 
 
-def retrieve_context(question: str, top_k: int = 3) -> tuple[List[RetrievedChunk], List[str]]:
+def _require_state():
     if state.embedder is None or state.vector_store is None:
         raise RuntimeError("App state not initialized. Startup hook did not run.")
 
-    q_emb = state.embedder.embed_texts([question])[0]
-    results = state.vector_store.query(q_emb, top_k=top_k)
 
+def build_chunks(results) -> tuple[List[RetrievedChunk], List[str]]:
     docs = results.get("documents", [[]])[0]
     metas = results.get("metadatas", [[]])[0]
     ids = results.get("ids", [[]])[0]
@@ -24,16 +26,165 @@ def retrieve_context(question: str, top_k: int = 3) -> tuple[List[RetrievedChunk
         source_file = meta.get("filename", "unknown_file")
         chunk_id = meta.get("chunk_uid", cid)
 
+        # Store data is trusted: construct without validation
         chunks.append(
-            RetrievedChunk(
+            RetrievedChunk.model_construct(
                 rank=rank,
                 chunk_id=chunk_id,
                 source_file=source_file,
-                metadata=meta,
+                metadata=meta or {},
                 text=text,
-                distance=dist,
+                distance=float(dist) if dist is not None else None,
             )
         )
         citations.append(chunk_id)
 
     return chunks, citations
+
+
+def _slice_results(results, i: int, top_k: int):
+    """
+    Pick query i out of a multi-query result and keep its first top_k hits.
+    """
+    return {
+        key: [results[key][i][:top_k]]
+        for key in ("documents", "metadatas", "ids", "distances")
+        if results.get(key) is not None
+    }
+
+
+def _lexical():
+    if not settings.hybrid_retrieval_enabled or state.lexical_index is None:
+        return None
+    return state.lexical_index.current()
+
+
+def _lexical_search(lexical, question: str, top_k: int, filters: Optional[Filters] = None):
+    """
+    BM25 hits for the question, or None when the question should
+    short-circuit to abstention (opt-in: no hit scores above
+    lexical_short_circuit_score, so dense search is skipped entirely).
+    """
+    with stage_timer("lexical_search"):
+        hits = lexical.search(question, top_k * settings.hybrid_candidate_multiplier, filters)
+    if settings.lexical_short_circuit and (not hits or hits[0][1] <= settings.lexical_short_circuit_score):
+        LEXICAL_SHORT_CIRCUITS.inc()
+        return None
+    return hits
+
+
+def _lexical_hits(question: str, top_k: int, filters: Optional[Filters] = None):
+    """
+    (lexical index, BM25 hits) for one question; (None, None) without hybrid
+    retrieval, and hits is None on a short circuit. May (re)load the index
+    from disk, so async callers run it on the blocking executor.
+    """
+    lexical = _lexical()
+    if lexical is None:
+        return None, None
+    return lexical, _lexical_search(lexical, question, top_k, filters)
+
+
+def _dense_depth(top_k: int, lexical) -> int:
+    # Hybrid fuses deeper candidate lists than it returns
+    return top_k * settings.hybrid_candidate_multiplier if lexical is not None else top_k
+
+
+def _fuse(results, lexical, hits, q_emb, vector_store, top_k: int):
+    if lexical is None:
+        return results
+    return fuse_results(results, lexical, hits, q_emb, vector_store, top_k)
+
+
+def retrieve_context(
+    question: str, top_k: int = 3, filters: Optional[Filters] = None
+) -> tuple[List[RetrievedChunk], List[str]]:
+    """
+    `filters` (normalized, see app.db.metadata_index) is pushed down into
+    both the lexical and the vector store search.
+    """
+    _require_state()
+
+    vector_store = state.vector_store
+    lexical, hits = _lexical_hits(question, top_k, filters)
+    if lexical is not None and hits is None:
+        return [], []
+
+    with stage_timer("embed"):
+        q_emb = state.embedder.embed_query(question)
+    with stage_timer("vector_search"):
+        results = vector_store.query(q_emb, top_k=_dense_depth(top_k, lexical), filters=filters)
+        results = _fuse(results, lexical, hits, q_emb, vector_store, top_k)
+    return build_chunks(results)
+
+
+async def aretrieve_context(
+    question: str, top_k: int = 3, filters: Optional[Filters] = None
+) -> tuple[List[RetrievedChunk], List[str]]:
+    """
+    Async variant of retrieve_context: embedding waits on the batcher, and
+    the lexical and vector searches run on the dedicated blocking executor.
+    """
+    _require_state()
+
+    vector_store = state.vector_store
+    lexical, hits = await run_blocking(_lexical_hits, question, top_k, filters)
+    if lexical is not None and hits is None:
+        return [], []
+
+    with stage_timer("embed"):
+        q_emb = await state.embedder.aembed_query(question)
+    with stage_timer("vector_search"):
+        results = await run_blocking(
+            vector_store.query, q_emb, top_k=_dense_depth(top_k, lexical), filters=filters
+        )
+        if lexical is not None:
+            results = await run_blocking(_fuse, results, lexical, hits, q_emb, vector_store, top_k)
+    return build_chunks(results)
+
+
+def retrieve_contexts(
+    questions: List[str], top_ks: List[int], filters: Optional[List[Optional[Filters]]] = None
+) -> List[tuple[List[RetrievedChunk], List[str]]]:
+    """
+    Batched retrieve_context: one encode call for all cache misses and one
+    vector store query per distinct filter (at the largest top_k, then
+    trimmed per item). With hybrid retrieval each question is fused
+    separately, and short-circuited questions are neither embedded nor searched.
+    """
+    _require_state()
+
+    filters = filters or [None] * len(questions)
+    vector_store = state.vector_store
+    lexical = _lexical()
+    hits = [None] * len(questions)
+    if lexical is not None:
+        hits = [_lexical_search(lexical, q, k, f) for q, k, f in zip(questions, top_ks, filters)]
+    live = [i for i in range(len(questions)) if lexical is None or hits[i] is not None]
+
+    out: List[tuple[List[RetrievedChunk], List[str]]] = [([], []) for _ in questions]
+    if not live:
+        return out
+    with stage_timer("embed"):
+        embeddings = state.embedder.embed_queries([questions[i] for i in live])
+    with stage_timer("vector_search"):
+        # Positions in `live`, grouped by filter; usually a single group
+        groups: Dict[str, List[int]] = {}
+        for j, i in enumerate(live):
+            groups.setdefault(filter_key(filters[i]), []).append(j)
+        for group in groups.values():
+            depth = _dense_depth(max(top_ks[live[j]] for j in group), lexical)
+            results = vector_store.query_many(
+                [embeddings[j] for j in group], top_k=depth, filters=filters[live[group[0]]]
+            )
+            for row, j in enumerate(group):
+                i = live[j]
+                sliced = _slice_results(results, row, _dense_depth(top_ks[i], lexical))
+                out[i] = build_chunks(_fuse(sliced, lexical, hits[i], embeddings[j], vector_store, top_ks[i]))
+    return out
+
+
+async def aretrieve_contexts(
+    questions: List[str], top_ks: List[int], filters: Optional[List[Optional[Filters]]] = None
+) -> List[tuple[List[RetrievedChunk], List[str]]]:
+    return await run_blocking(retrieve_contexts, questions, top_ks, filters)
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.metrics import QUERY_COALESCED
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one computation.
+
+    The first caller (the leader) starts the work as a task; callers that
+    arrive while it is in flight await the same task and get its result (or
+    exception). Every caller awaits through asyncio.shield, so a client
+    that disconnects cancels only its own wait: the shared work keeps running
+    for the others and still fills the answer cache. The key is released as
+    soon as the work finishes, so later calls start fresh.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.collapsed = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Run fn() once per in-flight key. Returns (result, shared), where
+        shared is True for callers that joined an existing computation.
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        if shared:
+            self.collapsed += 1
+            QUERY_COALESCED.inc()
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._release(key, t))
+        return await asyncio.shield(task), shared
+
+    def _release(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved: every waiter may have gone away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+        }
@@ -0,0 +1,48 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.models.schemas import ActivateIndexRequest, CollectIndexGarbageRequest
+from app.db.index_registry import UNVERSIONED, IndexRegistry
+from app.index_versions import activate, rollback, collect_garbage
+from app.state import state
+from app.config import settings
+
+from app.security import require_api_key
+
+import logging
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+logger = logging.getLogger("medrag")
+
+@router.get("/index", dependencies=[Depends(require_api_key)])
+def index_versions():
+    return {"serving": state.index_name, **IndexRegistry().read()}
+
+@router.post("/index/activate", dependencies=[Depends(require_api_key)])
+async def activate_index(req: ActivateIndexRequest):
+    registry = IndexRegistry()
+    if req.version not in registry.read()["versions"] and req.version != UNVERSIONED:
+        raise HTTPException(status_code=404, detail="Unknown index version")
+    try:
+        data = await activate(req.version)
+    except ValueError as exc:
+        # Validation failed or the build is not ready; the current index keeps serving
+        raise HTTPException(status_code=409, detail=str(exc))
+    return {"serving": state.index_name, **data}
+
+@router.post("/index/rollback", dependencies=[Depends(require_api_key)])
+async def rollback_index():
+    try:
+        data = await rollback()
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return {"serving": state.index_name, **data}
+
+@router.post("/index/gc", dependencies=[Depends(require_api_key)])
+async def collect_index_garbage(req: CollectIndexGarbageRequest):
+    # Default executor, not the query pool: deleting files must not delay searches
+    keep = settings.index_keep_versions if req.keep is None else req.keep
+    deleted = await asyncio.to_thread(collect_garbage, keep)
+    logger.info("index_gc deleted=%d", len(deleted))
+    return {"deleted": deleted}
@@ -1,8 +1,28 @@
-from fastapi import APIRouter, Depends
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from app.models.schemas import RetrieveRequest, RetrieveResponse
-from app.rag.retriever import retrieve_context
+from app.rag.retriever import aretrieve_context, aretrieve_contexts
 from app.models.schemas import QueryRequest, QueryResponse
-from app.rag.grounded_qa import answer_question
+from app.models.schemas import (
+    BatchRetrieveRequest,
+    BatchRetrieveResponse,
+    BatchQueryRequest,
+    BatchQueryResponse,
+)
+from app.rag.grounded_qa import aanswer_question, aanswer_from_chunks, astream_answer
+from app.rag.llm_scheduler import SchedulerRejected
+from app.config import settings
+from app.db.metadata_index import normalize_filters
+from app.serialization import (
+    FastJSONResponse,
+    Projection,
+    chunk_dicts,
+    dumps,
+    project,
+    query_projection,
+    retrieve_projection,
+)
 
 from app.security import require_api_key
 
@@ -11,19 +31,56 @@ import logging
 router = APIRouter(prefix="", tags=["rag"])
 logger = logging.getLogger("medrag")
 
+def _filters(req):
+    return normalize_filters(req.filters.model_dump()) if req.filters is not None else None
+
+def _retrieve_result(item: RetrieveRequest, chunks, citations) -> dict:
+    return {"question": item.question, "top_k": item.top_k, "chunks": chunks, "citations": citations}
+
 @router.post("/retrieve", response_model=RetrieveResponse, dependencies=[Depends(require_api_key)])
-def retrieve(req: RetrieveRequest):
-    chunks, citations = retrieve_context(req.question, top_k=req.top_k)
-    return RetrieveResponse(
-        question=req.question,
-        top_k=req.top_k,
-        chunks=chunks,
-        citations=citations,
-    )
+async def retrieve(req: RetrieveRequest, projection: Projection = Depends(retrieve_projection)):
+    chunks, citations = await aretrieve_context(req.question, top_k=req.top_k, filters=_filters(req))
+    return FastJSONResponse(project(_retrieve_result(req, chunks, citations), projection))
+
+def _check_batch_size(n: int):
+    if n > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {n} items (max {settings.batch_max_items})",
+        )
+
+@router.post("/retrieve/batch", response_model=BatchRetrieveResponse, dependencies=[Depends(require_api_key)])
+async def retrieve_batch(req: BatchRetrieveRequest, projection: Projection = Depends(retrieve_projection)):
+    """
+    Retrieve for many questions with one encode call and one vector store query.
+    """
+    _check_batch_size(len(req.items))
+    try:
+        contexts = await aretrieve_contexts(
+            [item.question for item in req.items],
+            [item.top_k for item in req.items],
+            [_filters(item) for item in req.items],
+        )
+    except Exception:
+        logger.exception("retrieve_batch status=error items=%s", len(req.items))
+        return FastJSONResponse(
+            {"results": [{"index": i, "result": None, "error": "retrieval_failed"} for i in range(len(req.items))]}
+        )
+
+    return FastJSONResponse({
+        "results": [
+            {
+                "index": i,
+                "result": project(_retrieve_result(item, chunks, citations), projection),
+                "error": None,
+            }
+            for i, (item, (chunks, citations)) in enumerate(zip(req.items, contexts))
+        ]
+    })
 
 @router.post("/query", response_model=QueryResponse, dependencies=[Depends(require_api_key)])
-def query(req: QueryRequest):
-    result = answer_question(req.question, top_k=req.top_k)
+async def query(req: QueryRequest, projection: Projection = Depends(query_projection)):
+    result = await aanswer_question(req.question, top_k=req.top_k, filters=_filters(req))
 
     grounding = result.get("grounding", {})
 
@@ -34,12 +91,90 @@ def query(req: QueryRequest):
         result.get("warning_flags", []),
     )
 
-    return QueryResponse(
-        question=result["question"],
-        answer=result["answer"],
-        citations=result["citations"],
-        chunks=result["chunks"],
-        warning_flags=result.get("warning_flags", []),
-        grounding=grounding,
+    return FastJSONResponse(project(result, projection))
+
+@router.post("/query/batch", response_model=BatchQueryResponse, dependencies=[Depends(require_api_key)])
+async def query_batch(req: BatchQueryRequest, projection: Projection = Depends(query_projection)):
+    """
+    Batched retrieval, then per-item generation with at most
+    settings.batch_llm_concurrency LLM calls in flight. Failures are
+    reported per item.
+    """
+    _check_batch_size(len(req.items))
+    try:
+        contexts = await aretrieve_contexts(
+            [item.question for item in req.items],
+            [item.top_k for item in req.items],
+            [_filters(item) for item in req.items],
+        )
+    except Exception:
+        logger.exception("query_batch status=error items=%s", len(req.items))
+        return FastJSONResponse(
+            {"results": [{"index": i, "result": None, "error": "retrieval_failed"} for i in range(len(req.items))]}
+        )
+
+    semaphore = asyncio.Semaphore(max(settings.batch_llm_concurrency, 1))
+
+    async def run_item(i: int, item: QueryRequest, chunks, citations):
+        # (index, result, error)
+        try:
+            async with semaphore:
+                result = await aanswer_from_chunks(item.question, chunks, citations, batch=True)
+        except SchedulerRejected as exc:
+            return i, None, exc.reason
+        except Exception:
+            logger.exception("query_batch_item status=error index=%s", i)
+            return i, None, "generation_failed"
+        return i, result, None
+
+    results = await asyncio.gather(
+        *(
+            run_item(i, item, chunks, citations)
+            for i, (item, (chunks, citations)) in enumerate(zip(req.items, contexts))
+        )
     )
 
+    logger.info(
+        "query_batch status=ok items=%s abstained=%s errors=%s",
+        len(results),
+        sum(1 for _, result, _ in results if result is not None and result["grounding"]["abstained"]),
+        sum(1 for _, _, error in results if error is not None),
+    )
+    return FastJSONResponse({
+        "results": [
+            {"index": i, "result": project(result, projection) if result is not None else None, "error": error}
+            for i, result, error in results
+        ]
+    })
+
+@router.post("/query/stream", dependencies=[Depends(require_api_key)])
+async def query_stream(req: QueryRequest, projection: Projection = Depends(query_projection)):
+    """
+    Same pipeline as /query, streamed as NDJSON events (retrieval, token..., final).
+    The chunks projection applies to the retrieval event; include does not apply.
+    Retrieval and LLM admission happen before the response starts, so an
+    overloaded scheduler answers 429/503 with Retry-After like /query.
+    """
+    stream = await astream_answer(req.question, top_k=req.top_k, filters=_filters(req))
+
+    async def events():
+        grounding = {}
+        try:
+            async for event in stream:
+                if event["event"] == "retrieval":
+                    grounding = event["grounding"]
+                    event = {**event, "chunks": chunk_dicts(event["chunks"], projection.chunks)}
+                elif event["event"] == "final":
+                    logger.info(
+                        "query_result status=ok stream=true abstained=%s best_distance=%s flags=%s",
+                        grounding.get("abstained"),
+                        grounding.get("best_distance"),
+                        event.get("warning_flags", []),
+                    )
+                yield dumps(event) + b"\n"
+        except Exception:
+            # Headers are already sent; report the failure in-band without leaking details
+            logger.exception("query_result status=error stream=true")
+            yield dumps({"event": "error", "detail": "generation_failed"}) + b"\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
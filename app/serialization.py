@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Literal, Optional, Type
+
+import orjson
+from fastapi import HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from app.models.schemas import QueryResponse, RetrieveResponse, RetrievedChunk
+
+ChunkMode = Literal["full", "ids"]
+
+# chunks=ids: enough to cite and rank a chunk, without its text and metadata
+_CHUNK_REF_FIELDS = ("rank", "chunk_id", "source_file", "distance")
+
+
+def _default(obj: Any):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    orjson-rendered response for result dicts built by hand: routes return
+    it directly, so FastAPI skips re-validating against the response_model
+    (which still documents the shape).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@dataclass(frozen=True)
+class Projection:
+    fields: Optional[FrozenSet[str]] = None  # None = every field
+    chunks: ChunkMode = "full"
+
+    def wants(self, field: str) -> bool:
+        return self.fields is None or field in self.fields
+
+
+def _parse_projection(model: Type[BaseModel], include: Optional[str], chunks: ChunkMode) -> Projection:
+    if not include:
+        return Projection(None, chunks)
+    fields = frozenset(f.strip() for f in include.split(",") if f.strip())
+    unknown = sorted(fields - set(model.model_fields))
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown include field(s): {', '.join(unknown)} (expected any of: {', '.join(model.model_fields)})",
+        )
+    return Projection(fields, chunks)
+
+
+_INCLUDE = "Comma-separated response fields to return (default: all)"
+_CHUNKS = "'full' chunks, or 'ids': rank, chunk_id, source_file and distance only"
+
+
+def query_projection(
+    include: Optional[str] = Query(None, description=_INCLUDE),
+    chunks: ChunkMode = Query("full", description=_CHUNKS),
+) -> Projection:
+    return _parse_projection(QueryResponse, include, chunks)
+
+
+def retrieve_projection(
+    include: Optional[str] = Query(None, description=_INCLUDE),
+    chunks: ChunkMode = Query("full", description=_CHUNKS),
+) -> Projection:
+    return _parse_projection(RetrieveResponse, include, chunks)
+
+
+def chunk_dicts(chunks: List[RetrievedChunk], mode: ChunkMode = "full") -> List[Dict[str, Any]]:
+    # Attribute reads instead of model_dump(): the chunks were built from trusted store data
+    if mode == "ids":
+        return [{f: getattr(c, f) for f in _CHUNK_REF_FIELDS} for c in chunks]
+    return [
+        {
+            "rank": c.rank,
+            "chunk_id": c.chunk_id,
+            "source_file": c.source_file,
+            "metadata": c.metadata,
+            "text": c.text,
+            "distance": c.distance,
+        }
+        for c in chunks
+    ]
+
+
+def project(result: Dict[str, Any], projection: Projection) -> Dict[str, Any]:
+    """
+    The requested fields of a result dict, with chunks rendered per
+    projection.chunks. Fields that are not requested are never built.
+    """
+    out = {k: v for k, v in result.items() if projection.wants(k)}
+    if "chunks" in out:
+        out["chunks"] = chunk_dicts(out["chunks"], projection.chunks)
+    return out
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable
+
+import httpx
+from langchain_ollama import ChatOllama
+
+from app.config import settings
+from app.data_ingest.embedding import build_embedding_model
+from app.db.factory import build_vector_store
+from app.state import ComponentStatus, state
+
+logger = logging.getLogger("medrag")
+
+COMPONENTS = ("embedder", "vector_store", "llm")
+
+WARMUP_TEXT = "warm-up query"
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000.0, 1)
+
+
+def _fail(status: ComponentStatus, exc: Exception):
+    # Exception type only: /ready is unauthenticated
+    status.ready = False
+    status.error = type(exc).__name__
+
+
+def build_llm() -> ChatOllama:
+    return ChatOllama(
+        model=settings.ollama_model,
+        temperature=settings.llm_temperature,
+        base_url=settings.ollama_base_url,
+        keep_alive=settings.ollama_keep_alive,
+    )
+
+
+async def _init_component(name: str, factory: Callable[[], Any]) -> Any:
+    status = state.readiness[name]
+    start = time.perf_counter()
+    print(f"Startup: initializing {name}...")
+    try:
+        component = await asyncio.to_thread(factory)
+    except Exception as exc:
+        _fail(status, exc)
+        logger.exception("startup_init_failed component=%s", name)
+        raise
+    status.init_ms = _elapsed_ms(start)
+    print(f"Startup: {name} initialized in {status.init_ms} ms")
+    return component
+
+
+async def initialize_components():
+    """
+    Build the embedder, vector store and LLM client concurrently. Each
+    constructor runs in its own thread, so model loading, index opening and
+    client setup overlap instead of adding up.
+    """
+    state.readiness = {name: ComponentStatus() for name in COMPONENTS}
+    state.embedder, state.vector_store, state.llm = await asyncio.gather(
+        _init_component("embedder", build_embedding_model),
+        _init_component("vector_store", build_vector_store),
+        _init_component("llm", build_llm),
+    )
+
+
+def _warm_search():
+    """
+    First encode (model graph / kernels) followed by a first vector query
+    (index pages / HNSW load), off the event loop.
+    """
+    embedder_status = state.readiness["embedder"]
+    start = time.perf_counter()
+    vector = state.embedder.embed_batch([WARMUP_TEXT])[0]
+    embedder_status.warmup_ms = _elapsed_ms(start)
+    embedder_status.ready = True
+
+    store_status = state.readiness["vector_store"]
+    start = time.perf_counter()
+    state.vector_store.query(vector.tolist(), top_k=1)
+    store_status.warmup_ms = _elapsed_ms(start)
+    store_status.ready = True
+
+
+async def _warm_embedder_and_store():
+    try:
+        await asyncio.to_thread(_warm_search)
+    except Exception as exc:
+        for name in ("embedder", "vector_store"):
+            if not state.readiness[name].ready:
+                _fail(state.readiness[name], exc)
+        logger.exception("startup_warmup_failed component=search")
+
+
+async def preload_ollama_model():
+    """
+    Ask Ollama to load the model into memory and keep it resident, so the
+    first real generation does not pay for the model load. A generate call
+    without a prompt only loads the model.
+    """
+    async with httpx.AsyncClient(
+        base_url=settings.ollama_base_url, timeout=settings.ollama_warmup_timeout_s
+    ) as client:
+        response = await client.post(
+            "/api/generate",
+            json={"model": settings.ollama_model, "keep_alive": settings.ollama_keep_alive},
+        )
+        response.raise_for_status()
+
+
+async def _warm_llm():
+    status = state.readiness["llm"]
+    start = time.perf_counter()
+    try:
+        await preload_ollama_model()
+    except Exception as exc:
+        _fail(status, exc)
+        logger.warning("startup_warmup_failed component=llm error=%s", type(exc).__name__)
+        return
+    status.warmup_ms = _elapsed_ms(start)
+    status.ready = True
+
+
+async def warm_up_components():
+    """
+    Run the search warm-up and the Ollama preload concurrently. Failures mark
+    the component as not ready (so /ready returns 503) instead of stopping
+    the app; /retrieve keeps working if only the LLM is unavailable.
+    """
+    if not settings.warmup_enabled:
+        for status in state.readiness.values():
+            status.ready = True
+        return
+
+    await asyncio.gather(_warm_embedder_and_store(), _warm_llm())
+    print(f"Startup: warm-up finished, ready={is_ready()}")
+
+
+def is_ready() -> bool:
+    return bool(state.readiness) and all(s.ready for s in state.readiness.values())
+
+
+def readiness_report() -> dict:
+    return {
+        "ready": is_ready(),
+        "startup_ms": state.startup_ms,
+        "components": {name: s.as_dict() for name, s in state.readiness.items()},
+    }
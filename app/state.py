@@ -1,16 +1,47 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
 
-from app.data_ingest.embedding import LocalEmbeddingModel
-from app.db.vector_store import ChromaVectorStore
+from app.data_ingest.embedding import EmbeddingModel
+from app.db.base import VectorStore
+from app.rag.answer_cache import AnswerCache
+from app.rag.llm_scheduler import LLMScheduler
+from app.rag.singleflight import SingleFlight
+from app.rag.lexical import LexicalIndexHandle
 from langchain_ollama import ChatOllama
 
 
+@dataclass
+class ComponentStatus:
+    ready: bool = False
+    init_ms: float | None = None
+    warmup_ms: float | None = None
+    error: str | None = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "init_ms": self.init_ms,
+            "warmup_ms": self.warmup_ms,
+            "error": self.error,
+        }
+
+
 @dataclass
 class AppState:
-    embedder: Optional[LocalEmbeddingModel] = None
-    vector_store: Optional[ChromaVectorStore] = None
+    embedder: Optional[EmbeddingModel] = None
+    vector_store: Optional[VectorStore] = None
+    # Index version being served, and the one it replaced (kept open for rollback)
+    index_name: str | None = None
+    previous_vector_store: Optional[VectorStore] = None
+    previous_index_name: str | None = None
     llm: Optional[ChatOllama] = None
+    answer_cache: Optional[AnswerCache] = None
+    lexical_index: Optional[LexicalIndexHandle] = None
+    llm_scheduler: Optional[LLMScheduler] = None
+    query_singleflight: Optional[SingleFlight] = None
+    # Per-component startup status, reported by /ready
+    readiness: Dict[str, ComponentStatus] = field(default_factory=dict)
+    startup_ms: float | None = None
 
 
 state = AppState()
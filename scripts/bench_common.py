@@ -0,0 +1,97 @@
+import json
+import platform
+import resource
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# Questions shared by the load generator and micro-benchmarks
+QUESTIONS = [
+    "What are the key recommendations for hand hygiene?",
+    "How often should immobile patients be repositioned?",
+    "When should alcohol-based hand rub be used instead of soap and water?",
+    "Which vaccines are recommended for healthcare workers?",
+    "How do you assess pressure ulcer risk?",
+    "What antibiotic should be prescribed for pneumonia?",
+]
+
+
+def latency_summary(latencies_ms: Sequence[float], elapsed_s: float | None = None) -> Dict[str, Any]:
+    """
+    p50/p95/p99/max in milliseconds, plus throughput when the wall time is known.
+    """
+    if not latencies_ms:
+        return {"count": 0}
+    arr = np.asarray(latencies_ms, dtype=np.float64)
+    out = {
+        "count": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "max_ms": round(float(arr.max()), 3),
+    }
+    if elapsed_s:
+        out["per_s"] = round(arr.size / elapsed_s, 2)
+    return out
+
+
+def time_calls(fn, repeats: int, warmup: int = 1) -> Dict[str, Any]:
+    for _ in range(warmup):
+        fn()
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    return latency_summary(latencies, time.perf_counter() - started)
+
+
+def peak_rss_mb() -> float:
+    # Own process; kept here (not imported from app) so the load generator
+    # runs without the server's dependencies. ru_maxrss is KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def process_peak_rss_mb(pid: int) -> float | None:
+    # VmHWM is the peak resident set size of another process (Linux only)
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+
+def run_metadata(name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=False
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "benchmark": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": params,
+    }
+
+
+def write_results(report: Dict[str, Any], out: str | None, name: str) -> Path:
+    """
+    Write a benchmark report as JSON (default: bench_results/<name>-<time>.json)
+    so runs can be compared with scripts.bench_compare.
+    """
+    report.setdefault("peak_rss_mb", round(peak_rss_mb(), 1))
+    path = Path(out) if out else Path("bench_results") / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return path
@@ -0,0 +1,83 @@
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+# Leaf metrics compared between runs; latency-like keys are lower-is-better
+LOWER_IS_BETTER = ("_ms", "rss_mb")
+HIGHER_IS_BETTER = ("per_s", "_rps")
+
+
+def _leaves(node: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key in ("params", "timestamp", "git_commit"):
+                continue
+            yield from _leaves(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, float(node)
+
+
+def _direction(path: str) -> int:
+    """
+    +1 if an increase is a regression, -1 if a decrease is, 0 if not compared.
+    """
+    name = path.rsplit(".", 1)[-1]
+    if name.endswith(LOWER_IS_BETTER):
+        return 1
+    if name.endswith(HIGHER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(baseline: Dict, candidate: Dict, threshold_pct: float):
+    base = dict(_leaves(baseline))
+    rows = []
+    for path, new in _leaves(candidate):
+        direction = _direction(path)
+        old = base.get(path)
+        if direction == 0 or old is None or old == 0:
+            continue
+        change = (new - old) / abs(old) * 100.0
+        rows.append({
+            "metric": path,
+            "baseline": old,
+            "candidate": new,
+            "change_pct": round(change, 1),
+            "regression": change * direction > threshold_pct,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two benchmark JSON files and flag regressions.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed worsening in percent")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any metric regressed")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate, args.threshold)
+    width = max((len(r["metric"]) for r in rows), default=10)
+    for r in rows:
+        mark = "REGRESSION" if r["regression"] else ""
+        print(f"{r['metric']:<{width}}  {r['baseline']:>12.3f}  {r['candidate']:>12.3f}  {r['change_pct']:>+7.1f}%  {mark}")
+
+    regressions = [r for r in rows if r["regression"]]
+    print(json.dumps({
+        "baseline_commit": baseline.get("git_commit"),
+        "candidate_commit": candidate.get("git_commit"),
+        "metrics_compared": len(rows),
+        "regressions": len(regressions),
+    }, indent=2))
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
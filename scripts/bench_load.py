@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import httpx
+
+from scripts.bench_common import QUESTIONS, latency_summary, process_peak_rss_mb, run_metadata, write_results
+
+
+async def run_load(args) -> Dict:
+    """
+    Open-loop load: arrivals follow a Poisson process at `rate` requests/s
+    whatever the server's response times, and latency is measured from the
+    scheduled arrival time, so queueing delay is not hidden (no coordinated
+    omission).
+    """
+    rng = random.Random(args.seed)
+    headers = {"Content-Type": "application/json"}
+    if args.api_key:
+        headers["X-API-Key"] = args.api_key
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+    dropped = 0
+    in_flight = 0
+
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, timeout=args.timeout, limits=limits) as client:
+
+        async def fire(endpoint: str, payload: dict, scheduled: float):
+            nonlocal in_flight
+            try:
+                r = await client.post(endpoint, json=payload)
+                status = str(r.status_code)
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            finally:
+                in_flight -= 1
+            statuses[endpoint][status] += 1
+            if status == "200":
+                latencies[endpoint].append((time.perf_counter() - scheduled) * 1000.0)
+
+        tasks = []
+        started = time.perf_counter()
+        t = started
+        i = 0
+        while True:
+            t += rng.expovariate(args.rate)
+            if t - started > args.duration:
+                break
+            delay = t - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            endpoint = "/query" if rng.random() < args.query_fraction else "/retrieve"
+            question = rng.choice(QUESTIONS)
+            if args.unique:
+                # Distinct text defeats the embedding and answer caches
+                question = f"{question} (variant {i})"
+            i += 1
+
+            # Client-side safety valve; dropped arrivals are reported, not hidden
+            if in_flight >= args.max_in_flight:
+                dropped += 1
+                continue
+            in_flight += 1
+            tasks.append(asyncio.create_task(fire(endpoint, {"question": question, "top_k": args.top_k}, t)))
+
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    report = {
+        "offered_rps": args.rate,
+        "duration_s": round(elapsed, 2),
+        "arrivals": i,
+        "client_dropped": dropped,
+        "endpoints": {},
+    }
+    for endpoint in sorted(statuses):
+        ok = latencies[endpoint]
+        entry = latency_summary(ok)
+        entry["achieved_rps"] = round(len(ok) / elapsed, 2)
+        entry["status_counts"] = dict(statuses[endpoint])
+        report["endpoints"][endpoint] = entry
+    if args.server_pid:
+        report["server_peak_rss_mb"] = process_peak_rss_mb(args.server_pid)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test of /retrieve and /query.")
+    parser.add_argument("--base-url", default=os.getenv("EVAL_API_BASE", "http://127.0.0.1:8000"))
+    parser.add_argument("--api-key", default=os.getenv("API_KEY", ""))
+    parser.add_argument("--rate", type=float, default=10.0, help="Offered load in requests/s (Poisson arrivals)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of arrivals")
+    parser.add_argument("--query-fraction", type=float, default=0.5, help="Share of /query (rest is /retrieve)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--unique", action="store_true", help="Make every question distinct (cold caches)")
+    parser.add_argument("--max-in-flight", type=int, default=512)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server-pid", type=int, default=None, help="Report the server's peak RSS (Linux)")
+    parser.add_argument("--out", default=None, help="JSON output path (default: bench_results/load-<time>.json)")
+    args = parser.parse_args()
+
+    report = run_metadata("load", {k: v for k, v in vars(args).items() if k != "api_key"})
+    report.update(asyncio.run(run_load(args)))
+    path = write_results(report, args.out, "load")
+    print(json.dumps(report, indent=2))
+    print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import argparse
+import itertools
+import json
+import tempfile
+
+import numpy as np
+
+from app.config import settings
+from app.data_ingest.text_loader import load_text_files
+from app.data_ingest.chunking import chunk_documents
+from app.data_ingest.embedding import LocalEmbeddingModel
+from app.db.vector_store import ChromaVectorStore
+from app.models.schemas import RetrievedChunk
+from app.rag.grounded_qa import format_context
+from app.rag.context_packing import pack_context
+from scripts.bench_common import QUESTIONS, time_calls, run_metadata, write_results
+
+BENCHMARKS = ("chunk_documents", "embed_texts", "vector_query", "format_context")
+
+
+def bench_chunking(docs, repeats: int):
+    return time_calls(lambda: chunk_documents(docs), repeats)
+
+
+def bench_embedding(model, texts, batch_sizes, repeats: int):
+    out = {}
+    for size in batch_sizes:
+        batch = (texts * (size // max(len(texts), 1) + 1))[:size]
+        entry = time_calls(lambda: model.embed_texts(batch), repeats)
+        entry["texts_per_s"] = round(size * entry.get("per_s", 0.0), 1)
+        out[f"batch_{size}"] = entry
+    return out
+
+
+def bench_vector_query(model, chunks, store_size: int, top_k: int, repeats: int, seed: int):
+    """
+    ChromaVectorStore.query against a throwaway collection of `store_size`
+    rows: the real chunks plus jittered copies of their embeddings.
+    """
+    rng = np.random.default_rng(seed)
+    base = np.asarray(model.embed_batch([c["content"] for c in chunks]), dtype=np.float32)
+    rows = rng.integers(0, len(chunks), size=store_size)
+    vectors = base[rows] + rng.normal(scale=0.05, size=(store_size, base.shape[1])).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    docs = [
+        {"content": chunks[r]["content"], "metadata": {**chunks[r]["metadata"], "chunk_uid": f"bench::{i}"}}
+        for i, r in enumerate(rows)
+    ]
+    queries = model.embed_batch(QUESTIONS)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ChromaVectorStore(collection_name="bench", persist_directory=tmp)
+        store.upsert_documents(docs, vectors, ids=[d["metadata"]["chunk_uid"] for d in docs])
+        cycle = itertools.cycle(queries.tolist())
+        return time_calls(lambda: store.query(next(cycle), top_k=top_k), repeats)
+
+
+def bench_context(chunks, top_k: int, repeats: int):
+    retrieved = [
+        RetrievedChunk(
+            rank=i + 1,
+            chunk_id=c["metadata"]["chunk_uid"],
+            source_file=c["metadata"].get("filename", "unknown_file"),
+            metadata=c["metadata"],
+            text=c["content"],
+            distance=0.5,
+        )
+        for i, c in enumerate(chunks[:top_k])
+    ]
+    return {
+        "format_context": time_calls(lambda: format_context(retrieved), repeats),
+        "pack_context": time_calls(lambda: pack_context(retrieved), repeats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the ingest and query hot paths.")
+    parser.add_argument("--dir", default="data/sample_docs")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"Comma-separated subset of {BENCHMARKS}")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--doc-copies", type=int, default=20, help="Replicate the corpus for chunking")
+    parser.add_argument("--batch-sizes", default="1,8,32")
+    parser.add_argument("--store-size", type=int, default=5000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="JSON output path (default: bench_results/micro-<time>.json)")
+    args = parser.parse_args()
+    selected = set(args.only.split(","))
+
+    docs = load_text_files(args.dir)
+    chunks = chunk_documents(docs)
+    report = run_metadata("micro", vars(args))
+    report["results"] = {}
+
+    if "chunk_documents" in selected:
+        report["results"]["chunk_documents"] = bench_chunking(docs * args.doc_copies, args.repeats)
+
+    if selected & {"embed_texts", "vector_query"}:
+        model = LocalEmbeddingModel(settings.embedding_model_name, cache_size=0, batch_max_size=1)
+        if "embed_texts" in selected:
+            sizes = [int(s) for s in args.batch_sizes.split(",")]
+            report["results"]["embed_texts"] = bench_embedding(
+                model, [c["content"] for c in chunks], sizes, args.repeats
+            )
+        if "vector_query" in selected:
+            report["results"]["vector_query"] = bench_vector_query(
+                model, chunks, args.store_size, args.top_k, args.repeats, args.seed
+            )
+        model.close()
+
+    if "format_context" in selected:
+        report["results"].update(bench_context(chunks, args.top_k, args.repeats))
+
+    path = write_results(report, args.out, "micro")
+    print(json.dumps(report, indent=2))
+    print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
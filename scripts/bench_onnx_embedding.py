@@ -0,0 +1,95 @@
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.data_ingest.text_loader import load_text_files
+from app.data_ingest.chunking import chunk_documents
+from app.data_ingest.embedding import LocalEmbeddingModel
+from app.data_ingest.onnx_embedding import OnnxEmbeddingModel
+from scripts.bench_common import QUESTIONS
+
+
+def top_k_ids(query_vecs: np.ndarray, corpus_vecs: np.ndarray, k: int):
+    scores = query_vecs @ corpus_vecs.T
+    return [list(np.argsort(-row)[:k]) for row in scores]
+
+
+def benchmark(model, texts, questions, batch_size: int, repeats: int):
+    # Throughput: corpus in fixed-size batches
+    model.embed_batch(texts[:batch_size])  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for i in range(0, len(texts), batch_size):
+            model.embed_batch(texts[i:i + batch_size])
+    elapsed = time.perf_counter() - started
+
+    # Latency: one question at a time, bypassing the cache and batcher
+    latencies = []
+    for _ in range(repeats):
+        for q in questions:
+            t0 = time.perf_counter()
+            model.embed_batch([q])
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+    latencies.sort()
+
+    return {
+        "texts_per_s": round(len(texts) * repeats / elapsed, 1),
+        "single_p50_ms": round(statistics.median(latencies), 2),
+        "single_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Parity check and benchmark of the ONNX Runtime embedding backend against PyTorch."
+    )
+    parser.add_argument("--dir", default="data/sample_docs")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = [c["content"] for c in chunk_documents(load_text_files(args.dir))]
+    # Small corpora are padded with the questions so throughput numbers mean something
+    bench_texts = (texts + QUESTIONS) * max(1, 256 // max(len(texts) + len(QUESTIONS), 1))
+
+    models = {
+        "torch": LocalEmbeddingModel(settings.embedding_model_name, batch_max_size=1, cache_size=0),
+        "onnx_fp32": OnnxEmbeddingModel(settings.embedding_model_name, quantize=False, batch_max_size=1, cache_size=0),
+        "onnx_int8": OnnxEmbeddingModel(settings.embedding_model_name, quantize=True, batch_max_size=1, cache_size=0),
+    }
+
+    ref_corpus = models["torch"].embed_batch(texts)
+    ref_questions = models["torch"].embed_batch(QUESTIONS)
+    ref_top = top_k_ids(ref_questions, ref_corpus, args.k)
+
+    report = {"corpus_chunks": len(texts), "questions": len(QUESTIONS), "k": args.k, "backends": {}}
+    for name, model in models.items():
+        entry = benchmark(model, bench_texts, QUESTIONS, args.batch_size, args.repeats)
+        if name != "torch":
+            corpus = model.embed_batch(texts)
+            questions = model.embed_batch(QUESTIONS)
+            cos = np.concatenate([
+                np.sum(corpus * ref_corpus, axis=1),
+                np.sum(questions * ref_questions, axis=1),
+            ])
+            top = top_k_ids(questions, corpus, args.k)
+            entry.update({
+                "cosine_mean": round(float(cos.mean()), 5),
+                "cosine_min": round(float(cos.min()), 5),
+                "top_k_overlap": round(
+                    float(np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(top, ref_top)])), 4
+                ),
+            })
+        report["backends"][name] = entry
+        model.close()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import json
+import re
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CHUNK_ID_RE = re.compile(r"chunk_id: (.+)")
+
+FILLER = (
+    "According to the provided guidance this is the recommended practice and it should be "
+    "followed consistently in clinical settings"
+).split()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """
+    Minimal Ollama API (/api/chat, /api/generate, /api/tags) that answers
+    with a citation of the first chunk_id in the prompt, paced by the
+    configured first-token and per-token latencies. Offline stand-in for
+    load tests; never inspects or logs anything beyond the chunk ids.
+    """
+
+    protocol_version = "HTTP/1.1"
+    config: dict = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, payload: dict):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _tokens(self, prompt: str):
+        ids = CHUNK_ID_RE.findall(prompt)
+        n = max(self.config["tokens"], 1)
+        words = [f"[{ids[0].strip()}]"] if ids else []
+        words += [FILLER[i % len(FILLER)] for i in range(n - len(words))]
+        return [w + " " for w in words]
+
+    def _generate(self, body: dict, prompt: str, field: str, message: bool):
+        model = body.get("model", self.config["model"])
+        started = time.perf_counter()
+
+        # Prefill cost grows with the prompt, like a real model
+        prefill_s = (
+            self.config["first_token_ms"] + self.config["prefill_ms_per_1k_chars"] * len(prompt) / 1000.0
+        ) / 1000.0
+        time.sleep(prefill_s)
+
+        tokens = self._tokens(prompt)
+
+        def part(text: str) -> dict:
+            out = {"model": model, "created_at": _now(), "done": False}
+            if message:
+                out["message"] = {"role": "assistant", "content": text}
+            else:
+                out[field] = text
+            return out
+
+        def final() -> dict:
+            out = part("")
+            elapsed_ns = int((time.perf_counter() - started) * 1e9)
+            out.update({
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": elapsed_ns,
+                "load_duration": 0,
+                "prompt_eval_count": len(prompt) // 4,
+                "prompt_eval_duration": int(prefill_s * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": max(elapsed_ns - int(prefill_s * 1e9), 0),
+            })
+            return out
+
+        if body.get("stream", True):
+            self._start_stream()
+            for token in tokens:
+                time.sleep(self.config["token_latency_ms"] / 1000.0)
+                self._write_chunk(part(token))
+            self._write_chunk(final())
+            self._end_stream()
+        else:
+            time.sleep(self.config["token_latency_ms"] * len(tokens) / 1000.0)
+            out = final()
+            if message:
+                out["message"]["content"] = "".join(tokens)
+            else:
+                out[field] = "".join(tokens)
+            self._send_json(out)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            name = self.config["model"]
+            self._send_json({"models": [{"name": name, "model": name, "modified_at": _now(), "size": 0}]})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-stub"})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        body = self._read_json()
+        if self.path == "/api/chat":
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+            self._generate(body, prompt, "message", message=True)
+        elif self.path == "/api/generate":
+            if not body.get("prompt"):
+                # Preload / keep-alive request: load the model, generate nothing
+                self._send_json({
+                    "model": body.get("model", self.config["model"]),
+                    "created_at": _now(),
+                    "response": "",
+                    "done": True,
+                    "done_reason": "load",
+                })
+                return
+            self._generate(body, body["prompt"], "response", message=False)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stub of the Ollama API for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", default="llama3.1")
+    parser.add_argument("--first-token-ms", type=float, default=150.0, help="Fixed latency before the first token")
+    parser.add_argument(
+        "--prefill-ms-per-1k-chars", type=float, default=20.0, help="Extra first-token latency per 1000 prompt chars"
+    )
+    parser.add_argument("--token-latency-ms", type=float, default=20.0, help="Latency between output tokens")
+    parser.add_argument("--tokens", type=int, default=40, help="Output tokens per answer")
+    args = parser.parse_args()
+
+    StubOllamaHandler.config = {
+        "model": args.model,
+        "first_token_ms": args.first_token_ms,
+        "prefill_ms_per_1k_chars": args.prefill_ms_per_1k_chars,
+        "token_latency_ms": args.token_latency_ms,
+        "tokens": args.tokens,
+    }
+    server = ThreadingHTTPServer((args.host, args.port), StubOllamaHandler)
+    server.daemon_threads = True
+    print(f"Stub Ollama listening on http://{args.host}:{args.port} (OLLAMA_BASE_URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
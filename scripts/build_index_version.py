@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import sys
+
+from app.config import settings
+from app.data_ingest.embedding import build_embedding_model
+from app.data_ingest.incremental import incremental_ingest
+from app.db.factory import build_vector_store
+from app.db.index_registry import IndexRegistry, new_version_name, version_dir
+from app.index_versions import collect_garbage, validate_store
+from app.rag.lexical import build_lexical_index_from_store, lexical_index_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build a new index version next to the live one, validate it, and optionally activate it."
+    )
+    parser.add_argument("--dir", default="data/sample_docs", help="Directory of .txt documents")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per embedding batch")
+    parser.add_argument(
+        "--activate",
+        action="store_true",
+        help="Make the new version active; running servers swap to it within INDEX_REGISTRY_POLL_S",
+    )
+    parser.add_argument("--gc", action="store_true", help="Afterwards delete old versions (see --keep)")
+    parser.add_argument(
+        "--keep",
+        type=int,
+        default=settings.index_keep_versions,
+        help="Ready versions kept by --gc besides the active and previous ones",
+    )
+    parser.add_argument("--nice", type=int, default=10, help="Lower this process's CPU priority (0 = unchanged)")
+    args = parser.parse_args()
+
+    # Build alongside a live server without taking CPU from its queries
+    if args.nice:
+        os.nice(args.nice)
+
+    registry = IndexRegistry()
+    name = new_version_name()
+    registry.register(
+        name,
+        source_dir=args.dir,
+        backend=settings.vector_backend,
+        shards=settings.vector_shards,
+        embedding_model=settings.embedding_model_name,
+    )
+    print(f"Building index version {name}")
+
+    embedder = build_embedding_model()
+    try:
+        store = build_vector_store(name)
+        report = incremental_ingest(
+            args.dir,
+            store,
+            embedder,
+            manifest_path=str(version_dir(name) / "ingest_manifest.json"),
+            embed_batch_size=args.batch_size,
+        )
+        print("Ingest:", json.dumps(report.as_dict()))
+        lexical = build_lexical_index_from_store(store, lexical_index_path(name))
+        print(f"Lexical index: {len(lexical)} chunks")
+        validation = validate_store(store, embedder)
+    except BaseException as exc:
+        # Leave the version collectable by gc rather than "building" forever
+        registry.update(name, status="failed", error=type(exc).__name__)
+        embedder.close()
+        raise
+    registry.update(
+        name,
+        status="ready" if validation["ok"] else "failed",
+        count=validation["count"],
+        index_version=store.index_version(),
+        validation=validation,
+    )
+    print("Validation:", json.dumps(validation))
+    embedder.close()
+    if not validation["ok"]:
+        sys.exit(f"Index version {name} failed validation; the active version is unchanged")
+
+    if args.activate:
+        registry.activate(name)
+        print(f"Activated {name}")
+    if args.gc:
+        print("Deleted versions:", collect_garbage(args.keep))
+
+
+if __name__ == "__main__":
+    main()
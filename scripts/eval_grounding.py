@@ -1,5 +1,6 @@
 import json
 from app.rag.grounded_qa import answer_question
+from app.rag.citations import parse_citations
 
 
 TESTS = [
@@ -27,6 +28,7 @@ def main():
         r = answer_question(t["question"], top_k=3)
         grounding = r.get("grounding", {})
         abstained = grounding.get("abstained", None)
+        cited = parse_citations(r.get("answer", ""), r.get("citations", []))
 
         results.append(
             {
@@ -37,7 +39,8 @@ def main():
                 "best_distance": grounding.get("best_distance"),
                 "threshold": grounding.get("max_distance_threshold"),
                 "warning_flags": r.get("warning_flags", []),
-                "has_citation_in_answer": any(cid in r.get("answer", "") for cid in r.get("citations", [])),
+                "has_citation_in_answer": bool(cited.valid_ids),
+                "invalid_citations": cited.invalid_ids,
             }
         )
 
@@ -31,46 +31,56 @@ def main():
 
     results = []
 
-    with httpx.Client(timeout=60.0) as client:
-        for t in TESTS:
-            payload = {"question": t["question"], "top_k": 3}
-            r = client.post(f"{API_BASE}/query", headers=headers, json=payload)
-
-            record = {
-                "test": t["name"],
-                "question": t["question"],
-                "expected_abstained": t["expect_abstain"],
-                "http_status": r.status_code,
-            }
+    with httpx.Client(timeout=600.0) as client:
+        payload = {"items": [{"question": t["question"], "top_k": 3} for t in TESTS]}
+        r = client.post(f"{API_BASE}/query/batch", headers=headers, json=payload)
+
+    items = r.json().get("results", []) if r.status_code == 200 else []
+    by_index = {item["index"]: item for item in items}
 
-            if r.status_code != 200:
-                record["error"] = r.text
-                results.append(record)
-                continue
-
-            data = r.json()
-            grounding = data.get("grounding", {})
-            citations = data.get("citations", [])
-            answer = data.get("answer", "")
-            
-            has_citation = any(cid in answer for cid in citations)
-            
-            record.update(
-                {
-                    "abstained": grounding.get("abstained"),
-                    "best_distance": grounding.get("best_distance"),
-                    "threshold": grounding.get("max_distance_threshold"),
-                    "warning_flags": data.get("warning_flags", []),
-                    "has_citation_in_answer": has_citation if not grounding.get("abstained") else None,
-                }
-            )
+    for i, t in enumerate(TESTS):
+        record = {
+            "test": t["name"],
+            "question": t["question"],
+            "expected_abstained": t["expect_abstain"],
+            "http_status": r.status_code,
+        }
+
+        item = by_index.get(i)
+        if r.status_code != 200:
+            record["error"] = r.text
+        elif item is None:
+            record["error"] = "missing_result"
+        elif item.get("error"):
+            # Per-item failure inside a 200 batch response (e.g. queue_full, generation_failed)
+            record["error"] = item["error"]
+        if "error" in record:
             results.append(record)
+            continue
+
+        data = item["result"]
+        grounding = data.get("grounding", {})
+        report = data.get("citation_report") or {}
+        has_citation = bool(report.get("valid_ids"))
+
+        record.update(
+            {
+                "abstained": grounding.get("abstained"),
+                "best_distance": grounding.get("best_distance"),
+                "threshold": grounding.get("max_distance_threshold"),
+                "warning_flags": data.get("warning_flags", []),
+                "has_citation_in_answer": has_citation if not grounding.get("abstained") else None,
+                "invalid_citations": report.get("invalid_ids", []),
+            }
+        )
+        results.append(record)
 
     total = len(results)
     ok = sum(1 for r in results if r.get("http_status") == 200)
+    errors = sum(1 for r in results if "error" in r)
     correct_abstain = sum(
         1 for r in results
-        if r.get("http_status") == 200
+        if "error" not in r
         and r.get("abstained") == r.get("expected_abstained")
     )
 
@@ -81,6 +91,7 @@ def main():
             {
                 "total": total,
                 "http_200": ok,
+                "errors": errors,
                 "abstain_matches_expectation": correct_abstain,
             },
             indent=2,
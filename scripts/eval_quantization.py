@@ -0,0 +1,47 @@
+import argparse
+import json
+
+import numpy as np
+
+from app.data_ingest.embedding import build_embedding_model
+from app.db.mmap_store import MmapVectorStore
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recall@k of int8 / binary quantized search against exact search on the mmap index."
+    )
+    parser.add_argument("--index-dir", default=None, help="mmap index directory (default: MMAP_INDEX_DIR)")
+    parser.add_argument("--questions", default=None, help="Text file with one question per line")
+    parser.add_argument("--samples", type=int, default=200, help="Random stored vectors to use as queries")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--multipliers", default="1,4,8,16", help="Comma-separated rescore multipliers")
+    args = parser.parse_args()
+
+    store = MmapVectorStore(index_dir=args.index_dir, quantization="none")
+
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+        queries = build_embedding_model().embed_batch(questions)
+    else:
+        # Perturbed copies of stored vectors: realistic neighbourhoods without needing a query set
+        snap = store._current()
+        if snap["vectors"] is None:
+            print("Index is empty")
+            return
+        rng = np.random.default_rng(0)
+        rows = rng.choice(snap["vectors"].shape[0], size=min(args.samples, snap["vectors"].shape[0]), replace=False)
+        base = np.asarray(snap["vectors"][np.sort(rows)], dtype=np.float32)
+        queries = base + rng.normal(scale=0.05, size=base.shape).astype(np.float32)
+
+    report = store.quantization_report(
+        queries,
+        k=args.k,
+        multipliers=[int(m) for m in args.multipliers.split(",")],
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.data_ingest.embedding import build_embedding_model, normalize_question
+from app.db.factory import build_vector_store
+from app.models.schemas import RetrievedChunk
+from app.rag.answer_cache import AnswerCache
+from app.rag.grounded_qa import aanswer_from_chunks, best_distance
+from app.rag.retriever import retrieve_contexts
+from app.startup import build_llm
+from app.state import state
+
+
+class RetrievalCache:
+    """
+    On-disk cache of retrieval results (chunks, citations, distances) keyed
+    by question, top_k, embedding model and index version, so re-runs and
+    threshold sweeps never re-embed or re-search. Rows from other index
+    versions are dropped on open.
+    """
+
+    def __init__(self, path: Path, index_version: str | None, embedder_id: str):
+        self.index_version = index_version
+        self.embedder_id = embedder_id
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path))
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS retrieval (key TEXT PRIMARY KEY, index_version TEXT, value TEXT NOT NULL)"
+        )
+        self._db.execute("DELETE FROM retrieval WHERE index_version IS NOT ?", (index_version,))
+        self._db.commit()
+
+    def key(self, question: str, top_k: int) -> str:
+        payload = json.dumps([normalize_question(question), top_k, self.embedder_id, self.index_version])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(keys), 500):
+            page = keys[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT key, value FROM retrieval WHERE key IN ({','.join('?' * len(page))})", page
+            ).fetchall()
+            out.update({k: json.loads(v) for k, v in rows})
+        return out
+
+    def put_many(self, entries: Dict[str, Dict[str, Any]]):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO retrieval (key, index_version, value) VALUES (?, ?, ?)",
+            [(k, self.index_version, json.dumps(v)) for k, v in entries.items()],
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+def load_items(path: str, default_top_k: int) -> List[Dict[str, Any]]:
+    """
+    JSONL, one labeled question per line:
+      {"id": "...", "question": "...", "expect_abstain": false,
+       "expected_sources": ["Hand Hygiene.txt"], "top_k": 3}
+    Only "question" and "expect_abstain" are required.
+    """
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "question" not in item or "expect_abstain" not in item:
+                raise ValueError(f"{path}:{line_no}: 'question' and 'expect_abstain' are required")
+            item.setdefault("id", str(line_no))
+            item.setdefault("top_k", default_top_k)
+            item.setdefault("expected_sources", [])
+            items.append(item)
+    return items
+
+
+def retrieve_all(items, cache: RetrievalCache, batch_size: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Retrieval for every item: cache hits first, misses in batches of one
+    encode call + one vector store query each. Returns (contexts, misses).
+    """
+    keys = [cache.key(item["question"], item["top_k"]) for item in items]
+    cached = cache.get_many(keys)
+    missing = [i for i, k in enumerate(keys) if k not in cached]
+
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        contexts = retrieve_contexts([items[i]["question"] for i in batch], [items[i]["top_k"] for i in batch])
+        fresh = {
+            keys[i]: {"chunks": [c.model_dump() for c in chunks], "citations": citations}
+            for i, (chunks, citations) in zip(batch, contexts)
+        }
+        cache.put_many(fresh)
+        cached.update(fresh)
+        print(f"Retrieved {min(start + batch_size, len(missing))}/{len(missing)} uncached questions")
+
+    return [cached[k] for k in keys], len(missing)
+
+
+def parse_thresholds(spec: str) -> List[float]:
+    # "start:stop:step" (inclusive) or a comma-separated list
+    if ":" in spec:
+        start, stop, step = (float(x) for x in spec.split(":"))
+        return [round(float(t), 6) for t in np.arange(start, stop + step / 2, step)]
+    return [float(t) for t in spec.split(",")]
+
+
+def threshold_sweep(expect_abstain: List[bool], best: List[Optional[float]], thresholds: List[float]):
+    """
+    Abstention quality of the distance gate at each threshold, from cached
+    distances only. Positive class = "should abstain".
+    """
+    expected = np.array(expect_abstain, dtype=bool)
+    dist = np.array([np.inf if d is None else d for d in best], dtype=np.float64)
+
+    rows = []
+    for t in thresholds:
+        abstain = dist > t
+        tp = int(np.sum(abstain & expected))
+        fp = int(np.sum(abstain & ~expected))
+        fn = int(np.sum(~abstain & expected))
+        tn = int(np.sum(~abstain & ~expected))
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / (tp + fn) if tp + fn else 1.0
+        rows.append({
+            "threshold": t,
+            "abstain_precision": round(precision, 4),
+            "abstain_recall": round(recall, 4),
+            "abstain_f1": round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+            "accuracy": round((tp + tn) / len(expected), 4) if len(expected) else 0.0,
+            "in_scope_answered": round(tn / (tn + fp), 4) if tn + fp else 0.0,
+            "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        })
+    return rows
+
+
+async def generate_all(items, contexts, concurrency: int) -> List[Dict[str, Any]]:
+    """
+    Grounded answers for every item, at most `concurrency` LLM calls in
+    flight. Answers come from / go to the on-disk answer cache.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    done = 0
+
+    async def run(item, context):
+        nonlocal done
+        chunks = [RetrievedChunk(**c) for c in context["chunks"]]
+        try:
+            async with semaphore:
+                result = await aanswer_from_chunks(item["question"], chunks, context["citations"])
+        except Exception as exc:
+            return {"id": item["id"], "error": type(exc).__name__}
+        finally:
+            done += 1
+            if done % 50 == 0:
+                print(f"Generated {done}/{len(items)}")
+
+        report = result.get("citation_report") or {}
+        cited = report.get("valid_ids", [])
+        cited_sources = {c.source_file for c in chunks if c.chunk_id in cited}
+        return {
+            "id": item["id"],
+            "abstained": result["grounding"]["abstained"] or "missing_citations_in_answer" in result["warning_flags"],
+            "cached": result["grounding"].get("cached", False),
+            "warning_flags": result["warning_flags"],
+            "has_citation": bool(cited),
+            "invalid_citations": len(report.get("invalid_ids", [])),
+            "citation_coverage": report.get("coverage"),
+            "cites_expected_source": bool(cited_sources & set(item["expected_sources"])) if item["expected_sources"] else None,
+        }
+
+    return await asyncio.gather(*(run(item, ctx) for item, ctx in zip(items, contexts)))
+
+
+def generation_summary(items, generated) -> Dict[str, Any]:
+    by_id = {item["id"]: item for item in items}
+    ok = [g for g in generated if "error" not in g]
+    expected_answer = [g for g in ok if not by_id[g["id"]]["expect_abstain"]]
+    expected_abstain = [g for g in ok if by_id[g["id"]]["expect_abstain"]]
+    with_sources = [g for g in ok if g["cites_expected_source"] is not None and not g["abstained"]]
+    flags: Dict[str, int] = {}
+    for g in ok:
+        for flag in g["warning_flags"]:
+            flags[flag] = flags.get(flag, 0) + 1
+    return {
+        "items": len(generated),
+        "errors": len(generated) - len(ok),
+        "cached": sum(1 for g in ok if g["cached"]),
+        "abstained": sum(1 for g in ok if g["abstained"]),
+        "in_scope_answered": sum(1 for g in expected_answer if not g["abstained"]),
+        "in_scope_total": len(expected_answer),
+        "out_of_scope_abstained": sum(1 for g in expected_abstain if g["abstained"]),
+        "out_of_scope_total": len(expected_abstain),
+        "answered_with_citation": sum(1 for g in ok if not g["abstained"] and g["has_citation"]),
+        "answers_with_invalid_citations": sum(1 for g in ok if g["invalid_citations"]),
+        "cites_expected_source_rate": (
+            round(sum(1 for g in with_sources if g["cites_expected_source"]) / len(with_sources), 4)
+            if with_sources else None
+        ),
+        "warning_flags": flags,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Grounding evaluation over a labeled JSONL set with cached retrieval and threshold sweeps."
+    )
+    parser.add_argument("--data", default="data/eval/grounding_eval.jsonl")
+    parser.add_argument("--cache-dir", default="eval_cache", help="Retrieval and answer caches live here")
+    parser.add_argument("--top-k", type=int, default=3, help="Default top_k for items without one")
+    parser.add_argument("--batch-size", type=int, default=128, help="Questions per retrieval batch")
+    parser.add_argument("--thresholds", default="0.2:2.0:0.05", help="start:stop:step or comma-separated list")
+    parser.add_argument("--generate", action="store_true", help="Also run (cached) LLM generation")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent LLM calls when generating")
+    parser.add_argument("--max-distance", type=float, default=None, help="Grounding threshold for generation")
+    parser.add_argument("--out", default=None, help="Write the JSON report here")
+    parser.add_argument("--items-out", default=None, help="Write per-item results (ids only, no text) as JSONL")
+    args = parser.parse_args()
+
+    if args.max_distance is not None:
+        settings.max_distance = args.max_distance
+
+    items = load_items(args.data, args.top_k)
+    cache_dir = Path(args.cache_dir)
+
+    state.embedder = build_embedding_model()
+    state.vector_store = build_vector_store()
+    index_version = state.vector_store.index_version()
+    embedder_id = f"{state.embedder.backend}:{state.embedder.model_name}"
+
+    started = time.perf_counter()
+    retrieval_cache = RetrievalCache(cache_dir / "retrieval.sqlite", index_version, embedder_id)
+    contexts, misses = retrieve_all(items, retrieval_cache, args.batch_size)
+    retrieval_cache.close()
+    retrieval_s = time.perf_counter() - started
+
+    best = [
+        best_distance([RetrievedChunk(**c) for c in ctx["chunks"]]) for ctx in contexts
+    ]
+    source_hits = [
+        bool({c["source_file"] for c in ctx["chunks"]} & set(item["expected_sources"]))
+        for item, ctx in zip(items, contexts)
+        if item["expected_sources"]
+    ]
+
+    started = time.perf_counter()
+    sweep = threshold_sweep([item["expect_abstain"] for item in items], best, parse_thresholds(args.thresholds))
+    sweep_s = time.perf_counter() - started
+    best_row = max(sweep, key=lambda r: (r["abstain_f1"], r["in_scope_answered"]))
+
+    report: Dict[str, Any] = {
+        "items": len(items),
+        "index_version": index_version,
+        "embedder": embedder_id,
+        "retrieval": {
+            "cache_misses": misses,
+            "cache_hits": len(items) - misses,
+            "seconds": round(retrieval_s, 2),
+            "expected_source_in_top_k": round(sum(source_hits) / len(source_hits), 4) if source_hits else None,
+        },
+        "sweep": {"seconds": round(sweep_s, 4), "best_f1": best_row, "thresholds": sweep},
+        "current_threshold": settings.max_distance,
+    }
+
+    generated = []
+    if args.generate:
+        state.llm = build_llm()
+        state.answer_cache = AnswerCache(
+            max_entries=max(len(items), 1),
+            sqlite_path=str(cache_dir / "answers.sqlite"),
+            disk_max_entries=max(len(items) * 4, 100000),
+            version_check_s=0.0,
+        )
+        started = time.perf_counter()
+        generated = asyncio.run(generate_all(items, contexts, args.concurrency))
+        report["generation"] = generation_summary(items, generated)
+        report["generation"]["seconds"] = round(time.perf_counter() - started, 2)
+        state.answer_cache.close()
+
+    if args.items_out:
+        by_id = {g["id"]: g for g in generated}
+        with open(args.items_out, "w", encoding="utf-8") as f:
+            for item, d in zip(items, best):
+                record = {"id": item["id"], "expect_abstain": item["expect_abstain"], "best_distance": d}
+                record.update({k: v for k, v in by_id.get(item["id"], {}).items() if k != "id"})
+                f.write(json.dumps(record) + "\n")
+
+    state.embedder.close()
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
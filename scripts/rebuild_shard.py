@@ -0,0 +1,49 @@
+import argparse
+import json
+
+from app.config import settings
+from app.data_ingest.text_loader import load_text_files
+from app.data_ingest.chunking import chunk_documents
+from app.data_ingest.embedding import build_embedding_model
+from app.db.factory import build_vector_store
+from app.db.sharded_store import ShardedVectorStore
+from app.db.index_registry import IndexRegistry
+from app.rag.lexical import build_lexical_index_from_store, lexical_index_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild shards of a sharded vector store from a document directory."
+    )
+    parser.add_argument("--dir", default="data/sample_docs", help="Directory of .txt documents")
+    parser.add_argument(
+        "--shards",
+        default="all",
+        help="Comma-separated shard numbers, or 'all' (needed after changing VECTOR_SHARDS or SHARD_STRATEGY)",
+    )
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per embedding batch")
+    args = parser.parse_args()
+
+    store = build_vector_store()
+    if not isinstance(store, ShardedVectorStore):
+        raise SystemExit(f"VECTOR_SHARDS={settings.vector_shards}: the store is not sharded")
+
+    shards = range(len(store.shards)) if args.shards == "all" else [int(s) for s in args.shards.split(",")]
+    chunks = chunk_documents(load_text_files(args.dir))
+    embedder = build_embedding_model()
+
+    for shard in shards:
+        mine = [c for c in chunks if store.shard_for(c["metadata"]["chunk_uid"]) == shard]
+        embeddings = []
+        for start in range(0, len(mine), args.batch_size):
+            embeddings.extend(embedder.embed_texts([c["content"] for c in mine[start:start + args.batch_size]]))
+        report = store.rebuild_shard(shard, mine, embeddings, ids=[c["metadata"]["chunk_uid"] for c in mine])
+        print("Rebuilt", json.dumps(report))
+
+    # The lexical index spans all shards; rebuild it from what they now hold
+    build_lexical_index_from_store(store, lexical_index_path(IndexRegistry().active))
+    print("Shards:", json.dumps(store.stats()))
+
+
+if __name__ == "__main__":
+    main()
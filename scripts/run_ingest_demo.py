@@ -1,12 +1,20 @@
+import argparse
+import json
+import os
+
 from app.data_ingest.text_loader import load_text_files
 from app.data_ingest.chunking import chunk_documents
-from app.data_ingest.embedding import LocalEmbeddingModel
-from app.db.vector_store import ChromaVectorStore
+from app.data_ingest.embedding import build_embedding_model
+from app.data_ingest.incremental import incremental_ingest, sync_manifest
+from app.data_ingest.pipeline import streaming_ingest
+from app.db.factory import build_vector_store
+from app.db.index_registry import IndexRegistry
+from app.rag.lexical import build_lexical_index_from_store, lexical_index_path
 
 
-def main():
+def full_ingest(directory: str, embedder, store):
     # 1. Load raw text docs
-    docs = load_text_files("data/sample_docs")
+    docs = load_text_files(directory)
     print(f"Loaded {len(docs)} documents")
 
     # 2. Chunk them
@@ -14,18 +22,72 @@ def main():
     print(f"Created {len(chunks)} chunks")
 
     # 3. Embed chunks
-    embedder = LocalEmbeddingModel()
     texts = [c["content"] for c in chunks]
     embeddings = embedder.embed_texts(texts)
     print(f"Generated {len(embeddings)} embeddings")
 
-    # 4. Store in Chroma
-    store = ChromaVectorStore()
+    # 4. Store in the vector store (upsert, so re-running does not collide on chunk_uids)
     ids = [c["metadata"]["chunk_uid"] for c in chunks]
-    store.add_documents(chunks, embeddings, ids=ids)
-    print("Stored chunks in ChromaDB")
+    store.upsert_documents(chunks, embeddings, ids=ids)
+    store.bump_index_version()
+    print("Stored chunks in the vector store")
+
+    # 5. Drop chunks of removed documents and record the ingest for later incremental runs
+    removed = sync_manifest(directory, store, embedder)
+    print(f"Removed {removed} stale chunks; ingest manifest rewritten")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest text documents into the vector store.")
+    parser.add_argument("--dir", default="data/sample_docs", help="Directory of .txt documents")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-embed every chunk instead of diffing against the ingest manifest",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Bounded-memory streaming pipeline for large corpora (full, resumable)",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Chunking processes (--stream)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per embedding batch (--stream)")
+    parser.add_argument("--page-size", type=int, default=512, help="Chunks per vector store write (--stream)")
+    parser.add_argument(
+        "--checkpoint",
+        default="ingest_checkpoint.json",
+        help="Resume file for --stream; removed after a successful run",
+    )
+    args = parser.parse_args()
+
+    embedder = build_embedding_model()
+    store = build_vector_store()
+
+    if args.stream:
+        progress = streaming_ingest(
+            args.dir,
+            store,
+            embedder,
+            workers=args.workers,
+            embed_batch_size=args.batch_size,
+            write_page_size=args.page_size,
+            checkpoint_path=args.checkpoint,
+            on_progress=lambda p: print("progress", json.dumps(p)),
+        )
+        print("Streaming ingest:", json.dumps(progress.as_dict(), indent=2))
+        removed = sync_manifest(args.dir, store, embedder)
+        print(f"Removed {removed} stale chunks; ingest manifest rewritten")
+    elif args.full:
+        full_ingest(args.dir, embedder, store)
+    else:
+        report = incremental_ingest(args.dir, store, embedder)
+        print("Incremental ingest:", json.dumps(report.as_dict(), indent=2))
+
+    # BM25 index for hybrid retrieval, read back from the store page by page
+    lexical = build_lexical_index_from_store(store, lexical_index_path(IndexRegistry().active))
+    print(f"Lexical index: {len(lexical)} chunks, {len(lexical.vocab)} terms")
 
-    # 5. Quick retrieval test
+    # Quick retrieval test
     test_query = "What does this document say about diet or treatment?"
     q_emb = embedder.embed_texts([test_query])[0]
     results = store.query(q_emb, top_k=3)
@@ -1,5 +1,5 @@
-from app.data_ingest.embedding import LocalEmbeddingModel
-from app.db.vector_store import ChromaVectorStore
+from app.data_ingest.embedding import build_embedding_model
+from app.db.factory import build_vector_store
 
 
 def main():
@@ -8,8 +8,8 @@ def main():
         print("No question entered.")
         return
 
-    embedder = LocalEmbeddingModel()
-    store = ChromaVectorStore()
+    embedder = build_embedding_model()
+    store = build_vector_store()
 
     q_emb = embedder.embed_texts([question])[0]
     results = store.query(q_emb, top_k=3)
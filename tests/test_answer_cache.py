@@ -0,0 +1,79 @@
+from app.rag.answer_cache import AnswerCache, make_answer_key
+
+
+def _key(question="What is hand hygiene?", chunk_ids=("a", "b"), temperature=0.0):
+    return make_answer_key(question, list(chunk_ids), "gpt-4o-mini", temperature, "prompt-v1")
+
+
+def test_key_normalizes_question_but_not_evidence():
+    assert _key() == _key("  what IS hand   hygiene? ")
+    # Evidence order and generation settings change the answer, so they change the key
+    assert _key() != _key(chunk_ids=("b", "a"))
+    assert _key() != _key(temperature=0.2)
+
+
+def test_lru_eviction_and_stats():
+    cache = AnswerCache(max_entries=2)
+    cache.put("a", {"answer": "A"})
+    cache.put("b", {"answer": "B"})
+    assert cache.get("a") == {"answer": "A"}  # "b" is now least recently used
+    cache.put("c", {"answer": "C"})
+
+    assert cache.get("b") is None
+    assert cache.get("c") == {"answer": "C"}
+    stats = cache.stats()
+    assert (stats["size"], stats["hits"], stats["misses"]) == (2, 2, 1)
+
+
+def test_index_version_change_invalidates(tmp_path):
+    cache = AnswerCache(sqlite_path=str(tmp_path / "answers.sqlite"))
+    cache.set_index_version("v1")
+    cache.put("k", {"answer": "old"})
+
+    cache.set_index_version("v1")
+    assert cache.get("k") == {"answer": "old"}
+
+    cache.set_index_version("v2")
+    assert cache.get("k") is None
+    assert cache.stats()["disk_size"] == 0
+    cache.close()
+
+
+def test_entries_survive_restart_for_same_version(tmp_path):
+    path = str(tmp_path / "answers.sqlite")
+    cache = AnswerCache(sqlite_path=path)
+    cache.set_index_version("v1")
+    cache.put("k", {"answer": "persisted", "citations": [1]})
+    cache.close()
+
+    reopened = AnswerCache(sqlite_path=path)
+    reopened.set_index_version("v1")
+    assert reopened.get("k") == {"answer": "persisted", "citations": [1]}
+    reopened.close()
+
+    # Restarting on a re-ingested index must not serve the old answer
+    stale = AnswerCache(sqlite_path=path)
+    stale.set_index_version("v2")
+    assert stale.get("k") is None
+    stale.close()
+
+
+def test_disk_is_trimmed_to_max_entries(tmp_path):
+    cache = AnswerCache(max_entries=1, sqlite_path=str(tmp_path / "answers.sqlite"), disk_max_entries=2)
+    for key in "abc":
+        cache.put(key, {"answer": key})
+    assert cache.stats()["disk_size"] == 2
+    cache.close()
+
+
+def test_sync_index_version_rate_limits_fetches():
+    cache = AnswerCache(version_check_s=3600)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return "v1"
+
+    cache.sync_index_version(fetch)
+    cache.sync_index_version(fetch)
+    assert len(calls) == 1
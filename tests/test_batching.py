@@ -0,0 +1,51 @@
+import threading
+
+import numpy as np
+
+from app.data_ingest.batching import EmbeddingBatcher
+
+
+def _encode(texts):
+    return np.asarray([[float(len(t))] for t in texts], dtype=np.float32)
+
+
+def test_identical_texts_share_one_row():
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return _encode(texts)
+
+    batcher = EmbeddingBatcher(encode, window_ms=50.0, max_batch_size=3)
+    try:
+        futures = [batcher.submit(t) for t in ("ab", "ab", "abc")]
+        assert [f.result(timeout=5)[0] for f in futures] == [2.0, 2.0, 3.0]
+        assert calls == [["ab", "abc"]]
+        assert batcher.stats()["items"] == 3
+    finally:
+        batcher.close()
+
+
+def test_cancelled_waiter_does_not_break_the_batcher():
+    started, release = threading.Event(), threading.Event()
+
+    def encode(texts):
+        started.set()
+        release.wait(5)
+        return _encode(texts)
+
+    batcher = EmbeddingBatcher(encode, window_ms=0.0, max_batch_size=8)
+    try:
+        # The first batch blocks in encode while the next one queues up
+        first = batcher.submit("a")
+        assert started.wait(5)
+        cancelled, kept = batcher.submit("bb"), batcher.submit("ccc")
+        assert cancelled.cancel()
+        release.set()
+
+        assert first.result(timeout=5)[0] == 1.0
+        assert kept.result(timeout=5)[0] == 3.0
+        assert batcher.submit("dddd").result(timeout=5)[0] == 4.0
+    finally:
+        batcher.close()
+
@@ -0,0 +1,48 @@
+from app.rag.citations import MAX_MARKER_CHARS, CitationParser, parse_citations
+
+RETRIEVED = ["Hand Hygiene.txt::chunk_1", "Hand Hygiene.txt::chunk_12", "Vaccination.txt::chunk_0"]
+
+
+def _feed_all(pieces):
+    parser = CitationParser(RETRIEVED)
+    markers = [marker for piece in pieces for marker in parser.feed(piece)]
+    return parser, markers
+
+
+def test_exact_id_match():
+    parser = parse_citations("Wash hands [Hand Hygiene.txt::chunk_12].", RETRIEVED)
+    assert parser.valid_ids == ["Hand Hygiene.txt::chunk_12"]
+    parser = parse_citations("See [Hand Hygiene.txt::chunk_123].", RETRIEVED)
+    assert parser.valid_ids == [] and parser.invalid_ids == ["Hand Hygiene.txt::chunk_123"]
+
+
+def test_markers_split_across_stream_pieces():
+    text = "Use rub [Hand Hygiene.txt::chunk_1] and book a dose [chunk_id: Vaccination.txt::chunk_0]."
+    whole, _ = _feed_all([text])
+    for size in (1, 2, 3, 7):
+        parser, markers = _feed_all([text[i:i + size] for i in range(0, len(text), size)])
+        assert markers == [
+            {"id": "Hand Hygiene.txt::chunk_1", "valid": True},
+            {"id": "Vaccination.txt::chunk_0", "valid": True},
+        ]
+        assert parser.report() == whole.report()
+
+
+def test_multiple_ids_and_counts():
+    parser = parse_citations(
+        "A [Hand Hygiene.txt::chunk_1; Vaccination.txt::chunk_0]. B [Hand Hygiene.txt::chunk_1] [nope].", RETRIEVED
+    )
+    report = parser.report()
+    assert report["citations"] == [
+        {"id": "Hand Hygiene.txt::chunk_1", "valid": True, "count": 2},
+        {"id": "Vaccination.txt::chunk_0", "valid": True, "count": 1},
+        {"id": "nope", "valid": False, "count": 1},
+    ]
+    assert report["coverage"] == 2 / 3
+
+
+def test_unterminated_markers_are_dropped():
+    parser, markers = _feed_all(["[Hand Hygiene.txt::", "chunk_1\n] text [", "x" * (MAX_MARKER_CHARS + 1), "]"])
+    assert markers == []
+    parser, markers = _feed_all(["[Vaccination [Vaccination.txt::chunk_0]"])
+    assert markers == [{"id": "Vaccination.txt::chunk_0", "valid": True}]
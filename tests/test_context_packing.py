@@ -0,0 +1,68 @@
+from app.models.schemas import RetrievedChunk
+from app.rag.context_packing import estimate_tokens, overlap_length, pack_context
+
+BODY = (
+    "Reposition immobile patients at least every two hours. Use pressure-relieving mattresses "
+    "for high-risk individuals. Inspect skin daily for early signs of breakdown over bony prominences."
+)
+OVERLAP = BODY[-40:]
+
+
+def _chunk(rank, source, position, text):
+    return RetrievedChunk(
+        rank=rank,
+        chunk_id=f"{source}::chunk_{position}",
+        source_file=source,
+        metadata={"chunk_id": position},
+        text=text,
+    )
+
+
+def test_overlap_length():
+    assert overlap_length(BODY, OVERLAP + "next part of the document") == len(OVERLAP)
+    assert overlap_length(BODY, "unrelated text that shares nothing") == 0
+
+
+def test_adjacent_chunks_merge_and_keep_every_id():
+    chunks = [
+        _chunk(1, "ulcer.txt", 1, OVERLAP + " Keep the skin clean and dry."),
+        _chunk(2, "ulcer.txt", 0, BODY),
+        _chunk(3, "hygiene.txt", 0, "Perform hand hygiene before and after patient contact."),
+    ]
+    packed = pack_context(chunks, token_budget=0)
+
+    assert packed.chunk_ids == ["ulcer.txt::chunk_0", "ulcer.txt::chunk_1", "hygiene.txt::chunk_0"]
+    assert packed.merged_chunks == 1
+    # The overlap is sent once, and every chunk keeps its chunk_id line
+    assert packed.text.count(OVERLAP) == 1
+    assert all(f"chunk_id: {c.chunk_id}" in packed.text for c in chunks)
+    assert packed.packed_tokens < packed.original_tokens
+
+
+def test_duplicate_text_is_sent_once():
+    chunks = [_chunk(1, "a.txt", 0, BODY), _chunk(2, "b.txt", 4, BODY)]
+    packed = pack_context(chunks, token_budget=0)
+    assert packed.text.count(BODY) == 1
+    assert "chunk_id: b.txt::chunk_4\ntext: (same as above)" in packed.text
+
+
+def test_budget_drops_whole_chunks_and_never_cuts_text():
+    chunks = [_chunk(rank, f"doc{rank}.txt", 0, f"document {rank} " + BODY) for rank in range(1, 5)]
+    budget = estimate_tokens(BODY) * 2 + 40
+    packed = pack_context(chunks, token_budget=budget)
+
+    assert packed.chunk_ids == ["doc1.txt::chunk_0", "doc2.txt::chunk_0"]
+    assert packed.dropped_chunk_ids == ["doc3.txt::chunk_0", "doc4.txt::chunk_0"]
+    assert packed.packed_tokens <= budget
+    assert all(c.text in packed.text for c in chunks[:2])
+
+    # The best-ranked chunk is kept whole even when it alone exceeds the budget
+    tiny = pack_context(chunks, token_budget=5)
+    assert tiny.chunk_ids == ["doc1.txt::chunk_0"] and chunks[0].text in tiny.text
+
+
+def test_default_budget_keeps_every_chunk():
+    chunks = [_chunk(rank, f"doc{rank}.txt", 0, "x" * 1000 + str(rank)) for rank in range(1, 11)]
+    packed = pack_context(chunks)
+    assert packed.dropped_chunk_ids == []
+    assert len(packed.chunk_ids) == 10
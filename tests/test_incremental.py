@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain_text_splitters")
+
+from app.data_ingest.incremental import incremental_ingest, sync_manifest  # noqa: E402
+from app.db.mmap_store import MmapVectorStore  # noqa: E402
+
+
+class _Embedder:
+    """Counts the texts it embeds; the vector only depends on the text."""
+
+    def __init__(self, model_name="fake-model"):
+        self.model_name = model_name
+        self.embedded = []
+
+    def fingerprint(self):
+        return {"model_name": self.model_name, "backend": "fake"}
+
+    def embed_texts(self, texts):
+        self.embedded.extend(texts)
+        return [np.frombuffer(t.ljust(32)[:32].encode("utf-8"), dtype=np.uint8).astype(np.float32) for t in texts]
+
+
+def _write(directory, files):
+    directory.mkdir(exist_ok=True)
+    for name, text in files.items():
+        (directory / name).write_text(text, encoding="utf-8")
+
+
+def _ingest(docs_dir, store, embedder, manifest):
+    return incremental_ingest(str(docs_dir), store, embedder, manifest_path=str(manifest))
+
+
+def test_second_run_skips_unchanged_documents(tmp_path):
+    docs_dir, manifest = tmp_path / "docs", tmp_path / "manifest.json"
+    _write(docs_dir, {"a.txt": "Wash hands before patient contact.", "b.txt": "Wear gloves."})
+    store, embedder = MmapVectorStore(str(tmp_path / "index")), _Embedder()
+
+    first = _ingest(docs_dir, store, embedder, manifest)
+    assert (first.docs_changed, first.chunks_embedded) == (2, 2)
+    version = store.index_version()
+
+    embedder.embedded.clear()
+    second = _ingest(docs_dir, store, embedder, manifest)
+    assert (second.docs_unchanged, second.docs_changed, second.chunks_embedded) == (2, 0, 0)
+    assert embedder.embedded == []
+    # Nothing changed, so answer caches keyed on the version stay valid
+    assert store.index_version() == version
+
+
+def test_changed_and_removed_documents(tmp_path):
+    docs_dir, manifest = tmp_path / "docs", tmp_path / "manifest.json"
+    _write(docs_dir, {"a.txt": "Wash hands.", "b.txt": "Wear gloves.", "c.txt": "Mask up."})
+    store, embedder = MmapVectorStore(str(tmp_path / "index")), _Embedder()
+    _ingest(docs_dir, store, embedder, manifest)
+    version = store.index_version()
+
+    _write(docs_dir, {"a.txt": "Wash hands for twenty seconds."})
+    (docs_dir / "c.txt").unlink()
+    embedder.embedded.clear()
+    report = _ingest(docs_dir, store, embedder, manifest)
+
+    assert (report.docs_unchanged, report.docs_changed, report.docs_removed) == (1, 1, 1)
+    assert embedder.embedded == ["Wash hands for twenty seconds."]
+    assert report.chunks_deleted == 1
+    assert sorted(store.list_ids()) == ["a.txt::chunk_0", "b.txt::chunk_0"]
+    assert store.get_chunks(["a.txt::chunk_0"])["a.txt::chunk_0"]["document"] == "Wash hands for twenty seconds."
+    assert store.index_version() != version
+
+
+def test_model_change_reembeds_everything(tmp_path):
+    docs_dir, manifest = tmp_path / "docs", tmp_path / "manifest.json"
+    _write(docs_dir, {"a.txt": "Wash hands.", "b.txt": "Wear gloves."})
+    store = MmapVectorStore(str(tmp_path / "index"))
+    _ingest(docs_dir, store, _Embedder("old-model"), manifest)
+
+    embedder = _Embedder("new-model")
+    report = _ingest(docs_dir, store, embedder, manifest)
+    assert (report.docs_changed, report.chunks_embedded, report.chunks_deleted) == (2, 2, 0)
+    assert sorted(embedder.embedded) == ["Wash hands.", "Wear gloves."]
+    assert store.count() == 2
+
+
+def test_relabelling_reingests_document(tmp_path):
+    docs_dir, manifest = tmp_path / "docs", tmp_path / "manifest.json"
+    _write(docs_dir, {"a.txt": "Wash hands."})
+    store, embedder = MmapVectorStore(str(tmp_path / "index")), _Embedder()
+    _ingest(docs_dir, store, embedder, manifest)
+
+    (docs_dir / "metadata.json").write_text('{"a.txt": {"doc_type": "guideline"}}', encoding="utf-8")
+    report = _ingest(docs_dir, store, embedder, manifest)
+    assert report.docs_changed == 1
+    assert store.get_chunks(["a.txt::chunk_0"])["a.txt::chunk_0"]["metadata"]["doc_type"] == "guideline"
+
+
+def test_sync_manifest_after_full_ingest(tmp_path):
+    docs_dir, manifest = tmp_path / "docs", tmp_path / "manifest.json"
+    _write(docs_dir, {"a.txt": "Wash hands.", "b.txt": "Wear gloves."})
+    store, embedder = MmapVectorStore(str(tmp_path / "index")), _Embedder()
+    # Simulate a full ingest that also left a chunk from a deleted document behind
+    texts = ["Wash hands.", "Wear gloves.", "Old protocol."]
+    ids = ["a.txt::chunk_0", "b.txt::chunk_0", "gone.txt::chunk_0"]
+    store.upsert_documents(
+        [{"content": t, "metadata": {"chunk_uid": i}} for t, i in zip(texts, ids)],
+        embedder.embed_texts(texts),
+        ids=ids,
+    )
+
+    assert sync_manifest(str(docs_dir), store, embedder, manifest_path=str(manifest)) == 1
+    assert sorted(store.list_ids()) == ids[:2]
+
+    # The manifest now matches the store, so an incremental run has nothing to do
+    embedder.embedded.clear()
+    report = _ingest(docs_dir, store, embedder, manifest)
+    assert (report.docs_unchanged, report.chunks_embedded, report.chunks_deleted) == (2, 0, 0)
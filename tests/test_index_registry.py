@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from app.db.index_registry import UNVERSIONED, IndexRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return IndexRegistry(tmp_path / "index_registry.json")
+
+
+def _ready(registry, name, created_at):
+    registry.register(name)
+    registry.update(name, status="ready", created_at=created_at)
+
+
+def test_activate_and_rollback(registry):
+    registry.register("v1")
+    with pytest.raises(ValueError):
+        registry.activate("v1")
+    registry.update("v1", status="ready")
+
+    data = registry.activate("v1")
+    assert (data["active"], data["previous"]) == ("v1", UNVERSIONED)
+    data = registry.rollback()
+    assert (data["active"], data["previous"]) == (UNVERSIONED, "v1")
+
+
+def test_gc_candidates(registry):
+    now = time.time()
+    for i, name in enumerate(["v1", "v2", "v3", "v4"]):
+        _ready(registry, name, now - 100 + i)
+    registry.activate("v4")
+    registry.register("failed")
+    registry.update("failed", status="failed")
+    registry.register("building")
+    registry.register("crashed")
+    registry.update("crashed", created_at=now - 7200)
+
+    # v4 active, previous unversioned; keep the newest other ready version (v3)
+    candidates = registry.gc_candidates(keep=1, stale_build_s=3600)
+    assert sorted(candidates) == ["crashed", "failed", "v1", "v2"]
+    assert "building" not in registry.gc_candidates(keep=0, stale_build_s=3600)
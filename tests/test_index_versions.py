@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+# app.index_versions reaches the LLM chain through app.state
+pytest.importorskip("langchain_core")
+pytest.importorskip("langchain_ollama")
+
+from app.db.mmap_store import MmapVectorStore  # noqa: E402
+from app.index_versions import validate_store  # noqa: E402
+
+
+class _Embedder:
+    def __init__(self, dim):
+        self.dim = dim
+
+    def embed_query(self, text):
+        return np.ones(self.dim, dtype=np.float32)
+
+
+def _store(tmp_path, vectors):
+    store = MmapVectorStore(str(tmp_path))
+    ids = [f"doc.txt::chunk_{i}" for i in range(len(vectors))]
+    store.upsert_documents([{"content": f"text {i}", "metadata": {}} for i in range(len(vectors))], vectors, ids)
+    return store
+
+
+def test_validate_store_accepts_duplicate_chunks(tmp_path):
+    vectors = np.random.default_rng(0).normal(size=(6, 8)).astype(np.float32)
+    # Boilerplate: several chunks with the same text embed identically
+    vectors[3] = vectors[4] = vectors[5] = vectors[0]
+    report = validate_store(_store(tmp_path, vectors), _Embedder(8), expected_count=6, samples=6)
+    assert report["ok"], report["errors"]
+    assert report["self_retrieval"] == "6/6"
+
+
+def test_validate_store_reports_problems(tmp_path):
+    vectors = np.random.default_rng(1).normal(size=(4, 8)).astype(np.float32)
+    report = validate_store(_store(tmp_path, vectors), _Embedder(16), expected_count=5)
+    assert not report["ok"]
+    assert "count 4 != expected 5" in report["errors"]
+    assert "stored vectors do not match the embedding model's dimension" in report["errors"]
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from app.db.mmap_store import MmapVectorStore
+from app.rag.lexical import (
+    BM25Index,
+    LexicalIndexHandle,
+    build_lexical_index_from_store,
+    fuse_results,
+    tokenize,
+)
+
+
+def _chunk(uid, text, **metadata):
+    return {"content": text, "metadata": {"chunk_uid": uid, **metadata}}
+
+
+CHUNKS = [
+    _chunk("hygiene", "Hand hygiene with alcohol-based rub before and after touching patients.", filename="hygiene.txt"),
+    _chunk("ulcer", "Reposition immobile patients every two hours to prevent pressure ulcers.", filename="ulcer.txt"),
+    _chunk("vaccine", "COVID-19 vaccination protocol: patients receive a booster dose.", filename="vaccine.txt"),
+]
+
+
+def test_tokenize_keeps_compounds_and_drops_stopwords():
+    assert tokenize("What is the COVID-19 dose?") == ["covid-19", "covid", "19", "dose"]
+
+
+def test_search_ranks_matching_chunks():
+    index = BM25Index.build(CHUNKS)
+    hits = index.search("How often should immobile patients be repositioned?", top_k=3)
+    assert index.ids[hits[0][0]] == "ulcer"
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+    # Only chunks sharing a term are returned
+    assert {index.ids[d] for d, _ in index.search("covid booster", top_k=3)} == {"vaccine"}
+    assert index.search("unrelated words", top_k=3) == []
+
+
+def test_search_applies_filters():
+    index = BM25Index.build(CHUNKS)
+    hits = index.search("patients", top_k=3, filters={"source_file": ["hygiene.txt", "vaccine.txt"]})
+    assert {index.ids[d] for d, _ in hits} == {"hygiene", "vaccine"}
+
+
+def test_save_load_round_trip(tmp_path):
+    index = BM25Index.build(CHUNKS)
+    path = tmp_path / "lexical_index.npz"
+    index.save(path)
+    loaded = BM25Index.load(path)
+
+    assert loaded.ids == index.ids and loaded.vocab == index.vocab
+    assert loaded.filter_index.postings.keys() == index.filter_index.postings.keys()
+    np.testing.assert_array_equal(loaded.weights, index.weights)
+    question = "patients covid-19 hand hygiene"
+    assert loaded.search(question, top_k=3) == index.search(question, top_k=3)
+    filters = {"source_file": ["vaccine.txt"]}
+    assert loaded.search(question, top_k=3, filters=filters) == index.search(question, top_k=3, filters=filters)
+
+
+def test_fusion_reads_lexical_only_hits_from_the_store(tmp_path):
+    store = MmapVectorStore(str(tmp_path))
+    vectors = np.eye(len(CHUNKS), dtype=np.float32)
+    store.upsert_documents(CHUNKS[:2], vectors[:2], [c["metadata"]["chunk_uid"] for c in CHUNKS[:2]])
+    index = BM25Index.build(CHUNKS)
+
+    dense = store.query(vectors[0], top_k=1)
+    hits = index.search("patients", top_k=3)
+    fused = fuse_results(dense, index, hits, vectors[0], store, top_k=3)
+
+    # "vaccine" is not in the store, so it is dropped; "ulcer" is lexical-only
+    assert sorted(fused["ids"][0]) == ["hygiene", "ulcer"]
+    row = fused["ids"][0].index("ulcer")
+    assert fused["documents"][0][row] == CHUNKS[1]["content"]
+    assert fused["metadatas"][0][row]["filename"] == "ulcer.txt"
+    assert fused["distances"][0][row] == pytest.approx(2.0)
+
+
+def test_handle_reloads_after_invalidate(tmp_path):
+    path = tmp_path / "lexical_index.npz"
+    handle = LexicalIndexHandle(lambda: path, check_s=3600.0)
+    assert handle.current() is None
+
+    BM25Index.build(CHUNKS).save(path)
+    # Within the check interval the missing-file result is kept
+    assert handle.current() is None
+    handle.invalidate()
+    assert len(handle.current()) == len(CHUNKS)
+
+
+def test_build_from_store_matches_build_from_chunks(tmp_path):
+    store = MmapVectorStore(str(tmp_path / "store"))
+    store.upsert_documents(CHUNKS, np.eye(len(CHUNKS), dtype=np.float32), [c["metadata"]["chunk_uid"] for c in CHUNKS])
+
+    from_store = build_lexical_index_from_store(store, tmp_path / "lexical_index.npz")
+    direct = BM25Index.build(CHUNKS)
+    question = "patients covid-19 hand hygiene"
+    assert sorted(from_store.ids) == sorted(direct.ids)
+    assert {from_store.ids[d]: s for d, s in from_store.search(question, 3)} == pytest.approx(
+        {direct.ids[d]: s for d, s in direct.search(question, 3)}
+    )
+    assert BM25Index.load(tmp_path / "lexical_index.npz").ids == from_store.ids
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from app.rag.llm_scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_NORMAL,
+    PRIORITY_SHORT,
+    LLMScheduler,
+    SchedulerRejected,
+    priority_for,
+)
+
+
+def test_priority_for():
+    assert priority_for("short?", short_question_chars=10) == PRIORITY_SHORT
+    assert priority_for("a much longer question", short_question_chars=10) == PRIORITY_NORMAL
+    assert priority_for("short?", short_question_chars=0) == PRIORITY_NORMAL
+    assert priority_for("short?", short_question_chars=10, batch=True) == PRIORITY_BATCH
+
+
+def test_waiters_start_in_priority_order():
+    async def run():
+        scheduler = LLMScheduler(max_in_flight=1, max_queue=8)
+        order = []
+
+        async def job(name, priority):
+            async with scheduler.slot(priority):
+                order.append(name)
+
+        await scheduler.acquire()
+        tasks = []
+        for name, priority in [("batch", PRIORITY_BATCH), ("normal1", PRIORITY_NORMAL),
+                               ("short", PRIORITY_SHORT), ("normal2", PRIORITY_NORMAL)]:
+            tasks.append(asyncio.create_task(job(name, priority)))
+            await asyncio.sleep(0)
+        assert scheduler.stats()["queue_depth"] == 4
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        return order, scheduler.stats()
+
+    order, stats = asyncio.run(run())
+    assert order == ["short", "normal1", "normal2", "batch"]
+    assert stats["in_flight"] == 0 and stats["queue_depth"] == 0
+    assert stats["admitted_by_lane"] == {"short": 1, "normal": 3, "batch": 1}
+
+
+def test_full_queue_is_rejected_with_429():
+    async def run():
+        scheduler = LLMScheduler(max_in_flight=1, max_queue=1)
+        await scheduler.acquire()
+        waiter = asyncio.create_task(scheduler.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerRejected) as exc:
+            await scheduler.acquire()
+        scheduler.release()
+        await waiter
+        scheduler.release()
+        return exc.value, scheduler.stats()
+
+    exc, stats = asyncio.run(run())
+    assert (exc.reason, exc.status_code) == ("queue_full", 429)
+    assert exc.retry_after_s >= 1
+    assert stats["rejected_queue_full"] == 1 and stats["in_flight"] == 0
+
+
+def test_deadline_is_rejected_with_503():
+    async def run():
+        scheduler = LLMScheduler(max_in_flight=1, max_queue=4)
+        await scheduler.acquire()
+        with pytest.raises(SchedulerRejected) as exc:
+            await scheduler.acquire(deadline_s=0.01)
+        stats = scheduler.stats()
+        scheduler.release()
+        return exc.value, stats, scheduler.stats()
+
+    exc, during, after = asyncio.run(run())
+    assert (exc.reason, exc.status_code) == ("deadline_exceeded", 503)
+    assert during["queue_depth"] == 0 and during["rejected_deadline"] == 1
+    assert after["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def run():
+        scheduler = LLMScheduler(max_in_flight=1, max_queue=4)
+        await scheduler.acquire()
+        waiter = asyncio.create_task(scheduler.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        scheduler.release()
+        # The slot is free again, not handed to the cancelled waiter
+        await asyncio.wait_for(scheduler.acquire(), timeout=1.0)
+        scheduler.release()
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0 and stats["queue_depth"] == 0
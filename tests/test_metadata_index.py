@@ -0,0 +1,58 @@
+import numpy as np
+
+from app.db.metadata_index import MetadataIndex, chroma_where, exact_top_k, filter_key, matches, normalize_filters
+
+METADATAS = [
+    {"filename": "a.txt", "doc_type": "guideline", "tag_icu": True},
+    {"filename": "a.txt", "doc_type": "protocol"},
+    {"filename": "b.txt", "doc_type": "guideline", "tag_icu": True, "tag_peds": True},
+    {"filename": "c.txt", "doc_type": "guideline", "tag_peds": True},
+]
+
+
+def test_normalize_filters_is_canonical():
+    assert normalize_filters(None) is None
+    assert normalize_filters({"source_file": [], "tags": None}) is None
+    a = normalize_filters({"tags": ["peds", "icu", "icu"], "source_file": "b.txt", "unknown": ["x"]})
+    assert a == {"source_file": ["b.txt"], "tags": ["icu", "peds"]}
+    assert filter_key(a) == filter_key(normalize_filters({"source_file": ["b.txt"], "tags": ["icu", "peds"]}))
+
+
+def test_positions_match_per_chunk_check():
+    index = MetadataIndex(METADATAS)
+    for filters in (
+        {"source_file": ["a.txt"]},
+        {"source_file": ["a.txt", "b.txt"], "doc_type": ["guideline"]},
+        {"tags": ["icu"]},
+        {"tags": ["icu", "peds"]},
+        {"doc_type": ["guideline"], "tags": ["peds"]},
+        {"source_file": ["missing.txt"]},
+    ):
+        expected = [i for i, m in enumerate(METADATAS) if matches(m, filters)]
+        assert index.positions(filters).tolist() == expected, filters
+
+
+def test_chroma_where():
+    assert chroma_where({"source_file": ["a.txt"]}) == {"filename": {"$in": ["a.txt"]}}
+    assert chroma_where({"doc_type": ["guideline"], "tags": ["icu"]}) == {
+        "$and": [{"doc_type": {"$in": ["guideline"]}}, {"tag_icu": {"$eq": True}}]
+    }
+
+
+def test_exact_top_k():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(20, 4)).astype(np.float32)
+    ids = [f"c{i}" for i in range(20)]
+    documents = [f"text {i}" for i in range(20)]
+    metadatas = [{"i": i} for i in range(20)]
+    queries = vectors[[3, 11]] + 0.01
+
+    results = exact_top_k(queries, ids, vectors, documents, metadatas, top_k=3)
+    for q, hits, distances in zip(queries, results["ids"], results["distances"]):
+        expected = np.argsort(((vectors - q) ** 2).sum(axis=1))[:3]
+        assert hits == [ids[i] for i in expected]
+        np.testing.assert_allclose(distances, ((vectors[expected] - q) ** 2).sum(axis=1), rtol=1e-5)
+    assert results["ids"][0][0] == "c3" and results["documents"][1][0] == "text 11"
+
+    empty = exact_top_k(queries, [], np.zeros((0, 4)), [], [], top_k=3)
+    assert empty["ids"] == [[], []] and empty["distances"] == [[], []]
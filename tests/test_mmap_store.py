@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+from app.db import mmap_store
+from app.db.mmap_store import MmapVectorStore, l2_normalize
+
+
+def _docs(prefix, n, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    docs = [
+        {
+            "content": f"{prefix} {i}",
+            "metadata": {"chunk_uid": f"{prefix}_{i}", "filename": f"{prefix}_{i % 3}.txt"},
+        }
+        for i in range(n)
+    ]
+    return docs, vectors, [f"{prefix}_{i}" for i in range(n)]
+
+
+def _brute_force(vectors, ids, query, k):
+    vectors, query = l2_normalize(vectors), l2_normalize(query[None, :])[0]
+    distances = ((vectors - query) ** 2).sum(axis=1)
+    order = np.argsort(distances, kind="stable")[:k]
+    return [ids[i] for i in order], distances[order]
+
+
+def test_upsert_delete_round_trip(tmp_path):
+    store = MmapVectorStore(str(tmp_path))
+    docs, vectors, ids = _docs("a", 20, seed=1)
+    store.add_documents(docs, vectors, ids)
+    version = store.index_version()
+
+    # Re-upserting an id replaces its vector instead of adding a row
+    replacement = -vectors[:1]
+    store.upsert_documents(docs[:1], replacement, ids[:1])
+    store.delete_ids(ids[10:])
+
+    assert store.count() == 10
+    assert sorted(store.list_ids()) == sorted(ids[:10])
+    np.testing.assert_allclose(store.get_embeddings(ids[:1])[ids[0]], l2_normalize(replacement)[0], atol=1e-6)
+    assert store.get_embeddings(ids[10:]) == {}
+
+    results = store.query(replacement[0], top_k=1)
+    assert results["ids"] == [[ids[0]]]
+    assert results["documents"] == [[docs[0]["content"]]]
+    assert store.bump_index_version() != version
+
+    # A fresh handle sees the same published state
+    reopened = MmapVectorStore(str(tmp_path))
+    assert sorted(reopened.list_ids()) == sorted(ids[:10])
+
+
+def test_compaction_keeps_live_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(mmap_store, "COMPACT_MIN_ROWS", 8)
+    store = MmapVectorStore(str(tmp_path))
+    docs, vectors, ids = _docs("a", 40, seed=4)
+    store.upsert_documents(docs, vectors, ids)
+    generation = store._read_manifest()["generation"]
+
+    store.delete_ids(ids[::2])
+
+    manifest = store._read_manifest()
+    assert manifest["generation"] == generation + 1
+    assert manifest["rows"] == manifest["live_rows"] == 20
+    kept = ids[1::2]
+    stored = store.get_embeddings(kept)
+    for cid, vector in zip(kept, l2_normalize(vectors[1::2])):
+        np.testing.assert_allclose(stored[cid], vector, atol=1e-6)
+    results = store.query_many(vectors[1::2], top_k=1)
+    assert [hits[0] for hits in results["ids"]] == kept
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_quantized_search_matches_exact(tmp_path, quantization):
+    docs, vectors, ids = _docs("a", 300, dim=32, seed=5)
+    queries = np.random.default_rng(6).normal(size=(10, 32)).astype(np.float32)
+
+    exact = MmapVectorStore(str(tmp_path / "exact"))
+    exact.upsert_documents(docs, vectors, ids)
+    # A shortlist as large as the index makes the rescored result exact
+    quantized = MmapVectorStore(str(tmp_path / quantization), quantization=quantization, rescore_multiplier=60)
+    quantized.upsert_documents(docs, vectors, ids)
+
+    expected = exact.query_many(queries, top_k=5)
+    got = quantized.query_many(queries, top_k=5)
+    assert got["ids"] == expected["ids"]
+    np.testing.assert_allclose(got["distances"], expected["distances"], atol=1e-5)
+    for query, hits, distances in zip(queries, expected["ids"], expected["distances"]):
+        want_ids, want_distances = _brute_force(vectors, ids, query, 5)
+        assert hits == want_ids
+        np.testing.assert_allclose(distances, want_distances, atol=1e-5)
+
+
+# 0 forces the masked scan instead of the exact candidate scan
+@pytest.mark.parametrize("exact_scan_max", [2000, 0])
+def test_filtered_query_matches_brute_force(tmp_path, monkeypatch, exact_scan_max):
+    monkeypatch.setattr(mmap_store.settings, "filter_exact_scan_max", exact_scan_max)
+    store = MmapVectorStore(str(tmp_path))
+    docs, vectors, ids = _docs("a", 60, seed=7)
+    store.upsert_documents(docs, vectors, ids)
+    query = np.random.default_rng(8).normal(size=8).astype(np.float32)
+
+    allowed = [i for i, d in enumerate(docs) if d["metadata"]["filename"] == "a_1.txt"]
+    want_ids, want_distances = _brute_force(vectors[allowed], [ids[i] for i in allowed], query, 4)
+    results = store.query(query, top_k=4, filters={"source_file": ["a_1.txt"]})
+    assert results["ids"] == [want_ids]
+    np.testing.assert_allclose(results["distances"][0], want_distances, atol=1e-5)
+
+    assert store.query(query, top_k=4, filters={"source_file": ["missing.txt"]})["ids"] == [[]]
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_failed_upsert_does_not_shift_later_rows(tmp_path, monkeypatch, quantization):
+    store = MmapVectorStore(str(tmp_path), quantization=quantization)
+    docs_a, vec_a, ids_a = _docs("a", 10, seed=1)
+    store.upsert_documents(docs_a, vec_a, ids_a)
+
+    # Fail after the vectors (and codes) were appended, before publishing
+    def boom(manifest):
+        raise OSError("disk full")
+
+    docs_b, vec_b, ids_b = _docs("b", 5, seed=2)
+    with monkeypatch.context() as m:
+        m.setattr(store, "_snapshot_mask", boom)
+        with pytest.raises(OSError):
+            store.upsert_documents(docs_b, vec_b, ids_b)
+
+    docs_c, vec_c, ids_c = _docs("c", 5, seed=3)
+    store.upsert_documents(docs_c, vec_c, ids_c)
+
+    assert store.count() == 15
+    assert sorted(store.list_ids()) == sorted(ids_a + ids_c)
+    stored = store.get_embeddings(ids_a + ids_c)
+    expected = l2_normalize(np.vstack([vec_a, vec_c]))
+    for cid, vector in zip(ids_a + ids_c, expected):
+        np.testing.assert_allclose(stored[cid], vector, atol=1e-6)
+
+    results = store.query_many(vec_c, top_k=1)
+    assert [hits[0] for hits in results["ids"]] == ids_c
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from app.db.mmap_store import MmapVectorStore
+from app.db.sharded_store import ShardedVectorStore, shard_for
+
+
+def _docs(n, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    ids = [f"doc{i % 5}.txt::chunk_{i}" for i in range(n)]
+    docs = [
+        {"content": f"text {i}", "metadata": {"chunk_uid": cid, "filename": cid.split("::")[0]}}
+        for i, cid in enumerate(ids)
+    ]
+    return docs, vectors, ids
+
+
+def _sharded(tmp_path, n=3, strategy="hash"):
+    return ShardedVectorStore([MmapVectorStore(str(tmp_path / f"shard_{i}")) for i in range(n)], strategy=strategy)
+
+
+def test_routing_is_stable_and_source_keeps_documents_together():
+    assert shard_for("a.txt::chunk_1", 4, "hash") == shard_for("a.txt::chunk_1", 4, "hash")
+    assert len({shard_for(f"a.txt::chunk_{i}", 4, "source") for i in range(20)}) == 1
+    assert len({shard_for(f"a.txt::chunk_{i}", 4, "hash") for i in range(20)}) > 1
+
+
+@pytest.mark.parametrize("strategy", ["hash", "source"])
+def test_merged_results_match_a_single_store(tmp_path, strategy):
+    docs, vectors, ids = _docs(60)
+    single = MmapVectorStore(str(tmp_path / "single"))
+    single.upsert_documents(docs, vectors, ids)
+    sharded = _sharded(tmp_path, strategy=strategy)
+    sharded.upsert_documents(docs, vectors, ids)
+
+    queries = np.random.default_rng(1).normal(size=(4, 8)).astype(np.float32)
+    expected, got = single.query_many(queries, top_k=5), sharded.query_many(queries, top_k=5)
+    assert got["ids"] == expected["ids"]
+    np.testing.assert_allclose(got["distances"], expected["distances"], atol=1e-6)
+
+    filters = {"source_file": ["doc2.txt"]}
+    assert (
+        sharded.query(queries[0], top_k=3, filters=filters)["ids"]
+        == single.query(queries[0], top_k=3, filters=filters)["ids"]
+    )
+    assert sharded.count() == 60 and sorted(sharded.list_ids()) == sorted(ids)
+    assert sharded.get_chunks(ids[:3], embeddings=False) == single.get_chunks(ids[:3], embeddings=False)
+
+
+def test_rebuild_shard_replaces_only_that_shard(tmp_path):
+    docs, vectors, ids = _docs(30)
+    store = _sharded(tmp_path)
+    store.upsert_documents(docs, vectors, ids)
+    version = store.index_version()
+
+    mine = [i for i, cid in enumerate(ids) if store.shard_for(cid) == 0][:-1]
+    report = store.rebuild_shard(0, [docs[i] for i in mine], vectors[mine], [ids[i] for i in mine])
+
+    assert report["removed"] == 1 and report["count"] == len(mine)
+    assert store.count() == 29
+    assert store.index_version() != version
+    with pytest.raises(ValueError):
+        store.rebuild_shard(0, docs[:30], vectors, ids)
+
+
+def test_close_stops_the_fan_out_threads(tmp_path):
+    docs, vectors, ids = _docs(20)
+    store = _sharded(tmp_path)
+    store.upsert_documents(docs, vectors, ids)
+    store.query(vectors[0], top_k=1)
+    threads = list(store._executor._threads)
+    assert threads
+
+    store.close()
+    for t in threads:
+        t.join(timeout=5)
+    assert not any(t.is_alive() for t in threads)
+    # A request that still holds the closed store completes inline
+    assert store.query(vectors[0], top_k=1)["ids"] == [[ids[0]]]
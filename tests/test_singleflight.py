@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from app.rag.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    async def run():
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*(flight.do("q", work) for _ in range(3)))
+        # The key is released once the work finishes
+        again = await flight.do("q", work)
+        return results, again, len(calls), flight.stats()
+
+    results, again, calls, stats = asyncio.run(run())
+    assert results == [("answer", False), ("answer", True), ("answer", True)]
+    assert again == ("answer", False)
+    assert calls == 2
+    assert stats == {"in_flight": 0, "leaders": 2, "collapsed": 2}
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    async def run():
+        flight = SingleFlight()
+        done = asyncio.Event()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            done.set()
+            return 42
+
+        leader = asyncio.create_task(flight.do("q", work))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(flight.do("q", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await joiner, done.is_set()
+
+    assert asyncio.run(run()) == ((42, True), True)
+
+
+def test_exception_reaches_every_caller():
+    async def run():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(flight.do("q", work), flight.do("q", work), return_exceptions=True)
+        return results, flight.stats()
+
+    results, stats = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert stats["in_flight"] == 0